@@ -1,13 +1,45 @@
 import pyotp
 import argparse
+import base64
+import binascii
+from collections import OrderedDict, deque
+import functools
+import hmac
 import logging
-import os
 import sqlite3
+import struct
+import threading
+import time
+from urllib.parse import quote
 from config import set_env_var
-from data_handler import init_database
+from data_handler import get_conn, init_database
 
 logger = logging.getLogger("uvicorn.error")
 
+# RFC 6238 parameters, identical to pyotp's defaults used at enrolment.
+_TOTP_INTERVAL = 30
+_TOTP_DIGITS = 10 ** 6
+# Accept the previous and next time step to tolerate phone clock drift.
+_TOTP_VALID_WINDOW = 1
+
+# A 6-digit code has 10**6 values, so failed logins are throttled per email:
+# after _MAX_FAILURES inside _FAILURE_WINDOW seconds, further attempts are
+# refused without looking the user up or computing any HMAC. Emails are kept
+# in order of their latest failure; past _MAX_TRACKED_EMAILS the stalest go.
+_MAX_FAILURES = 5
+_FAILURE_WINDOW = 60.0
+_MAX_TRACKED_EMAILS = 10_000
+
+_failures: OrderedDict[str, deque[float]] = OrderedDict()
+_failures_lock = threading.Lock()
+
+_ISSUER_NAME = "Seroul Pierre"
+# Same layout pyotp.TOTP.provisioning_uri() produces for the default
+# parameters, with the constant issuer quoted once up front.
+_URI_TEMPLATE = (
+    f"otpauth://totp/{quote(_ISSUER_NAME)}:{{name}}?secret={{secret}}&issuer={quote(_ISSUER_NAME)}"
+)
+
 
 def generate_otp_secret() -> str:
     """Generate a random base32 OTP secret."""
@@ -25,9 +57,7 @@ def get_provisioning_uri(email: str, secret: str, debug: bool = False) -> str:
     Returns:
         str: TOTP provisioning URI.
     """
-    totp = pyotp.TOTP(secret)
-    issuer_name = "Seroul Pierre"
-    return totp.provisioning_uri(name=email, issuer_name=issuer_name)
+    return _URI_TEMPLATE.format(name=quote(email), secret=secret)
 
 
 def generate_auth_link(email: str, debug: bool) -> None:
@@ -47,46 +77,125 @@ def generate_auth_link(email: str, debug: bool) -> None:
     otp_secret = generate_otp_secret()
 
     # Save user to SQLite database
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
-        # Extract username from email (part before @)
-        username = email.split('@')[0]
-        cursor.execute(
-            "INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-            (username, email, otp_secret)
-        )
-        conn.commit()
-        logger.info(f"User '{email}' added successfully to database.")
-    except sqlite3.IntegrityError:
-        logger.info(f"Error: User '{email}' already exists.")
-    finally:
-        conn.close()
+    with get_conn(write=True) as conn:
+        try:
+            # Extract username from email (part before @)
+            username = email.split('@')[0]
+            conn.execute(
+                "INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
+                (username, email, otp_secret)
+            )
+            conn.commit()
+            logger.info("User '%s' added successfully to database.", email)
+        except sqlite3.IntegrityError:
+            logger.info("Error: User '%s' already exists.", email)
 
     uri = get_provisioning_uri(email, otp_secret, debug)
     print(f"Pasted the following link in Qr.io to obtain a QR code : {uri}")
 
 
-def verify_access(email: str, secret_key: str) -> bool:
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
+@functools.lru_cache(maxsize=256)
+def _secret_key(otp_secret: str) -> bytes | None:
+    """Decode a base32 OTP secret into the raw HMAC key, once per secret.
 
+    Returns None for an empty or malformed secret so callers can reject the
+    login without computing anything.
+    """
+    if not otp_secret:
+        return None
     try:
-        cursor.execute(
-            "SELECT hashed_password FROM users WHERE email = ?",
-            (email,)
-        )
-        result = cursor.fetchone()
-
-        if result:
-            otp_secret = result[0]
-            totp = pyotp.TOTP(otp_secret)
-            if totp.verify(secret_key):
-                return True
+        padded = otp_secret + "=" * (-len(otp_secret) % 8)
+        return base64.b32decode(padded, casefold=True)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def _hotp(key: bytes, counter: int) -> str:
+    """Compute the 6-digit RFC 4226 HOTP value for *counter*."""
+    digest = hmac.new(key, struct.pack(">Q", counter), "sha1").digest()
+    offset = digest[19] & 0x0F
+    code = (int.from_bytes(digest[offset:offset + 4], "big") & 0x7FFFFFFF) % _TOTP_DIGITS
+    return f"{code:06d}"
 
+
+def verify_access(email: str, secret_key: str) -> bool:
+    """Check a TOTP code against the secret stored for *email*.
+
+    Args:
+        email (str): User's email address.
+        secret_key (str): The 6-digit code typed by the user.
+
+    Returns:
+        bool: True if the code is valid for the current time window (or one
+        step either side of it), False otherwise.
+    """
+    # Anything that is not a 6-digit code can never match: reject it before
+    # touching the database or computing any HMAC.
+    if len(secret_key) != 6 or not (secret_key.isascii() and secret_key.isdigit()):
         return False
-    finally:
-        conn.close()
+
+    # Pooled reader: a login does not reopen the database file
+    with get_conn() as conn:
+        result = conn.execute("SELECT hashed_password FROM users WHERE email = ?", (email,)).fetchone()
+
+    if not result:
+        return False
+    key = _secret_key(result[0])
+    if key is None:
+        return False
+
+    candidate = secret_key.encode()
+    counter = int(time.time()) // _TOTP_INTERVAL
+    matched = False
+    for step in range(counter - _TOTP_VALID_WINDOW, counter + _TOTP_VALID_WINDOW + 1):
+        # Evaluate every step so the response time does not reveal which one matched.
+        matched |= hmac.compare_digest(_hotp(key, step).encode(), candidate)
+    return matched
+
+
+def _recent_failures(email: str, now: float) -> deque[float] | None:
+    """Return the failure timestamps for *email* still inside the window (lock held)."""
+    stamps = _failures.get(email)
+    if stamps is None:
+        return None
+    while stamps and stamps[0] <= now - _FAILURE_WINDOW:
+        stamps.popleft()
+    if not stamps:
+        del _failures[email]
+        return None
+    return stamps
+
+
+def is_login_throttled(email: str) -> bool:
+    """Tell whether *email* has used up its failed attempts for the current window."""
+    now = time.monotonic()
+    with _failures_lock:
+        stamps = _recent_failures(email, now)
+        return stamps is not None and len(stamps) >= _MAX_FAILURES
+
+
+def record_login_failure(email: str) -> None:
+    """Count one failed login for *email*."""
+    now = time.monotonic()
+    with _failures_lock:
+        stamps = _failures.get(email)
+        if stamps is None:
+            # Bound memory under a spray of distinct emails: drop the stalest entries.
+            while len(_failures) >= _MAX_TRACKED_EMAILS:
+                _failures.popitem(last=False)
+            stamps = _failures[email] = deque(maxlen=_MAX_FAILURES)
+        else:
+            _failures.move_to_end(email)
+        stamps.append(now)
+
+
+def reset_login_failures(email: str | None = None) -> None:
+    """Forget the failed logins of *email*, or of every email when None."""
+    with _failures_lock:
+        if email is None:
+            _failures.clear()
+        else:
+            _failures.pop(email, None)
 
 
 if __name__ == "__main__":
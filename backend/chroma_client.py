@@ -1,16 +1,168 @@
 
 import chromadb
 from chromadb.utils import embedding_functions
+import atexit
+import functools
+import hashlib
 import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
 import utils
+from semantic_cache import SemanticCache
 import logging
-from typing import TYPE_CHECKING
+import numpy as np
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Iterator
 
 if TYPE_CHECKING:
     from llm_client import LlmPort
 
 logger = logging.getLogger("uvicorn.error")
 
+
+@functools.lru_cache(maxsize=4)
+def _get_emb_fn(model_name: str) -> embedding_functions.SentenceTransformerEmbeddingFunction:
+    """Return the process-wide embedding function for *model_name*.
+
+    Loading a SentenceTransformer model takes seconds and several hundred MB.
+    Requests share data_handler's process-wide client, but the TOC builder
+    and embed_all_ideas build their own ChromaClient; caching here lets all
+    of them use one loaded model instead of each loading a copy.
+    """
+    return embedding_functions.SentenceTransformerEmbeddingFunction(model_name=model_name)
+
+
+# ---------------------------------------------------------------------------
+# Query embedding batching
+# ---------------------------------------------------------------------------
+# Similarity requests run on several DB executor threads at once, and each
+# one used to pay for its own forward pass. The batcher lets the first
+# waiting thread embed every text queued so far in one call while the others
+# wait for their vector. A lone request is embedded immediately: batching
+# comes only from calls that overlap, never from an added delay.
+
+_MAX_EMBEDDING_BATCH = 16
+
+
+@dataclass
+class _PendingEmbedding:
+    text: str
+    embedding: np.ndarray | None = None
+    error: Exception | None = None
+    done: bool = False
+
+
+class _EmbeddingBatcher:
+    """Coalesce concurrent single-text embeddings into batched calls of *embed_texts*."""
+
+    def __init__(self, embed_texts: Callable[[list[str]], Any], max_batch_size: int = _MAX_EMBEDDING_BATCH) -> None:
+        self._embed_texts = embed_texts
+        self._max_batch_size = max_batch_size
+        self._pending: list[_PendingEmbedding] = []
+        self._running = False
+        self._cond = threading.Condition()
+
+    def embed(self, text: str) -> np.ndarray:
+        """Return the float32 embedding of *text*, sharing a forward pass with concurrent callers."""
+        item = _PendingEmbedding(text)
+        with self._cond:
+            self._pending.append(item)
+            while not item.done:
+                if self._running:
+                    self._cond.wait()
+                    continue
+                self._running = True
+                batch = self._pending[:self._max_batch_size]
+                del self._pending[:self._max_batch_size]
+                self._cond.release()
+                try:
+                    vectors = self._embed_texts([pending.text for pending in batch])
+                    embeddings = [np.asarray(vector, dtype=np.float32) for vector in vectors]
+                    error = None
+                except Exception as exc:
+                    embeddings, error = [None] * len(batch), exc
+                finally:
+                    self._cond.acquire()
+                for pending, embedding in zip(batch, embeddings):
+                    pending.embedding, pending.error, pending.done = embedding, error, True
+                self._running = False
+                self._cond.notify_all()
+        if item.error is not None:
+            raise item.error
+        return item.embedding
+
+
+# ---------------------------------------------------------------------------
+# Optional RAM-backed store
+# ---------------------------------------------------------------------------
+# When CHROMA_DB_DISK is set, CHROMA_DB is treated as a working copy on a
+# RAM-backed mount (tmpfs): it is seeded from the disk copy on first use and
+# copied back every CHROMA_SNAPSHOT_INTERVAL seconds and at interpreter exit.
+# Writes from this process hold _store_lock so a snapshot never copies a
+# half-applied write.  Only one process may own a working copy.
+
+# Most recent query texts whose embeddings each client keeps (about 3 KB each).
+_QUERY_EMBEDDING_CACHE_SIZE = 4096
+
+_store_lock = threading.RLock()
+_snapshotted_paths: set[str] = set()
+_DEFAULT_SNAPSHOT_INTERVAL = 300.0
+
+
+def snapshot_to_disk(working_path: str, disk_path: str) -> None:
+    """Copy the working store to *disk_path*, replacing the previous snapshot.
+
+    The copy is written next to the target first and swapped in with
+    renames, so an interrupted snapshot never leaves a partial directory.
+    """
+    staging = disk_path + ".partial"
+    previous = disk_path + ".previous"
+    with _store_lock:
+        shutil.rmtree(staging, ignore_errors=True)
+        shutil.copytree(working_path, staging)
+        shutil.rmtree(previous, ignore_errors=True)
+        if os.path.isdir(disk_path):
+            os.replace(disk_path, previous)
+        os.replace(staging, disk_path)
+        shutil.rmtree(previous, ignore_errors=True)
+    logger.debug("Chroma store snapshot written to %s", disk_path)
+
+
+def _snapshot_loop(working_path: str, disk_path: str, interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            snapshot_to_disk(working_path, disk_path)
+        except OSError as exc:
+            logger.error("Chroma store snapshot failed: %s", exc)
+
+
+def _ensure_working_copy(working_path: str) -> None:
+    """Seed the RAM-backed store and start snapshotting, once per path."""
+    disk_path = os.getenv("CHROMA_DB_DISK")
+    if not disk_path:
+        return
+    with _store_lock:
+        if working_path in _snapshotted_paths:
+            return
+        # A non-empty working copy survived a worker restart and is newer.
+        if not (os.path.isdir(working_path) and os.listdir(working_path)) and os.path.isdir(disk_path):
+            shutil.copytree(disk_path, working_path, dirs_exist_ok=True)
+            logger.info("Chroma store restored from %s", disk_path)
+        os.makedirs(working_path, exist_ok=True)
+        interval = float(os.getenv("CHROMA_SNAPSHOT_INTERVAL", _DEFAULT_SNAPSHOT_INTERVAL))
+        threading.Thread(
+            target=_snapshot_loop,
+            args=(working_path, disk_path, interval),
+            name="chroma-snapshot",
+            daemon=True,
+        ).start()
+        atexit.register(snapshot_to_disk, working_path, disk_path)
+        _snapshotted_paths.add(working_path)
+
+
 class ChromaClient:
     """
     A class for managing embeddings and similarity calculations using ChromaDB.
@@ -25,6 +177,12 @@ class ChromaClient:
     """
 
     _WORD_THRESHOLD: int = 60  # summarize descriptions longer than this
+    _PAGE_SIZE: int = 100  # records per collection.get call when reading everything
+    _BATCH_SIZE: int = 500  # ideas per collection.add call in bulk_insert
+    # Sentence embeddings are compared by angle, so index them in cosine space
+    # rather than Chroma's l2 default.  Only applied when a collection is
+    # created; existing collections keep their space until rebuilt.
+    _COLLECTION_METADATA: dict[str, str] = {"hnsw:space": "cosine"}
 
     def __init__(self, collection_name: str = "Ideas", llm: "LlmPort | None" = None) -> None:
         """
@@ -40,12 +198,22 @@ class ChromaClient:
         self.model_name = "all-mpnet-base-v2"
         self._llm = llm
 
+        _ensure_working_copy(os.getenv('CHROMA_DB'))
         self.client = chromadb.PersistentClient(path=os.getenv('CHROMA_DB'))
-        self.emb_fn = embedding_functions.SentenceTransformerEmbeddingFunction(model_name=self.model_name)
+        self.emb_fn = _get_emb_fn(self.model_name)
         self.collection = self.client.get_or_create_collection(
             name=collection_name,
-            embedding_function=self.emb_fn
+            embedding_function=self.emb_fn,
+            metadata=self._COLLECTION_METADATA,
         )
+        # Answers of get_similar_idea for recent queries; any write to the
+        # collection can change them, so every write clears it.
+        self._similar_cache = SemanticCache()
+        # Query embeddings by SHA-1 of the text. They depend only on the model,
+        # so writes leave them alone; a repeated query skips the forward pass.
+        self._query_embeddings: OrderedDict[bytes, np.ndarray] = OrderedDict()
+        self._query_embeddings_lock = threading.Lock()
+        self._query_batcher = _EmbeddingBatcher(lambda texts: self.emb_fn(texts))
 
     def _maybe_summarize(self, text: str) -> str:
         """Summarize text if it exceeds the word threshold and an LLM is available."""
@@ -57,7 +225,9 @@ class ChromaClient:
             logger.warning("Summarization failed, using original text")
             return text
 
-    def insert_idea(self, title: str, content: str, tags: list[str], comments: list[str] | None = None) -> None:
+    def insert_idea(
+        self, idea_id: int, title: str, content: str, tags: list[str], comments: list[str] | None = None
+    ) -> None:
         """
         Insert new data into the embedding database.
 
@@ -66,7 +236,12 @@ class ChromaClient:
         are summarized when an LLM is available. The original description is
         always stored in metadata for retrieval.
 
+        The document id is the SQLite ``ideas.id``, so search results map
+        straight back to primary-key lookups and renaming an idea keeps its
+        embedding.
+
         Args:
+            idea_id (int): The SQLite id of the idea, used as the document id
             title (str): The title of the idea to insert
             content (str): The content of the idea to insert
             tags (list[str]): The tags of the idea to insert
@@ -77,17 +252,21 @@ class ChromaClient:
         if comments:
             joined = " ".join(comments)
             comments_summary = [self._maybe_summarize(joined)]
-        self.collection.add(
-            documents=[utils.format_text(title, summary, tags, comments_summary)],
-            metadatas=[{
-                "title": title,
-                "tags": ",".join(tags),
-                "description": content,
-            }],
-            ids=[title]
-        )
-
-    def update_idea(self, title: str, content: str, tags: list[str], comments: list[str] | None = None) -> None:
+        with _store_lock:
+            self.collection.add(
+                documents=[utils.format_text(title, summary, tags, comments_summary)],
+                metadatas=[{
+                    "title": title,
+                    "tags": ",".join(tags),
+                    "description": content,
+                }],
+                ids=[str(idea_id)]
+            )
+        self._similar_cache.clear()
+
+    def update_idea(
+        self, idea_id: int, title: str, content: str, tags: list[str], comments: list[str] | None = None
+    ) -> None:
         """
         Update existing data in the embedding database.
 
@@ -97,6 +276,7 @@ class ChromaClient:
         always stored in metadata for retrieval.
 
         Args:
+            idea_id (int): The SQLite id of the idea to update
             title (str): The name/title of the idea to update
             content (str): The new content for the idea
             tags (list[str]): The new tags of the idea
@@ -107,75 +287,152 @@ class ChromaClient:
         if comments:
             joined = " ".join(comments)
             comments_summary = [self._maybe_summarize(joined)]
-        self.collection.update(
-            documents=[utils.format_text(title, summary, tags, comments_summary)],
-            metadatas=[{
-                "title": title,
-                "tags": ",".join(tags),
-                "description": content,
-            }],
-            ids=[title]
-        )
-
-    def remove_idea(self, title: str) -> None:
+        with _store_lock:
+            self.collection.update(
+                documents=[utils.format_text(title, summary, tags, comments_summary)],
+                metadatas=[{
+                    "title": title,
+                    "tags": ",".join(tags),
+                    "description": content,
+                }],
+                ids=[str(idea_id)]
+            )
+        self._similar_cache.clear()
+
+    def remove_idea(self, idea_id: int) -> None:
         """
         Remove data from the embedding database.
 
         Deletes a document from the ChromaDB collection based on its ID.
 
         Args:
-            title: str: The id of the idea to remove
+            idea_id (int): The SQLite id of the idea to remove
         """
-        self.collection.delete(ids=[title])
+        with _store_lock:
+            self.collection.delete(ids=[str(idea_id)])
+        self._similar_cache.clear()
 
-    def get_similar_idea(self, idea: str, n_results: int = 10) -> list[dict[str, str]]:
+    def _embed_query(self, text: str) -> np.ndarray:
+        """Embed a query, reusing the vector of an identical recent query.
+
+        Misses go through the batcher, so concurrent queries share a forward pass.
+        """
+        key = hashlib.sha1(text.encode(), usedforsecurity=False).digest()
+        with self._query_embeddings_lock:
+            embedding = self._query_embeddings.get(key)
+            if embedding is not None:
+                self._query_embeddings.move_to_end(key)
+                return embedding
+        embedding = self._query_batcher.embed(text)
+        with self._query_embeddings_lock:
+            self._query_embeddings[key] = embedding
+            if len(self._query_embeddings) > _QUERY_EMBEDDING_CACHE_SIZE:
+                self._query_embeddings.popitem(last=False)
+        return embedding
+
+    def get_similar_idea(self, idea: str, n_results: int = 10) -> list[str]:
         """
         Find similar data items based on semantic similarity.
 
         Performs a semantic search in the ChromaDB collection to find
         data items similar to the provided query.
 
+        The query is embedded once, and not at all when the exact same text
+        was embedded recently. If a recent query was nearly identical
+        (cosine similarity of at least 0.95), its answer is returned without
+        searching the collection again.
+
         Args:
             idea (str): The query text to search against
             n_results (int, optional): Number of similar results to return.
                 Defaults to 10.
 
         Returns:
-            list[str]: List of idea titles of similar data items
+            list[str]: Ids (stringified ``ideas.id``) of similar ideas, most similar first
         """
+        embedding = self._embed_query(idea)
+        cached = self._similar_cache.lookup(embedding)
+        if cached is not None and cached[0] >= n_results:
+            return cached[1][:n_results]
 
+        # Only the ids are used: skip loading documents, metadatas and distances.
         results = self.collection.query(
-            query_texts=[idea],
-            n_results=n_results
+            query_embeddings=[embedding],
+            n_results=n_results,
+            include=[]
         )
-        logger.info(f"chroma_client:get_similar_data({idea}) ->\n {results}")
-        titles: list[str] = results["ids"][0]
-        return titles
+        logger.debug("chroma_client:get_similar_data(%s) ->\n %s", idea, results)
+        ids: list[str] = results["ids"][0]
+        self._similar_cache.add(embedding, (n_results, ids))
+        return ids
+
+    def iter_idea_pages(self, max_items: int = 500, page_size: int = _PAGE_SIZE) -> Iterator[chromadb.GetResult]:
+        """
+        Yield the collection in pages of at most *page_size* records.
+
+        Each page is a separate collection.get call, so Chroma only
+        materialises one page of embeddings at a time and a consumer can
+        process a page before the next one is fetched.
+
+        Args:
+            max_items (int): Upper bound on the total number of records.
+            page_size (int): Records per collection.get call.
 
-    def get_all_ideas(self, max_items: int = 500) -> chromadb.GetResult:
+        Yields:
+            chromadb.GetResult: One page with embeddings, documents and metadatas.
+        """
+        offset = 0
+        while offset < max_items:
+            limit = min(page_size, max_items - offset)
+            page = self.collection.get(
+                include=['embeddings', 'documents', 'metadatas'],
+                limit=limit,
+                offset=offset,
+            )
+            if page["ids"]:
+                yield page
+            if len(page["ids"]) < limit:
+                return
+            offset += limit
+
+    def get_all_ideas(self, max_items: int = 500) -> dict[str, Any]:
         """
         Retrieve all ideas from the embedding database.
 
         Gets all documents, embeddings, and metadata from the ChromaDB collection.
+        All three are consumed by the TOC pipeline: embeddings for clustering,
+        documents for chapter titles and metadatas for leaf descriptions.
 
         Returns:
-            chromadb.GetResult: All data from the collection including embeddings,
-                documents, and metadatas
+            dict: ``ids``, ``documents`` and ``metadatas`` lists for every idea,
+                plus ``embeddings`` as one contiguous float32 array of shape
+                (n_ideas, dim), assembled from iter_idea_pages
         """
-        return self.collection.get(include=['embeddings', 'documents', 'metadatas'], limit=max_items)
-
-    def bulk_insert(self, ideas: list[dict]) -> None:
-        """Insert all ideas with batch summarization for efficiency.
+        merged: dict[str, Any] = {"ids": [], "documents": [], "metadatas": []}
+        embedding_pages: list[np.ndarray] = []
+        for page in self.iter_idea_pages(max_items):
+            for key, values in merged.items():
+                values.extend(page[key])
+            # float32 rows instead of lists of Python floats: ~7x less memory
+            # and directly usable by numpy/UMAP without another copy.
+            embedding_pages.append(np.asarray(page["embeddings"], dtype=np.float32))
+        merged["embeddings"] = (
+            np.vstack(embedding_pages) if embedding_pages else np.empty((0, 0), dtype=np.float32)
+        )
+        return merged
 
-        Each idea dict must have keys: ``title`` (str), ``description`` (str),
-        ``tags`` (list[str]). An optional ``comments`` key may hold a list[str].
+    def _prepare_batch(self, ideas: list[dict]) -> tuple[list[str], list[dict], list[str]]:
+        """Build the documents, metadatas and ids lists for a batch of ideas.
 
         Long descriptions and comments are summarized in batches when an LLM is
         available, which is far more efficient than calling _maybe_summarize one
         text at a time for large collections.
 
         Args:
-            ideas: List of idea dicts to insert.
+            ideas: List of idea dicts (see bulk_insert for the expected keys).
+
+        Returns:
+            tuple: ``(documents, metadatas, ids)`` ready for collection.add/update.
         """
         descriptions = [idea["description"] for idea in ideas]
         all_comments = [" ".join(idea.get("comments", [])) for idea in ideas]
@@ -212,6 +469,42 @@ class ChromaClient:
                 "tags": ",".join(idea["tags"]),
                 "description": idea["description"],
             })
-            ids.append(idea["title"])
+            ids.append(str(idea["id"]))
+        return documents, metadatas, ids
+
+    def bulk_insert(self, ideas: list[dict], batch_size: int = _BATCH_SIZE) -> None:
+        """Insert all ideas with batch summarization for efficiency.
 
-        self.collection.add(documents=documents, metadatas=metadatas, ids=ids)
+        Each idea dict must have keys: ``id`` (int, the SQLite id), ``title``
+        (str), ``description`` (str), ``tags`` (list[str]). An optional
+        ``comments`` key may hold a list[str].
+
+        Documents go through one collection.add call per ``batch_size`` ideas,
+        so the embedding model encodes them in batches instead of one at a
+        time while the payload of each call stays bounded.
+
+        Args:
+            ideas: List of idea dicts to insert.
+            batch_size: Maximum number of ideas per collection.add call.
+        """
+        for start in range(0, len(ideas), batch_size):
+            documents, metadatas, ids = self._prepare_batch(ideas[start:start + batch_size])
+            with _store_lock:
+                self.collection.add(documents=documents, metadatas=metadatas, ids=ids)
+        self._similar_cache.clear()
+
+    def bulk_update(self, ideas: list[dict]) -> None:
+        """Update several existing ideas with a single embedding batch.
+
+        Takes the same idea dicts as bulk_insert; each ``id`` must match an
+        existing document id.
+
+        Args:
+            ideas: List of idea dicts to update.
+        """
+        if not ideas:
+            return
+        documents, metadatas, ids = self._prepare_batch(ideas)
+        with _store_lock:
+            self.collection.update(documents=documents, metadatas=metadatas, ids=ids)
+        self._similar_cache.clear()
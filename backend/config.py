@@ -1,42 +1,52 @@
 import os
-import json
 import logging
 
+import orjson
+
 
 logger = logging.getLogger("uvicorn.error")
 
+_DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+_SITE_JSON_PATH = os.path.join(_DATA_DIR, "site.json")
+
+# Defaults applied by set_env_var(); resolved once at import.
+_DEFAULTS: dict[str, str] = {
+    'CHROMA_DB': os.path.join(_DATA_DIR, "embeddings"),
+    'NAME_DB': os.path.join(_DATA_DIR, "knowledge.db"),
+    'TOC_CACHE_PATH': os.path.join(_DATA_DIR, "toc.json"),
+    # LLM configuration for TOC title generation and section ordering
+    'ANTHROPIC_API_KEY': '',
+    'LLM_MODEL': 'claude-haiku-4-5-20251001',
+    'OLLAMA_URL': 'http://localhost:11434',
+    'OLLAMA_MODEL': 'qwen2:1.5b',
+}
+
 def set_env_var() -> None:
     """Set all configuration variables as environment variables."""
     try:
         # Set all config variables as environment variables.
-        # Use setdefault so that values pre-set by tests (or the host environment)
-        # are not overwritten.
-        os.environ.setdefault('CHROMA_DB', os.path.join(os.path.dirname(__file__), "data", "embeddings"))
-        os.environ.setdefault('NAME_DB', os.path.join(os.path.dirname(__file__), "data", "knowledge.db"))
-        os.environ.setdefault('TOC_CACHE_PATH', os.path.join(os.path.dirname(__file__), "data", "toc.json"))
-
-        # LLM configuration for TOC title generation and section ordering
-        os.environ.setdefault('ANTHROPIC_API_KEY', '')
-        os.environ.setdefault('LLM_MODEL', 'claude-haiku-4-5-20251001')
-        os.environ.setdefault('OLLAMA_URL', 'http://localhost:11434')
-        os.environ.setdefault('OLLAMA_MODEL', 'qwen2:1.5b')
-        
-        # Load origins from site.json
-        site_json_path = os.path.join(os.path.dirname(__file__), "data", "site.json")
-        if os.path.exists(site_json_path):
-            with open(site_json_path, 'r') as f:
-                site_data = json.load(f)
-                if 'origins' in site_data:
-                    # Convert origins list to comma-separated string for environment variable
-                    origins_string = ",".join(site_data['origins'])
-                    os.environ['ALLOWED_ORIGINS'] = origins_string
-                    logger.info(f"Loaded origins from site.json: {origins_string}")
-                else:
-                    logger.warning("No 'origins' key found in site.json")
-        else:
+        # Only fill in missing keys so that values pre-set by tests (or the host
+        # environment) are not overwritten.
+        os.environ.update({key: value for key, value in _DEFAULTS.items() if key not in os.environ})
+
+        # Load origins from site.json; a single open() replaces the exists() check
+        try:
+            with open(_SITE_JSON_PATH, 'rb') as f:
+                site_data = orjson.loads(f.read())
+        except FileNotFoundError:
+            site_data = None
             logger.warning("site.json file not found")
 
+        if site_data is not None:
+            if 'origins' in site_data:
+                # Convert origins list to comma-separated string for environment variable
+                origins_string = ",".join(site_data['origins'])
+                os.environ['ALLOWED_ORIGINS'] = origins_string
+                logger.info("Loaded origins from site.json: %s", origins_string)
+            else:
+                logger.warning("No 'origins' key found in site.json")
+
         logger.info("All configuration variables have been set as environment variables")
     except Exception as e:
-        logger.error(f"Error setting environment variables: {str(e)}")
+        logger.error("Error setting environment variables: %s", e)
         raise
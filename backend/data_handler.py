@@ -1,15 +1,398 @@
 import sqlite3
-from typing import Any, Hashable
+from typing import Any, Hashable, Iterator
 import pandas as pd
 from chroma_client import ChromaClient
 import os
 import argparse
+import atexit
+import json
+import queue
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from itertools import islice
 from concurrent.futures import ThreadPoolExecutor
 import logging
 from config import set_env_var
 
 logger = logging.getLogger("uvicorn.error")
 
+
+# ---------------------------------------------------------------------------
+# Connection pool
+# ---------------------------------------------------------------------------
+
+_POOL_SIZE = min(os.cpu_count() or 1, 8)
+
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
+)
+
+
+# Prepared statements are cached per connection, keyed by the exact SQL text.
+# The pool keeps connections alive, so a larger cache stays warm across requests.
+_STATEMENT_CACHE_SIZE = 256
+
+
+def _open_connection(path: str, read_only: bool = False) -> sqlite3.Connection:
+    """
+    Open a connection that may be shared across threads and apply the pragmas.
+
+    Reader connections also get ``query_only``, so a write that borrows a
+    reader by mistake fails immediately instead of racing the shared writer
+    for the database lock. The writer opens its implicit transactions with
+    BEGIN IMMEDIATE: the write lock is taken up front, so a batch of
+    executemany calls never has to upgrade a read lock halfway through and
+    hit SQLITE_BUSY against another process (e.g. a CLI script).
+    """
+    conn = sqlite3.connect(
+        path,
+        check_same_thread=False,
+        cached_statements=_STATEMENT_CACHE_SIZE,
+        isolation_level="DEFERRED" if read_only else "IMMEDIATE",
+    )
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
+    if read_only:
+        conn.execute("PRAGMA query_only=ON")
+    return conn
+
+
+class _ConnectionPool:
+    """
+    Long-lived connections to one SQLite file.
+
+    Readers are kept in a LIFO queue so the most recently used connection
+    (and its warm page cache) is handed out first. When every reader is busy
+    a temporary one is opened rather than blocking, and it is closed on
+    release if the queue is already full. Readers are query-only. SQLite
+    serializes writers anyway, so a single writer connection is shared
+    behind a lock.
+    """
+
+    def __init__(self, path: str, size: int = _POOL_SIZE) -> None:
+        self.path = path
+        self._readers: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue(maxsize=size)
+        self._writer: sqlite3.Connection | None = None
+        self._write_lock = threading.Lock()
+
+    def acquire_reader(self) -> sqlite3.Connection:
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            return _open_connection(self.path, read_only=True)
+
+    def release_reader(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._readers.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = _open_connection(self.path)
+            try:
+                yield self._writer
+            finally:
+                # Never hand an uncommitted transaction to the next caller.
+                if self._writer.in_transaction:
+                    self._writer.rollback()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+_pools: dict[str, _ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _db_path() -> str:
+    """
+    Return the database path from NAME_DB, failing loudly when it is unset.
+
+    This is the only place NAME_DB is read. It is not frozen at import time
+    because tests and scripts point it at another file at runtime; with the
+    pool in place the lookup happens once per checkout, not once per query.
+    """
+    path = os.environ.get('NAME_DB')
+    if not path:
+        raise RuntimeError("NAME_DB is not set; call config.set_env_var() or export it")
+    return path
+
+
+def _get_pool() -> _ConnectionPool:
+    # Pools are keyed by path, so re-pointing NAME_DB gets a fresh pool.
+    path = _db_path()
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(path, _ConnectionPool(path))
+    return pool
+
+
+@contextmanager
+def get_conn(write: bool = False) -> Iterator[sqlite3.Connection]:
+    """
+    Borrow a pooled connection to the database named by ``NAME_DB``.
+
+    Args:
+        write (bool): Borrow the shared writer connection instead of a reader.
+            Callers still commit explicitly; anything left uncommitted is
+            rolled back when the block exits.
+
+    Yields:
+        sqlite3.Connection: An open connection, returned to the pool on exit.
+    """
+    pool = _get_pool()
+    if write:
+        with pool.writer() as conn:
+            yield conn
+        return
+    conn = pool.acquire_reader()
+    try:
+        yield conn
+    finally:
+        pool.release_reader(conn)
+
+
+def close_pools() -> None:
+    """Close every pooled connection, e.g. on shutdown or after a test swaps NAME_DB."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(close_pools)
+
+
+# ---------------------------------------------------------------------------
+# Shared SQL
+# ---------------------------------------------------------------------------
+
+# Statements issued by more than one hot path. Keeping one copy of the text
+# guarantees they hit the same entry in each connection's statement cache.
+_SQL_SELECT_USER_ID = "SELECT id FROM users WHERE email = ?"
+_SQL_SELECT_CONTENT = "SELECT content FROM ideas WHERE id = ?"
+_SQL_SELECT_IDEA_TAGS = "SELECT tag_name FROM relations WHERE idea_id = ?"
+_SQL_INSERT_IDEA = "INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)"
+_SQL_UPDATE_IDEA = "UPDATE ideas SET content = ?, title = ? WHERE id = ?"
+_SQL_DELETE_IDEA = "DELETE FROM ideas WHERE id = ?"
+_SQL_INSERT_TAG = "INSERT OR IGNORE INTO tags (name) VALUES (?)"
+_SQL_INSERT_RELATION = "INSERT OR IGNORE INTO relations (idea_id, tag_name) VALUES (?, ?)"
+_SQL_DELETE_RELATION = "DELETE FROM relations WHERE idea_id = ? AND tag_name = ?"
+
+
+# Tag-set replacement: the new list is bound once as a JSON array and expanded
+# by json_each, so no variadic placeholder string is built per call.
+_SQL_DETACH_OTHER_TAGS = (
+    "DELETE FROM relations WHERE idea_id = ? AND tag_name NOT IN (SELECT value FROM json_each(?))"
+)
+_SQL_INSERT_TAGS_JSON = "INSERT OR IGNORE INTO tags (name) SELECT value FROM json_each(?)"
+_SQL_INSERT_RELATIONS_JSON = "INSERT OR IGNORE INTO relations (idea_id, tag_name) SELECT ?, value FROM json_each(?)"
+# Id lists are bound as one JSON array instead of one ``?`` per element, so
+# the statement text does not change with the length of the list.
+_SQL_SELECT_TAGS_FOR_IDEAS = (
+    "SELECT idea_id, tag_name FROM relations WHERE idea_id IN (SELECT value FROM json_each(?))"
+)
+_SQL_SELECT_IDEAS_BY_IDS = """
+SELECT i.id, i.title, i.content, i.book_id, GROUP_CONCAT(r.tag_name, ';') AS tags
+FROM ideas i
+LEFT JOIN relations r ON i.id = r.idea_id
+WHERE i.id IN (SELECT value FROM json_each(?))
+GROUP BY i.id, i.title, i.content, i.book_id;
+"""
+
+
+def _attach_tags(cursor: sqlite3.Cursor, idea_id: int, tag_names: list[str]) -> None:
+    """Create missing tags and link them to an idea, inside the caller's transaction."""
+    cursor.executemany(_SQL_INSERT_TAG, ((name,) for name in tag_names))
+    cursor.executemany(_SQL_INSERT_RELATION, ((idea_id, name) for name in tag_names))
+
+
+def _replace_tags(cursor: sqlite3.Cursor, idea_id: int, tag_names: list[str]) -> None:
+    """Make ``tag_names`` the exact tag set of an idea, inside the caller's transaction."""
+    names = json.dumps(tag_names)
+    cursor.execute(_SQL_DETACH_OTHER_TAGS, (idea_id, names))
+    cursor.execute(_SQL_INSERT_TAGS_JSON, (names,))
+    cursor.execute(_SQL_INSERT_RELATIONS_JSON, (idea_id, names))
+
+
+# ---------------------------------------------------------------------------
+# ChromaDB client
+# ---------------------------------------------------------------------------
+
+# One long-lived worker for embedding writes: spawning a pool per call cost a
+# thread start on every request. A single worker also applies writes for the
+# same idea in the order they were issued.
+_chroma_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chroma-write")
+
+_chroma_lock = threading.Lock()
+_chroma_client: ChromaClient | None = None
+_chroma_key: tuple | None = None
+
+
+def _get_chroma() -> ChromaClient:
+    """
+    Return a shared ChromaClient, building it on first use.
+
+    The client is rebuilt when CHROMA_DB points somewhere else or when the
+    ``ChromaClient`` name has been swapped (as the tests do), so a stale
+    instance is never reused.
+    """
+    global _chroma_client, _chroma_key
+    key = (ChromaClient, os.getenv('CHROMA_DB'))
+    with _chroma_lock:
+        if _chroma_client is None or _chroma_key != key:
+            _chroma_client = ChromaClient()
+            _chroma_key = key
+        return _chroma_client
+
+
+def _reset_chroma() -> None:
+    """Forget the shared client, e.g. after its collection has been dropped."""
+    global _chroma_client, _chroma_key
+    with _chroma_lock:
+        _chroma_client = None
+        _chroma_key = None
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    hashed_password TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS tags (name TEXT PRIMARY KEY);
+
+CREATE TABLE IF NOT EXISTS books (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS ideas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    owner_id INTEGER NOT NULL,
+    book_id INTEGER NOT NULL,
+    FOREIGN KEY (owner_id) REFERENCES users (id),
+    FOREIGN KEY (book_id) REFERENCES books (id)
+);
+
+CREATE TABLE IF NOT EXISTS relations (
+    idea_id INTEGER,
+    tag_name TEXT,
+    PRIMARY KEY (idea_id, tag_name),
+    FOREIGN KEY (idea_id) REFERENCES ideas(id),
+    FOREIGN KEY (tag_name) REFERENCES tags(name)
+);
+
+CREATE TABLE IF NOT EXISTS book_authors (
+    book_id INTEGER,
+    user_id INTEGER,
+    PRIMARY KEY (book_id, user_id),
+    FOREIGN KEY (book_id) REFERENCES books(id),
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+CREATE TABLE IF NOT EXISTS idea_votes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idea_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    value INTEGER NOT NULL CHECK (value IN (-1, 1)),
+    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    UNIQUE (idea_id, user_id),
+    FOREIGN KEY (idea_id) REFERENCES ideas(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS impact_comments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idea_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    FOREIGN KEY (idea_id) REFERENCES ideas(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- relations' primary key (idea_id, tag_name) already serves lookups by
+-- idea; this one serves tag filters.
+CREATE INDEX IF NOT EXISTS idx_relations_tag ON relations (tag_name, idea_id);
+-- Nothing filters ideas by title since get_similar_idea selects by id;
+-- drop the index older databases still carry so writes stop maintaining it.
+DROP INDEX IF EXISTS idx_ideas_title;
+"""
+
+
+def _create_ideas_fts(cursor: sqlite3.Cursor) -> None:
+    """
+    Create the ideas_fts full-text index and the triggers that keep it in sync.
+
+    ideas_fts is an external-content FTS5 table over ideas.title and
+    ideas.content, so the text is not stored twice. The trigram tokenizer
+    lets MATCH answer substring queries, which is what the search endpoint
+    promises. The index is rebuilt from ideas whenever it is (re)created,
+    which backfills existing databases; an index built with an older
+    tokenizer is dropped and rebuilt. SQLite builds without FTS5 are logged
+    and keep working; search_ideas_by_text then falls back to LIKE.
+    """
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'ideas_fts'")
+    row = cursor.fetchone()
+    if row:
+        if "trigram" in row[0]:
+            return
+        for trigger in ("ideas_fts_insert", "ideas_fts_update", "ideas_fts_delete"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        cursor.execute("DROP TABLE ideas_fts")
+    try:
+        cursor.execute("""
+        CREATE VIRTUAL TABLE ideas_fts USING fts5(
+            title, content, content='ideas', content_rowid='id', tokenize='trigram'
+        );
+        """)
+    except sqlite3.OperationalError as e:
+        logger.warning("Warning: full-text index unavailable, search falls back to LIKE: %s", e)
+        return
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS ideas_fts_insert AFTER INSERT ON ideas BEGIN
+        INSERT INTO ideas_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+    END;
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS ideas_fts_delete AFTER DELETE ON ideas BEGIN
+        INSERT INTO ideas_fts (ideas_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    END;
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS ideas_fts_update AFTER UPDATE OF title, content ON ideas BEGIN
+        INSERT INTO ideas_fts (ideas_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO ideas_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+    END;
+    """)
+    cursor.execute("INSERT INTO ideas_fts (ideas_fts) VALUES ('rebuild')")
+
+
 def init_database() -> None:
     """
     Initialize the SQLite database with required tables.
@@ -23,88 +406,25 @@ def init_database() -> None:
     - book_authors: manages many-to-many relationships between books and users
     - impact_comments: stores impact comments on ideas
 
+    All DDL and migrations run in one explicit transaction: in autocommit
+    mode each CREATE TABLE would otherwise be its own journal commit. The
+    database is also switched to WAL mode, which is persistent.
+
     Returns:
         None
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
+    conn = sqlite3.connect(_db_path(), isolation_level=None)
     cursor = conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    # executescript sends the whole schema in one call. BEGIN IMMEDIATE takes
+    # the write lock up front so a concurrent connection cannot observe or
+    # race a half-applied schema; the transaction stays open (autocommit
+    # mode) for the migrations below.
+    cursor.executescript("BEGIN IMMEDIATE;\n" + _SCHEMA)
 
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE NOT NULL,
-        email TEXT UNIQUE NOT NULL,
-        hashed_password TEXT NOT NULL
-    );
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS tags (name TEXT PRIMARY KEY);
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS books (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT NOT NULL
-    );
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS ideas (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT NOT NULL,
-        content TEXT NOT NULL,
-        owner_id INTEGER NOT NULL,
-        book_id INTEGER NOT NULL,
-        FOREIGN KEY (owner_id) REFERENCES users (id),
-        FOREIGN KEY (book_id) REFERENCES books (id)
-    );
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS relations (
-        idea_id INTEGER,
-        tag_name TEXT,
-        PRIMARY KEY (idea_id, tag_name),
-        FOREIGN KEY (idea_id) REFERENCES ideas(id),
-        FOREIGN KEY (tag_name) REFERENCES tags(name)
-    );
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS book_authors (
-        book_id INTEGER,
-        user_id INTEGER,
-        PRIMARY KEY (book_id, user_id),
-        FOREIGN KEY (book_id) REFERENCES books(id),
-        FOREIGN KEY (user_id) REFERENCES users(id)
-    );
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS idea_votes (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        idea_id INTEGER NOT NULL,
-        user_id INTEGER NOT NULL,
-        value INTEGER NOT NULL CHECK (value IN (-1, 1)),
-        created_at TEXT NOT NULL DEFAULT (datetime('now')),
-        UNIQUE (idea_id, user_id),
-        FOREIGN KEY (idea_id) REFERENCES ideas(id) ON DELETE CASCADE,
-        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-    );
-    """)
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS impact_comments (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        idea_id INTEGER NOT NULL,
-        user_id INTEGER NOT NULL,
-        content TEXT NOT NULL,
-        created_at TEXT NOT NULL DEFAULT (datetime('now')),
-        FOREIGN KEY (idea_id) REFERENCES ideas(id) ON DELETE CASCADE,
-        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-    );
-    """)
+    _create_ideas_fts(cursor)
 
     # Migration: add is_admin column if missing
     cursor.execute("PRAGMA table_info(users)")
@@ -112,7 +432,10 @@ def init_database() -> None:
     if 'is_admin' not in existing_columns:
         cursor.execute("ALTER TABLE users ADD COLUMN is_admin INTEGER NOT NULL DEFAULT 0")
 
-    conn.commit()
+    # Refresh planner statistics so the indexes above are actually chosen.
+    cursor.execute("ANALYZE")
+    cursor.execute("COMMIT")
+    cursor.execute("PRAGMA optimize")
     conn.close()
 
 # GET IDEA OR TAGS
@@ -120,7 +443,10 @@ def get_idea_from_tags(tags: str, book_id: int | None = None) -> list[dict[Hasha
     """
     Retrieve ideas associated with specific tags.
 
-    Fetches ideas that are linked to the specified tags from the database.
+    Fetches ideas that carry every one of the specified tags. Matching is done
+    on ``relations`` alone (grouped per idea and kept only when all requested
+    tags are present); the full tag list and vote score of each match are
+    then read with correlated subqueries so neither is multiplied by a join.
 
     Args:
         tags (str): Semicolon-separated string of tag names
@@ -129,97 +455,114 @@ def get_idea_from_tags(tags: str, book_id: int | None = None) -> list[dict[Hasha
     Returns:
         list[dict[Hashable, str]]: List of dictionaries containing ideas
     """
-    if not tags:
-        return get_ideas()
-    else:
-        tags_list = tags.split(";")
-        placeholders = ", ".join(["?"] * len(tags_list))
-        conn = sqlite3.connect(os.getenv('NAME_DB'))
-        if book_id is not None:
-            query = f"""
-            SELECT i.id, i.title, i.content, i.book_id,
-                   COALESCE(SUM(iv.value), 0) AS score
-            FROM ideas i
-            JOIN relations r ON i.id = r.idea_id
-            JOIN tags t ON r.tag_name = t.name
-            LEFT JOIN idea_votes iv ON i.id = iv.idea_id
-            WHERE t.name IN ({placeholders}) AND i.book_id = ?
-            GROUP BY i.id, i.title, i.content, i.book_id;
-            """
-            params: list = tags_list + [book_id]
-        else:
-            query = f"""
-            SELECT i.id, i.title, i.content, i.book_id,
-                   COALESCE(SUM(iv.value), 0) AS score
-            FROM ideas i
-            JOIN relations r ON i.id = r.idea_id
-            JOIN tags t ON r.tag_name = t.name
-            LEFT JOIN idea_votes iv ON i.id = iv.idea_id
-            WHERE t.name IN ({placeholders})
-            GROUP BY i.id, i.title, i.content, i.book_id;
-            """
-            params = tags_list
+    tags_list = list(dict.fromkeys(t for t in tags.split(";") if t)) if tags else []
+    if not tags_list:
+        return get_ideas(book_id)
+
+    book_filter = "WHERE i.book_id = ?" if book_id is not None else ""
+    query = f"""
+    SELECT i.id, i.title, i.content, i.book_id,
+           (SELECT GROUP_CONCAT(r2.tag_name, ';') FROM relations r2 WHERE r2.idea_id = i.id) AS tags,
+           (SELECT COALESCE(SUM(iv.value), 0) FROM idea_votes iv WHERE iv.idea_id = i.id) AS score
+    FROM ideas i
+    JOIN (
+        SELECT idea_id FROM relations
+        WHERE tag_name IN (SELECT value FROM json_each(?))
+        GROUP BY idea_id
+        HAVING COUNT(DISTINCT tag_name) = ?
+    ) matched ON matched.idea_id = i.id
+    {book_filter}
+    ORDER BY i.id;
+    """
+    params: list = [json.dumps(tags_list), len(tags_list)]
+    if book_id is not None:
+        params.append(book_id)
+    with get_conn() as conn:
         df = pd.read_sql_query(query, conn, params=params)
-        conn.close()
+    df = df.fillna('')
     return df.to_dict("records")
 
-def get_ideas(book_id: int | None = None) -> list[dict[Hashable, Any]]:
+def get_ideas(book_id: int | None = None, limit: int | None = None, offset: int = 0) -> list[dict[Hashable, Any]]:
     """
-    Retrieve ideas from the database with limit to prevent memory issues.
+    Retrieve ideas from the database, optionally one page at a time.
+
+    The page of ideas is selected first and tags and score are aggregated
+    per idea on that page only, so the cost of a request follows the page
+    size rather than the size of the corpus.
 
     Args:
         book_id (int | None): Optional book ID to filter ideas by book
+        limit (int | None): Maximum number of ideas to return, None for all
+        offset (int): Number of ideas to skip, in id order
 
     Returns:
         list[dict[Hashable, Any]]: List of dictionaries containing ideas
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    if book_id is not None:
-        query = """
-        SELECT
-            i.id,
-            i.title,
-            i.content,
-            i.book_id,
-            GROUP_CONCAT(r.tag_name, ';') AS tags,
-            COALESCE(SUM(iv.value), 0) AS score
-        FROM
-            ideas i
-        LEFT JOIN
-            relations r ON i.id = r.idea_id
-        LEFT JOIN
-            idea_votes iv ON i.id = iv.idea_id
-        WHERE
-            i.book_id = ?
-        GROUP BY
-            i.id, i.title, i.content, i.book_id;
-        """
-        df = pd.read_sql_query(query, conn, params=[book_id])
-    else:
-        query = """
-        SELECT
-            i.id,
-            i.title,
-            i.content,
-            i.book_id,
-            GROUP_CONCAT(r.tag_name, ';') AS tags,
-            COALESCE(SUM(iv.value), 0) AS score
-        FROM
-            ideas i
-        LEFT JOIN
-            relations r ON i.id = r.idea_id
-        LEFT JOIN
-            idea_votes iv ON i.id = iv.idea_id
-        GROUP BY
-            i.id, i.title, i.content, i.book_id;
-        """
-        df = pd.read_sql_query(query, conn)
-    conn.close()
+    book_filter = "WHERE book_id = ?" if book_id is not None else ""
+    query = f"""
+    WITH page AS (
+        SELECT id, title, content, book_id
+        FROM ideas
+        {book_filter}
+        ORDER BY id
+        LIMIT ? OFFSET ?
+    )
+    SELECT p.id, p.title, p.content, p.book_id,
+           (SELECT GROUP_CONCAT(r.tag_name, ';') FROM relations r WHERE r.idea_id = p.id) AS tags,
+           (SELECT COALESCE(SUM(iv.value), 0) FROM idea_votes iv WHERE iv.idea_id = p.id) AS score
+    FROM page p
+    ORDER BY p.id;
+    """
+    params: list = [book_id] if book_id is not None else []
+    # SQLite treats a negative LIMIT as "no limit"
+    params += [-1 if limit is None else limit, offset]
+    with get_conn() as conn:
+        df = pd.read_sql_query(query, conn, params=params)
 
     # Handle potential NaN values in the dataframe
     df = df.fillna('')
     return df.to_dict("records")
 
+def iter_ideas(
+    book_id: int | None = None, limit: int | None = None, offset: int = 0, chunksize: int = 500
+) -> Iterator[dict[str, Any]]:
+    """
+    Stream ideas with their tags without materializing the whole table.
+
+    Rows are pulled from the cursor ``chunksize`` at a time, so peak memory
+    is bounded by the chunk rather than by the size of the corpus. Paging is
+    applied in SQL, as in get_ideas, so skipped ideas are never read. Unlike
+    get_ideas, no vote score is computed.
+
+    Args:
+        book_id (int | None): Optional book ID to filter ideas by book
+        limit (int | None): Maximum number of ideas to yield, None for all
+        offset (int): Number of ideas to skip, in id order
+        chunksize (int): Number of rows fetched from SQLite per round trip
+
+    Yields:
+        dict[str, Any]: One idea with keys id, title, content, book_id and
+            tags (semicolon-separated, '' when the idea has none)
+    """
+    query = """
+    SELECT i.id, i.title, i.content, i.book_id,
+           COALESCE((SELECT GROUP_CONCAT(r.tag_name, ';') FROM relations r WHERE r.idea_id = i.id), '') AS tags
+    FROM ideas i
+    """
+    params: list = []
+    if book_id is not None:
+        query += "WHERE i.book_id = ?\n"
+        params.append(book_id)
+    query += "ORDER BY i.id\nLIMIT ? OFFSET ?"
+    # SQLite treats a negative LIMIT as "no limit"
+    params += [-1 if limit is None else limit, offset]
+    columns = ("id", "title", "content", "book_id", "tags")
+    with get_conn() as conn:
+        cursor = conn.execute(query, params)
+        while rows := cursor.fetchmany(chunksize):
+            for row in rows:
+                yield dict(zip(columns, row, strict=True))
+
 def get_user_ideas(user_email: str) -> list[dict[Hashable, Any]]:
     """
     Retrieve all ideas of a user from the database with limit to prevent memory issues.
@@ -232,27 +575,26 @@ def get_user_ideas(user_email: str) -> list[dict[Hashable, Any]]:
     Returns:
         list[dict[Hashable, Any]]: List of dictionaries containing all ideas
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    query = """
-    SELECT
-        i.id,
-        i.title,
-        i.content,
-        i.book_id,
-        GROUP_CONCAT(r.tag_name, ';') AS tags
-    FROM
-        ideas i
-    LEFT JOIN
-        relations r ON i.id = r.idea_id
-    JOIN
-        users u ON i.owner_id = u.id
-    WHERE
-        u.email = ?
-    GROUP BY
-        i.id, i.title, i.content, i.book_id;
-    """
-    df = pd.read_sql_query(query, conn, params=[user_email])
-    conn.close()
+    with get_conn() as conn:
+        query = """
+        SELECT
+            i.id,
+            i.title,
+            i.content,
+            i.book_id,
+            GROUP_CONCAT(r.tag_name, ';') AS tags
+        FROM
+            ideas i
+        LEFT JOIN
+            relations r ON i.id = r.idea_id
+        JOIN
+            users u ON i.owner_id = u.id
+        WHERE
+            u.email = ?
+        GROUP BY
+            i.id, i.title, i.content, i.book_id;
+        """
+        df = pd.read_sql_query(query, conn, params=[user_email])
 
     # Handle potential NaN values in the dataframe
     df = df.fillna('')
@@ -268,12 +610,11 @@ def get_content(idea_id: int) -> str:
         idea_id (int): ID of the idea to retrieve content for
         
     Returns:
-        str: content of the idea
+        str: content of the idea, or an empty string if the idea does not exist
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    df = pd.read_sql_query("SELECT content FROM ideas WHERE id=(?)", conn, params=[idea_id])
-    conn.close()
-    return df['content'].iloc[0]
+    with get_conn() as conn:
+        row = conn.execute(_SQL_SELECT_CONTENT, (idea_id,)).fetchone()
+    return row[0] if row else ''
 
 def get_tags(book_id: int | None = None) -> list[dict[Hashable, Any]]:
     """
@@ -287,19 +628,18 @@ def get_tags(book_id: int | None = None) -> list[dict[Hashable, Any]]:
     Returns:
         list[dict[Hashable, Any]]: List of dictionaries containing tags
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    if book_id is not None:
-        query = """
-        SELECT DISTINCT t.name FROM tags t
-        JOIN relations r ON t.name = r.tag_name
-        JOIN ideas i ON r.idea_id = i.id
-        WHERE i.book_id = ?
-        """
-        df = pd.read_sql_query(query, conn, params=[book_id])
-    else:
-        df = pd.read_sql_query("SELECT * FROM tags", conn)
-    conn.close()
-    return df.to_dict("records")
+    with get_conn() as conn:
+        if book_id is not None:
+            query = """
+            SELECT DISTINCT t.name FROM tags t
+            JOIN relations r ON t.name = r.tag_name
+            JOIN ideas i ON r.idea_id = i.id
+            WHERE i.book_id = ?
+            """
+            rows = conn.execute(query, (book_id,)).fetchall()
+        else:
+            rows = conn.execute("SELECT name FROM tags").fetchall()
+    return [{"name": name} for (name,) in rows]
 
 def get_tags_from_idea(idea: int):
     """
@@ -316,11 +656,31 @@ def get_tags_from_idea(idea: int):
     if not idea:
         return get_tags()
     else:
-        conn = sqlite3.connect(os.getenv('NAME_DB'))
-        query = "SELECT tag_name FROM relations WHERE idea_id = (?)"
-        df = pd.read_sql_query(query, conn, params=[idea])
-        conn.close()
-    return df['tag_name'].to_list()
+        with get_conn() as conn:
+            return [row[0] for row in conn.execute(_SQL_SELECT_IDEA_TAGS, (idea,))]
+
+def get_tags_from_ideas(idea_ids: list[int]) -> dict[int, list[str]]:
+    """
+    Retrieve the tags of several ideas in one query.
+
+    Use this instead of calling get_tags_from_idea in a loop, which costs one
+    connection checkout and one query per idea.
+
+    Args:
+        idea_ids (list[int]): Ids of the ideas to retrieve tags for
+
+    Returns:
+        dict[int, list[str]]: Tag names keyed by idea id; every requested id
+            is present, with an empty list when the idea has no tags
+    """
+    ids = list(dict.fromkeys(idea_ids))
+    if not ids:
+        return {}
+    tags: defaultdict[int, list[str]] = defaultdict(list)
+    with get_conn() as conn:
+        for idea_id, tag_name in conn.execute(_SQL_SELECT_TAGS_FOR_IDEAS, (json.dumps(ids),)):
+            tags[idea_id].append(tag_name)
+    return {idea_id: tags[idea_id] for idea_id in ids}
 
 def get_similar_idea(idea: str) -> list[dict[str, Any]]:
     """
@@ -334,96 +694,143 @@ def get_similar_idea(idea: str) -> list[dict[str, Any]]:
     Returns:
         list[dict[str, Any]]: List of dictionaries containing similar ideas
     """
-    logger.info(f"data_handler:get_similar_idea({idea})")
-    chroma = ChromaClient()
-    titles = chroma.get_similar_idea(idea)
+    logger.debug("data_handler:get_similar_idea(%s)", idea)
+    # Chroma document ids are ideas.id; anything else (e.g. a title id left
+    # by an index built before the switch) is ignored until the next rebuild.
+    ids = [int(i) for i in _get_chroma().get_similar_idea(idea) if i.isdigit()]
 
-    if not titles:  # Handle empty titles list
+    if not ids:  # Handle empty ids list
         return []
 
-    # Create placeholders for the IN clause
-    placeholders = ", ".join(["?"] * len(titles))
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    query = f"""
-    SELECT
-        i.id,
-        i.title,
-        i.content,
-        i.book_id,
-        GROUP_CONCAT(r.tag_name, ';') AS tags
-    FROM
-        ideas i
-    LEFT JOIN
-        relations r ON i.id = r.idea_id
-    WHERE
-        i.title IN ({placeholders})
-    GROUP BY
-        i.id, i.title, i.content, i.book_id;
-    """
-    df = pd.read_sql_query(query, conn, params=titles)
-    conn.close()
+    with get_conn() as conn:
+        df = pd.read_sql_query(_SQL_SELECT_IDEAS_BY_IDS, conn, params=(json.dumps(ids),))
     
     # Handle potential NaN values in the dataframe
     df = df.fillna('')
-    return df.to_dict("records")
+    # Keep Chroma's similarity ranking
+    rank = {idea_id: pos for pos, idea_id in enumerate(ids)}
+    return sorted(df.to_dict("records"), key=lambda row: rank[row["id"]])
 
 # ADD FUNCTIONS
+# Trigram tokens are three characters long: shorter words cannot be matched
+# through the index.
+_FTS_MIN_WORD = 3
+
+def _like_pattern(word: str) -> str:
+    """Escape LIKE wildcards in user input and wrap it for a substring match."""
+    escaped = word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def search_ideas_by_text(text: str, book_id: int | None = None, limit: int = 20) -> list[dict[Hashable, Any]]:
+    """
+    Substring search over idea titles and contents.
+
+    Uses the trigram ideas_fts index, ranked by bm25, so the cost does not
+    grow with a scan of the whole ideas table. Each word of ``text`` must
+    appear somewhere in the title or content, case-insensitively. Words
+    shorter than three characters cannot go through the trigram index;
+    such queries, like databases without the index, fall back to LIKE.
+
+    Args:
+        text (str): Words to look for
+        book_id (int | None): Optional book ID to filter ideas by book
+        limit (int): Maximum number of ideas to return
+
+    Returns:
+        list[dict[Hashable, Any]]: Matching ideas, best match first, with the
+            same keys as get_ideas
+    """
+    words = text.split()
+    if not words:
+        return []
+    book_filter = "AND i.book_id = ?" if book_id is not None else ""
+    book_params: list = [book_id] if book_id is not None else []
+    columns = """
+        i.id, i.title, i.content, i.book_id,
+        (SELECT GROUP_CONCAT(r.tag_name, ';') FROM relations r WHERE r.idea_id = i.id) AS tags,
+        (SELECT COALESCE(SUM(iv.value), 0) FROM idea_votes iv WHERE iv.idea_id = i.id) AS score
+    """
+    with get_conn() as conn:
+        if all(len(word) >= _FTS_MIN_WORD for word in words):
+            # Each word is a quoted phrase, so FTS5 syntax in the input is inert.
+            match = " ".join('"' + word.replace('"', '""') + '"' for word in words)
+            try:
+                df = pd.read_sql_query(f"""
+                SELECT {columns}
+                FROM ideas_fts
+                JOIN ideas i ON i.id = ideas_fts.rowid
+                WHERE ideas_fts MATCH ? {book_filter}
+                ORDER BY bm25(ideas_fts)
+                LIMIT ?;
+                """, conn, params=[match] + book_params + [limit])
+                return df.fillna('').to_dict("records")
+            except pd.errors.DatabaseError as e:
+                if "no such table" not in str(e):
+                    raise
+        word_filter = " AND ".join(["(i.title || ' ' || i.content) LIKE ? ESCAPE '\\'"] * len(words))
+        df = pd.read_sql_query(f"""
+        SELECT {columns}
+        FROM ideas i
+        WHERE {word_filter} {book_filter}
+        ORDER BY i.id
+        LIMIT ?;
+        """, conn, params=[_like_pattern(word) for word in words] + book_params + [limit])
+    return df.fillna('').to_dict("records")
+
 def add_idea(title: str, content: str, owner_email: str, book_id: int, tags: list[str] | None = None) -> int:
     """
     Add a new idea to the database.
 
-    Inserts a new record into the ideas table and adds the corresponding
-    embedding to the ChromaClient.
+    Inserts a new record into the ideas table, creates and links its tags
+    in the same transaction, and adds the corresponding embedding to the
+    ChromaClient.
 
     Args:
         title (str): Name of the idea to add
         content (str): content of the idea to add
         owner_email (str): Email of the idea's owner
         book_id (int): ID of the book this idea belongs to
-        tags (list[str] | None): Tags for the idea, used in ChromaDB metadata
+        tags (list[str] | None): Tags for the idea, stored as relations and
+            used in ChromaDB metadata
 
     Returns:
         int: the id of the new idea
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
-        # Get owner_id from email
-        cursor.execute(
-            "SELECT id FROM users WHERE email = ?",
-            (owner_email,)
-        )
-        result = cursor.fetchone()
-        if not result:
-            logger.info(f"Error: User with email '{owner_email}' not found.")
-            return -1
-        owner_id = result[0]
-
-        cursor.execute(
-            "INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-            (title, content, owner_id, book_id)
-        )
-        conn.commit()
-        new_id = cursor.lastrowid
-
-        _tags = tags or []
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
         try:
-            with ThreadPoolExecutor() as executor:
-                future = executor.submit(lambda: ChromaClient().insert_idea(title=title, content=content, tags=_tags))
-                future.result(timeout=30)
+            # Get owner_id from email
+            cursor.execute(_SQL_SELECT_USER_ID, (owner_email,))
+            result = cursor.fetchone()
+            if not result:
+                logger.info("Error: User with email '%s' not found.", owner_email)
+                return -1
+            owner_id = result[0]
+
+            cursor.execute(_SQL_INSERT_IDEA, (title, content, owner_id, book_id))
+            new_id = cursor.lastrowid
+            _attach_tags(cursor, new_id, tags or [])
+            conn.commit()
+        except sqlite3.IntegrityError:
+            logger.info("Error: idea '%s' already exists.", title)
+            return -1
         except Exception as e:
-            logger.info(f"Warning: ChromaDB embedding failed for '{title}': {e}")
+            logger.info("Error adding idea '%s': %s", title, e)
+            return -1
 
-        logger.info(f"idea '{title}' added successfully.")
-        return new_id
-    except sqlite3.IntegrityError:
-        logger.info(f"Error: idea '{title}' already exists.")
-        return -1
+    # The writer connection is released before embedding so other writes
+    # are not held up by the model.
+    _tags = tags or []
+    try:
+        future = _chroma_executor.submit(
+            _get_chroma().insert_idea, idea_id=new_id, title=title, content=content, tags=_tags
+        )
+        future.result(timeout=30)
     except Exception as e:
-        logger.info(f"Error adding idea '{title}': {e}")
-        return -1
-    finally:
-        conn.close()
+        logger.warning("Warning: ChromaDB embedding failed for '%s': %s", title, e)
+
+    logger.info("idea '%s' added successfully.", title)
+    return new_id
 
 def add_tag(name: str) -> None:
     """
@@ -437,19 +844,17 @@ def add_tag(name: str) -> None:
     Returns:
         None
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            "INSERT INTO tags (name) VALUES (?)",
-            (name,)
-        )
-        conn.commit()
-        logger.info(f"Tag '{name}' added successfully.")
-    except sqlite3.IntegrityError:
-        logger.info(f"Error : tag '{name}' already exists.")
-    finally:
-        conn.close()
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "INSERT INTO tags (name) VALUES (?)",
+                (name,)
+            )
+            conn.commit()
+            logger.info("Tag '%s' added successfully.", name)
+        except sqlite3.IntegrityError:
+            logger.info("Error : tag '%s' already exists.", name)
 
 def add_relation(idea_id: int, tag_name: str) -> None:
     """
@@ -464,19 +869,115 @@ def add_relation(idea_id: int, tag_name: str) -> None:
     Returns:
         None
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            "INSERT INTO relations (idea_id, tag_name) VALUES (?, ?)",
-            (idea_id, tag_name)
-        )
-        conn.commit()
-        logger.info(f"Relation between '{idea_id}' and '{tag_name}'  added successfully.")
-    except sqlite3.IntegrityError:
-        logger.info("Error : This relation already exists or foreign keys are unvalid.")
-    finally:
-        conn.close()
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "INSERT INTO relations (idea_id, tag_name) VALUES (?, ?)",
+                (idea_id, tag_name)
+            )
+            conn.commit()
+            logger.info("Relation between '%s' and '%s'  added successfully.", idea_id, tag_name)
+        except sqlite3.IntegrityError:
+            logger.info("Error : This relation already exists or foreign keys are unvalid.")
+
+def add_tags(names: list[str]) -> None:
+    """
+    Add several tags at once, skipping the ones that already exist.
+
+    Runs one prepared INSERT OR IGNORE through executemany inside a
+    single transaction, instead of one commit per tag.
+
+    Args:
+        names (list[str]): Names of the tags to add
+
+    Returns:
+        None
+    """
+    if not names:
+        return
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.executemany(_SQL_INSERT_TAG, ((name,) for name in names))
+            conn.commit()
+            logger.info("%s tags added successfully.", len(names))
+        except sqlite3.Error as e:
+            logger.info("Error when adding tags : %s", e)
+
+def add_relations(idea_id: int, tag_names: list[str]) -> None:
+    """
+    Link an idea to several tags at once, skipping existing relations.
+
+    Runs one prepared INSERT OR IGNORE through executemany inside a
+    single transaction, instead of one commit per tag.
+
+    Args:
+        idea_id (int): Id of the idea
+        tag_names (list[str]): Names of the tags to attach to the idea
+
+    Returns:
+        None
+    """
+    if not tag_names:
+        return
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.executemany(_SQL_INSERT_RELATION, ((idea_id, tag_name) for tag_name in tag_names))
+            conn.commit()
+            logger.info("%s relations of idea '%s' added successfully.", len(tag_names), idea_id)
+        except sqlite3.Error as e:
+            logger.info("Error when adding relations : %s", e)
+
+def add_tags_and_relations(idea_id: int, tag_names: list[str]) -> None:
+    """
+    Create any missing tags and link them all to an idea in one transaction.
+
+    Equivalent to add_tags followed by add_relations, but with a single
+    commit, so tagging an idea costs one fsync rather than two per tag.
+
+    Args:
+        idea_id (int): Id of the idea
+        tag_names (list[str]): Names of the tags to attach to the idea
+
+    Returns:
+        None
+    """
+    if not tag_names:
+        return
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            _attach_tags(cursor, idea_id, tag_names)
+            conn.commit()
+            logger.info("%s tags of idea '%s' added successfully.", len(tag_names), idea_id)
+        except sqlite3.Error as e:
+            logger.info("Error when adding tags of idea '%s' : %s", idea_id, e)
+
+def replace_tags(idea_id: int, tag_names: list[str]) -> None:
+    """
+    Replace the tags of an idea with exactly ``tag_names`` in one transaction.
+
+    Three set-based statements driven by json_each: detach every tag not in
+    the list, create missing tags, and link the listed ones. An empty list
+    detaches all of the idea's tags.
+
+    Args:
+        idea_id (int): Id of the idea
+        tag_names (list[str]): The idea's complete new set of tag names
+
+    Returns:
+        None
+    """
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            _replace_tags(cursor, idea_id, tag_names)
+            conn.commit()
+            logger.info("tags of idea '%s' replaced with %s tags.", idea_id, len(tag_names))
+        except sqlite3.Error as e:
+            logger.info("Error when replacing tags of idea '%s' : %s", idea_id, e)
 
 # REMOVE FUNCTIONS
 def remove_idea(id: int, title: str) -> None:
@@ -493,21 +994,16 @@ def remove_idea(id: int, title: str) -> None:
     Returns:
         None
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            "DELETE FROM ideas WHERE id = ?",
-            (id,)
-        )
-        conn.commit()
-        embedding = ChromaClient()
-        embedding.remove_idea(title=title)
-        logger.info(f"idea '{id}' removed successfully.")
-    except sqlite3.Error as e:
-        logger.info(f"Error deleting idea : {e}")
-    finally:
-        conn.close()
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(_SQL_DELETE_IDEA, (id,))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.info("Error deleting idea : %s", e)
+            return
+    _get_chroma().remove_idea(idea_id=id)
+    logger.info("idea '%s' (%s) removed successfully.", id, title)
 
 def remove_tag(name: str) -> None:
     """
@@ -521,19 +1017,17 @@ def remove_tag(name: str) -> None:
     Returns:
         None
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            "DELETE FROM tags WHERE name = ?",
-            (name,)
-        )
-        conn.commit()
-        logger.info(f"Tag '{name}' removed successfully.")
-    except sqlite3.Error as e:
-        logger.info(f"Error deleting tag : {e}")
-    finally:
-        conn.close()
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "DELETE FROM tags WHERE name = ?",
+                (name,)
+            )
+            conn.commit()
+            logger.info("Tag '%s' removed successfully.", name)
+        except sqlite3.Error as e:
+            logger.info("Error deleting tag : %s", e)
 
 def remove_relation(idea_id: int, tag_name: str) -> None:
     """
@@ -548,61 +1042,93 @@ def remove_relation(idea_id: int, tag_name: str) -> None:
     Returns:
         None
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            "DELETE FROM relations WHERE idea_id = ? AND tag_name = ?",
-            (idea_id, tag_name)
-        )
-        conn.commit()
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "DELETE FROM relations WHERE idea_id = ? AND tag_name = ?",
+                (idea_id, tag_name)
+            )
+            conn.commit()
         
-        logger.info(f"Relation between '{idea_id}' and '{tag_name}' removed successfully.")
-    except sqlite3.Error as e:
-        logger.info(f"Error when deleting relation : {e}")
-    finally:
-        conn.close()
+            logger.info("Relation between '%s' and '%s' removed successfully.", idea_id, tag_name)
+        except sqlite3.Error as e:
+            logger.info("Error when deleting relation : %s", e)
+
+def remove_relations(idea_id: int, tag_names: list[str]) -> None:
+    """
+    Remove several idea/tag relationships at once.
+
+    Runs one prepared DELETE through executemany inside a single
+    transaction, instead of one connection and commit per tag.
+
+    Args:
+        idea_id (int): Id of the idea
+        tag_names (list[str]): Names of the tags to detach from the idea
+
+    Returns:
+        None
+    """
+    if not tag_names:
+        return
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.executemany(_SQL_DELETE_RELATION, ((idea_id, tag_name) for tag_name in tag_names))
+            conn.commit()
+            logger.info("%s relations of idea '%s' removed successfully.", len(tag_names), idea_id)
+        except sqlite3.Error as e:
+            logger.info("Error when deleting relations : %s", e)
 
 def update_idea(id: int, title: str, content: str, tags: list[str] | None = None) -> None:
     """
     Update an existing idea in the database.
 
     Updates the content of an existing idea and updates the
-    corresponding embedding in the ChromaClient.
+    corresponding embedding in the ChromaClient. When tags are given, the
+    idea's relations are reconciled with them in the same transaction:
+    tags no longer listed are detached and new ones created and attached.
+    An empty or missing list leaves the existing relations untouched.
 
     Args:
         id (int): Id of the idea
         title (str): Name of the idea to update
         content (str): New content for the idea
-        tags (list[str] | None): Updated tags for the idea, used in ChromaDB metadata
+        tags (list[str] | None): Updated tags for the idea, stored as
+            relations and used in ChromaDB metadata
 
     Returns:
         None
     """
-    logger.info(f"update_idea {id}: {title} / {content}")
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
+    logger.debug("update_idea %s: %s / %s", id, title, content)
     _tags = tags or []
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(_SQL_UPDATE_IDEA, (content, title, id))
+            if _tags:
+                _replace_tags(cursor, id, _tags)
+            conn.commit()
+        except sqlite3.IntegrityError:
+            logger.info("Error : idea '%s' can't be updated.", id)
+            return
+        except Exception as e:
+            logger.info("Error updating embedding for '%s': %s", id, e)
+            return
+
     try:
-        cursor.execute(
-            "UPDATE ideas SET content = ?, title = ? WHERE id = ?",
-            (content, title, id)
+        # Embedding runs on the shared Chroma worker thread
+        future = _chroma_executor.submit(
+            _get_chroma().update_idea, idea_id=id, title=title, content=content, tags=_tags
         )
-        conn.commit()
-
-        # Run embedding update asynchronously using thread pool
-        with ThreadPoolExecutor() as executor:
-            future = executor.submit(lambda: ChromaClient().update_idea(title=title, content=content, tags=_tags))
-            # Wait for completion but don't block the main thread significantly
-            future.result(timeout=30)  # 30 second timeout
-            
-        logger.info(f"idea '{id}'  updated successfully.")
-    except sqlite3.IntegrityError:
-        logger.info(f"Error : idea '{id}' can't be updated.")
+        future.result(timeout=30)  # 30 second timeout
+
+        logger.info("idea '%s'  updated successfully.", id)
     except Exception as e:
-        logger.info(f"Error updating embedding for '{id}': {e}")
-    finally:
-        conn.close()
+        logger.info("Error updating embedding for '%s': %s", id, e)
+
+# Ideas embedded per ChromaClient.bulk_insert call when rebuilding the index.
+_EMBED_BATCH_SIZE = 500
 
 def embed_all_ideas() -> None:
     """
@@ -610,35 +1136,43 @@ def embed_all_ideas() -> None:
 
     Deletes the existing ChromaDB collection and rebuilds it from SQLite
     using bulk_insert to ensure embeddings, metadata, and tags are all in sync.
+    Ideas are streamed from SQLite with iter_ideas and sent in chunks of
+    ``_EMBED_BATCH_SIZE``, with progress logged after each one.
 
     Returns:
         None
     """
     try:
-        ideas = get_ideas()
-        total_items = len(ideas)
-        logger.info(f"Regenerating embeddings for {total_items} ideas...")
+        with get_conn() as conn:
+            total_items = conn.execute("SELECT COUNT(*) FROM ideas").fetchone()[0]
+        logger.info("Regenerating embeddings for %s ideas...", total_items)
         print(f"Regenerating embeddings for {total_items} ideas...")
 
         chroma = ChromaClient()
         # Delete the collection first to prevent duplicate-id errors and
         # index inconsistency from partial updates.
         chroma.client.delete_collection(chroma.collection.name)
-        chroma = ChromaClient()
-
-        bulk = [
-            {
-                "title": item["title"],
-                "description": item["content"],
-                "tags": [t for t in (item.get("tags") or "").split(";") if t],
-            }
-            for item in ideas
-        ]
-        chroma.bulk_insert(bulk)
+        _reset_chroma()
+        chroma = _get_chroma()
+
+        rows = iter_ideas(chunksize=_EMBED_BATCH_SIZE)
+        done = 0
+        while chunk := list(islice(rows, _EMBED_BATCH_SIZE)):
+            chroma.bulk_insert([
+                {
+                    "id": item["id"],
+                    "title": item["title"],
+                    "description": item["content"],
+                    "tags": [t for t in item["tags"].split(";") if t],
+                }
+                for item in chunk
+            ])
+            done += len(chunk)
+            logger.info("Embedded %s/%s ideas.", done, total_items)
         logger.info("Embedding regeneration completed successfully.")
 
     except Exception as e:
-        logger.info(f"Error in embed_all_ideas: {e}")
+        logger.info("Error in embed_all_ideas: %s", e)
         raise
 
 # BOOK FUNCTIONS
@@ -652,19 +1186,17 @@ def add_book(title: str) -> int:
     Returns:
         int: the id of the new book, or -1 on error
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
-        cursor.execute("INSERT INTO books (title) VALUES (?)", (title,))
-        conn.commit()
-        new_id = cursor.lastrowid
-        logger.info(f"Book '{title}' added successfully.")
-        return new_id
-    except sqlite3.Error as e:
-        logger.info(f"Error adding book '{title}': {e}")
-        return -1
-    finally:
-        conn.close()
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("INSERT INTO books (title) VALUES (?)", (title,))
+            conn.commit()
+            new_id = cursor.lastrowid
+            logger.info("Book '%s' added successfully.", title)
+            return new_id
+        except sqlite3.Error as e:
+            logger.info("Error adding book '%s': %s", title, e)
+            return -1
 
 
 def get_books() -> list[dict[Any, Any]]:
@@ -674,9 +1206,8 @@ def get_books() -> list[dict[Any, Any]]:
     Returns:
         list[dict]: List of dictionaries containing all books
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    df = pd.read_sql_query("SELECT id, title FROM books", conn)
-    conn.close()
+    with get_conn() as conn:
+        df = pd.read_sql_query("SELECT id, title FROM books", conn)
     return df.to_dict("records")
 
 
@@ -690,16 +1221,14 @@ def remove_book(book_id: int) -> None:
     Returns:
         None
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
-        cursor.execute("DELETE FROM books WHERE id = ?", (book_id,))
-        conn.commit()
-        logger.info(f"Book '{book_id}' removed successfully.")
-    except sqlite3.Error as e:
-        logger.info(f"Error deleting book: {e}")
-    finally:
-        conn.close()
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("DELETE FROM books WHERE id = ?", (book_id,))
+            conn.commit()
+            logger.info("Book '%s' removed successfully.", book_id)
+        except sqlite3.Error as e:
+            logger.info("Error deleting book: %s", e)
 
 
 def add_book_author(book_id: int, user_id: int) -> None:
@@ -713,19 +1242,17 @@ def add_book_author(book_id: int, user_id: int) -> None:
     Returns:
         None
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            "INSERT INTO book_authors (book_id, user_id) VALUES (?, ?)",
-            (book_id, user_id)
-        )
-        conn.commit()
-        logger.info(f"User '{user_id}' added as author of book '{book_id}'.")
-    except sqlite3.IntegrityError:
-        logger.info("Error: This book-author relation already exists or foreign keys are invalid.")
-    finally:
-        conn.close()
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "INSERT INTO book_authors (book_id, user_id) VALUES (?, ?)",
+                (book_id, user_id)
+            )
+            conn.commit()
+            logger.info("User '%s' added as author of book '%s'.", user_id, book_id)
+        except sqlite3.IntegrityError:
+            logger.info("Error: This book-author relation already exists or foreign keys are invalid.")
 
 
 def remove_book_author(book_id: int, user_id: int) -> None:
@@ -739,19 +1266,17 @@ def remove_book_author(book_id: int, user_id: int) -> None:
     Returns:
         None
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            "DELETE FROM book_authors WHERE book_id = ? AND user_id = ?",
-            (book_id, user_id)
-        )
-        conn.commit()
-        logger.info(f"User '{user_id}' removed from authors of book '{book_id}'.")
-    except sqlite3.Error as e:
-        logger.info(f"Error removing book author: {e}")
-    finally:
-        conn.close()
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "DELETE FROM book_authors WHERE book_id = ? AND user_id = ?",
+                (book_id, user_id)
+            )
+            conn.commit()
+            logger.info("User '%s' removed from authors of book '%s'.", user_id, book_id)
+        except sqlite3.Error as e:
+            logger.info("Error removing book author: %s", e)
 
 
 def get_book_authors(book_id: int) -> list[dict[Any, Any]]:
@@ -764,15 +1289,14 @@ def get_book_authors(book_id: int) -> list[dict[Any, Any]]:
     Returns:
         list[dict]: List of user dicts (id, username, email) who authored the book
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    query = """
-    SELECT u.id, u.username, u.email
-    FROM users u
-    JOIN book_authors ba ON u.id = ba.user_id
-    WHERE ba.book_id = ?
-    """
-    df = pd.read_sql_query(query, conn, params=[book_id])
-    conn.close()
+    with get_conn() as conn:
+        query = """
+        SELECT u.id, u.username, u.email
+        FROM users u
+        JOIN book_authors ba ON u.id = ba.user_id
+        WHERE ba.book_id = ?
+        """
+        df = pd.read_sql_query(query, conn, params=[book_id])
     return df.to_dict("records")
 
 
@@ -783,9 +1307,8 @@ def get_users() -> list[dict[Any, Any]]:
     Returns:
         list[dict]: List of user dicts containing id, username, email, and is_admin
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    df = pd.read_sql_query("SELECT id, username, email, is_admin FROM users", conn)
-    conn.close()
+    with get_conn() as conn:
+        df = pd.read_sql_query("SELECT id, username, email, is_admin FROM users", conn)
     return df.to_dict("records")
 
 
@@ -799,9 +1322,8 @@ def get_user_by_id(user_id: int) -> dict[Any, Any] | None:
     Returns:
         dict | None: User dict (id, username, email, is_admin) or None if not found.
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
+    with get_conn() as conn:
+        cursor = conn.cursor()
         cursor.execute(
             "SELECT id, username, email, is_admin FROM users WHERE id = ?",
             (user_id,)
@@ -810,8 +1332,6 @@ def get_user_by_id(user_id: int) -> dict[Any, Any] | None:
         if row is None:
             return None
         return {"id": row[0], "username": row[1], "email": row[2], "is_admin": bool(row[3])}
-    finally:
-        conn.close()
 
 
 def get_user_by_email(email: str) -> dict[Any, Any] | None:
@@ -824,9 +1344,8 @@ def get_user_by_email(email: str) -> dict[Any, Any] | None:
     Returns:
         dict | None: User dict (id, username, email, is_admin) or None if not found.
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
+    with get_conn() as conn:
+        cursor = conn.cursor()
         cursor.execute(
             "SELECT id, username, email, is_admin FROM users WHERE email = ?",
             (email,)
@@ -835,8 +1354,6 @@ def get_user_by_email(email: str) -> dict[Any, Any] | None:
         if row is None:
             return None
         return {"id": row[0], "username": row[1], "email": row[2], "is_admin": bool(row[3])}
-    finally:
-        conn.close()
 
 
 def create_user(username: str, email: str, is_admin: bool = False) -> dict[Any, Any]:
@@ -856,28 +1373,26 @@ def create_user(username: str, email: str, is_admin: bool = False) -> dict[Any,
     """
     from authenticator import generate_otp_secret, get_provisioning_uri
     otp_secret = generate_otp_secret()
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            "INSERT INTO users (username, email, hashed_password, is_admin) VALUES (?, ?, ?, ?)",
-            (username, email, otp_secret, int(is_admin))
-        )
-        conn.commit()
-        new_id = cursor.lastrowid
-        otp_uri = get_provisioning_uri(email, otp_secret)
-        logger.info(f"User '{email}' created successfully (admin={is_admin}).")
-        return {
-            "id": new_id,
-            "username": username,
-            "email": email,
-            "is_admin": is_admin,
-            "otp_uri": otp_uri,
-        }
-    except sqlite3.IntegrityError as e:
-        raise ValueError(f"User with this username or email already exists: {e}") from e
-    finally:
-        conn.close()
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "INSERT INTO users (username, email, hashed_password, is_admin) VALUES (?, ?, ?, ?)",
+                (username, email, otp_secret, int(is_admin))
+            )
+            conn.commit()
+            new_id = cursor.lastrowid
+            otp_uri = get_provisioning_uri(email, otp_secret)
+            logger.info("User '%s' created successfully (admin=%s).", email, is_admin)
+            return {
+                "id": new_id,
+                "username": username,
+                "email": email,
+                "is_admin": is_admin,
+                "otp_uri": otp_uri,
+            }
+        except sqlite3.IntegrityError as e:
+            raise ValueError(f"User with this username or email already exists: {e}") from e
 
 
 def update_user(user_id: int, username: str, email: str, is_admin: bool) -> bool:
@@ -896,22 +1411,20 @@ def update_user(user_id: int, username: str, email: str, is_admin: bool) -> bool
     Raises:
         ValueError: If the new username or email conflicts with an existing user.
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            "UPDATE users SET username = ?, email = ?, is_admin = ? WHERE id = ?",
-            (username, email, int(is_admin), user_id)
-        )
-        conn.commit()
-        updated = cursor.rowcount > 0
-        if updated:
-            logger.info(f"User '{user_id}' updated successfully.")
-        return updated
-    except sqlite3.IntegrityError as e:
-        raise ValueError(f"Username or email already taken: {e}") from e
-    finally:
-        conn.close()
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "UPDATE users SET username = ?, email = ?, is_admin = ? WHERE id = ?",
+                (username, email, int(is_admin), user_id)
+            )
+            conn.commit()
+            updated = cursor.rowcount > 0
+            if updated:
+                logger.info("User '%s' updated successfully.", user_id)
+            return updated
+        except sqlite3.IntegrityError as e:
+            raise ValueError(f"Username or email already taken: {e}") from e
 
 
 def delete_user(user_id: int) -> bool:
@@ -924,31 +1437,26 @@ def delete_user(user_id: int) -> bool:
     Returns:
         bool: True if a row was deleted, False if user not found.
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
-        cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
-        conn.commit()
-        deleted = cursor.rowcount > 0
-        if deleted:
-            logger.info(f"User '{user_id}' deleted successfully.")
-        return deleted
-    except sqlite3.Error as e:
-        logger.info(f"Error deleting user '{user_id}': {e}")
-        return False
-    finally:
-        conn.close()
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
+            conn.commit()
+            deleted = cursor.rowcount > 0
+            if deleted:
+                logger.info("User '%s' deleted successfully.", user_id)
+            return deleted
+        except sqlite3.Error as e:
+            logger.info("Error deleting user '%s': %s", user_id, e)
+            return False
 
 
 def count_admins() -> int:
     """Return the total number of admin users."""
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
+    with get_conn() as conn:
+        cursor = conn.cursor()
         cursor.execute("SELECT COUNT(*) FROM users WHERE is_admin = 1")
         return cursor.fetchone()[0]
-    finally:
-        conn.close()
 
 
 # VOTE FUNCTIONS
@@ -969,31 +1477,29 @@ def cast_vote(idea_id: int, user_email: str, value: int) -> bool:
     """
     if value not in (1, -1):
         return False
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
-        cursor.execute("SELECT id FROM users WHERE email = ?", (user_email,))
-        row = cursor.fetchone()
-        if not row:
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(_SQL_SELECT_USER_ID, (user_email,))
+            row = cursor.fetchone()
+            if not row:
+                return False
+            user_id = row[0]
+            cursor.execute(
+                """
+                INSERT INTO idea_votes (idea_id, user_id, value)
+                VALUES (?, ?, ?)
+                ON CONFLICT(idea_id, user_id) DO UPDATE SET value = excluded.value,
+                                                            created_at = datetime('now')
+                """,
+                (idea_id, user_id, value),
+            )
+            conn.commit()
+            logger.info("Vote (%s) cast by user '%s' on idea '%s'.", value, user_email, idea_id)
+            return True
+        except sqlite3.Error as e:
+            logger.info("Error casting vote: %s", e)
             return False
-        user_id = row[0]
-        cursor.execute(
-            """
-            INSERT INTO idea_votes (idea_id, user_id, value)
-            VALUES (?, ?, ?)
-            ON CONFLICT(idea_id, user_id) DO UPDATE SET value = excluded.value,
-                                                        created_at = datetime('now')
-            """,
-            (idea_id, user_id, value),
-        )
-        conn.commit()
-        logger.info(f"Vote ({value}) cast by user '{user_email}' on idea '{idea_id}'.")
-        return True
-    except sqlite3.Error as e:
-        logger.info(f"Error casting vote: {e}")
-        return False
-    finally:
-        conn.close()
 
 
 def remove_vote(idea_id: int, user_email: str) -> bool:
@@ -1007,26 +1513,24 @@ def remove_vote(idea_id: int, user_email: str) -> bool:
     Returns:
         bool: True on success, False if user not found
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
-        cursor.execute("SELECT id FROM users WHERE email = ?", (user_email,))
-        row = cursor.fetchone()
-        if not row:
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(_SQL_SELECT_USER_ID, (user_email,))
+            row = cursor.fetchone()
+            if not row:
+                return False
+            user_id = row[0]
+            cursor.execute(
+                "DELETE FROM idea_votes WHERE idea_id = ? AND user_id = ?",
+                (idea_id, user_id),
+            )
+            conn.commit()
+            logger.info("Vote removed by user '%s' on idea '%s'.", user_email, idea_id)
+            return True
+        except sqlite3.Error as e:
+            logger.info("Error removing vote: %s", e)
             return False
-        user_id = row[0]
-        cursor.execute(
-            "DELETE FROM idea_votes WHERE idea_id = ? AND user_id = ?",
-            (idea_id, user_id),
-        )
-        conn.commit()
-        logger.info(f"Vote removed by user '{user_email}' on idea '{idea_id}'.")
-        return True
-    except sqlite3.Error as e:
-        logger.info(f"Error removing vote: {e}")
-        return False
-    finally:
-        conn.close()
 
 
 def get_idea_votes(idea_id: int) -> dict[str, int]:
@@ -1040,17 +1544,14 @@ def get_idea_votes(idea_id: int) -> dict[str, int]:
         dict: {'score': int, 'count': int}
               score = SUM of all values (+1/-1), count = total number of votes
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
+    with get_conn() as conn:
+        cursor = conn.cursor()
         cursor.execute(
             "SELECT COALESCE(SUM(value), 0), COUNT(*) FROM idea_votes WHERE idea_id = ?",
             (idea_id,),
         )
         row = cursor.fetchone()
         return {"score": row[0], "count": row[1]}
-    finally:
-        conn.close()
 
 
 def get_user_vote(idea_id: int, user_email: str) -> int | None:
@@ -1064,9 +1565,8 @@ def get_user_vote(idea_id: int, user_email: str) -> int | None:
     Returns:
         int | None: 1, -1, or None if the user has not voted
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
+    with get_conn() as conn:
+        cursor = conn.cursor()
         cursor.execute(
             """
             SELECT v.value FROM idea_votes v
@@ -1077,8 +1577,6 @@ def get_user_vote(idea_id: int, user_email: str) -> int | None:
         )
         row = cursor.fetchone()
         return row[0] if row else None
-    finally:
-        conn.close()
 
 
 # IMPACT COMMENT FUNCTIONS
@@ -1093,14 +1591,11 @@ def get_idea_book_id(idea_id: int) -> int | None:
     Returns:
         int | None: book_id if found, None otherwise
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
+    with get_conn() as conn:
+        cursor = conn.cursor()
         cursor.execute("SELECT book_id FROM ideas WHERE id = ?", (idea_id,))
         row = cursor.fetchone()
         return row[0] if row else None
-    finally:
-        conn.close()
 
 
 def is_book_author(book_id: int, user_email: str) -> bool:
@@ -1114,9 +1609,8 @@ def is_book_author(book_id: int, user_email: str) -> bool:
     Returns:
         bool: True if the user is a book author, False otherwise
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
+    with get_conn() as conn:
+        cursor = conn.cursor()
         cursor.execute(
             """
             SELECT 1 FROM book_authors ba
@@ -1126,8 +1620,6 @@ def is_book_author(book_id: int, user_email: str) -> bool:
             (book_id, user_email),
         )
         return cursor.fetchone() is not None
-    finally:
-        conn.close()
 
 
 def create_impact_comment(idea_id: int, user_email: str, content: str) -> int | None:
@@ -1142,27 +1634,25 @@ def create_impact_comment(idea_id: int, user_email: str, content: str) -> int |
     Returns:
         int | None: ID of the new comment, or None if user not found
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
-        cursor.execute("SELECT id FROM users WHERE email = ?", (user_email,))
-        row = cursor.fetchone()
-        if not row:
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(_SQL_SELECT_USER_ID, (user_email,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            user_id = row[0]
+            cursor.execute(
+                "INSERT INTO impact_comments (idea_id, user_id, content) VALUES (?, ?, ?)",
+                (idea_id, user_id, content),
+            )
+            conn.commit()
+            comment_id = cursor.lastrowid
+            logger.info("Impact comment created by '%s' on idea '%s'.", user_email, idea_id)
+            return comment_id
+        except sqlite3.Error as e:
+            logger.info("Error creating impact comment: %s", e)
             return None
-        user_id = row[0]
-        cursor.execute(
-            "INSERT INTO impact_comments (idea_id, user_id, content) VALUES (?, ?, ?)",
-            (idea_id, user_id, content),
-        )
-        conn.commit()
-        comment_id = cursor.lastrowid
-        logger.info(f"Impact comment created by '{user_email}' on idea '{idea_id}'.")
-        return comment_id
-    except sqlite3.Error as e:
-        logger.info(f"Error creating impact comment: {e}")
-        return None
-    finally:
-        conn.close()
 
 
 def get_idea_impact_comments(idea_id: int) -> list[dict]:
@@ -1176,9 +1666,8 @@ def get_idea_impact_comments(idea_id: int) -> list[dict]:
         list[dict]: List of comment dicts with keys: id, idea_id, user_id,
                     username, user_email, content, created_at
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
+    with get_conn() as conn:
+        cursor = conn.cursor()
         cursor.execute(
             """
             SELECT ic.id, ic.idea_id, ic.user_id, u.username, u.email AS user_email,
@@ -1193,8 +1682,6 @@ def get_idea_impact_comments(idea_id: int) -> list[dict]:
         rows = cursor.fetchall()
         cols = ["id", "idea_id", "user_id", "username", "user_email", "content", "created_at"]
         return [dict(zip(cols, row, strict=True)) for row in rows]
-    finally:
-        conn.close()
 
 
 def get_book_impact_comments(book_id: int) -> list[dict]:
@@ -1208,9 +1695,8 @@ def get_book_impact_comments(book_id: int) -> list[dict]:
         list[dict]: List of comment dicts with keys: id, idea_id, idea_title,
                     username, content, created_at
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
+    with get_conn() as conn:
+        cursor = conn.cursor()
         cursor.execute(
             """
             SELECT ic.id, ic.idea_id, i.title AS idea_title, u.username,
@@ -1226,8 +1712,6 @@ def get_book_impact_comments(book_id: int) -> list[dict]:
         rows = cursor.fetchall()
         cols = ["id", "idea_id", "idea_title", "username", "content", "created_at"]
         return [dict(zip(cols, row, strict=True)) for row in rows]
-    finally:
-        conn.close()
 
 
 def update_impact_comment(comment_id: int, user_email: str, content: str) -> bool:
@@ -1242,24 +1726,22 @@ def update_impact_comment(comment_id: int, user_email: str, content: str) -> boo
     Returns:
         bool: True if updated, False if not found or not the owner
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            """
-            UPDATE impact_comments
-            SET content = ?
-            WHERE id = ? AND user_id = (SELECT id FROM users WHERE email = ?)
-            """,
-            (content, comment_id, user_email),
-        )
-        conn.commit()
-        return cursor.rowcount > 0
-    except sqlite3.Error as e:
-        logger.info(f"Error updating impact comment: {e}")
-        return False
-    finally:
-        conn.close()
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                """
+                UPDATE impact_comments
+                SET content = ?
+                WHERE id = ? AND user_id = (SELECT id FROM users WHERE email = ?)
+                """,
+                (content, comment_id, user_email),
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            logger.info("Error updating impact comment: %s", e)
+            return False
 
 
 def delete_impact_comment(comment_id: int, user_email: str, is_admin: bool) -> bool:
@@ -1276,26 +1758,24 @@ def delete_impact_comment(comment_id: int, user_email: str, is_admin: bool) -> b
     Returns:
         bool: True if deleted, False if not found or not authorized
     """
-    conn = sqlite3.connect(os.getenv('NAME_DB'))
-    cursor = conn.cursor()
-    try:
-        if is_admin:
-            cursor.execute("DELETE FROM impact_comments WHERE id = ?", (comment_id,))
-        else:
-            cursor.execute(
-                """
-                DELETE FROM impact_comments
-                WHERE id = ? AND user_id = (SELECT id FROM users WHERE email = ?)
-                """,
-                (comment_id, user_email),
-            )
-        conn.commit()
-        return cursor.rowcount > 0
-    except sqlite3.Error as e:
-        logger.info(f"Error deleting impact comment: {e}")
-        return False
-    finally:
-        conn.close()
+    with get_conn(write=True) as conn:
+        cursor = conn.cursor()
+        try:
+            if is_admin:
+                cursor.execute("DELETE FROM impact_comments WHERE id = ?", (comment_id,))
+            else:
+                cursor.execute(
+                    """
+                    DELETE FROM impact_comments
+                    WHERE id = ? AND user_id = (SELECT id FROM users WHERE email = ?)
+                    """,
+                    (comment_id, user_email),
+                )
+            conn.commit()
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            logger.info("Error deleting impact comment: %s", e)
+            return False
 
 
 if __name__ == "__main__":
@@ -1,14 +1,19 @@
 import re
 import os
-import json
+import gzip
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
+import orjson
 from dataclasses import dataclass, field
 from typing import Any, Protocol, TYPE_CHECKING
 
 import umap
 import hdbscan
-from sklearn.cluster import AgglomerativeClustering
+from sklearn.cluster import AgglomerativeClustering, MiniBatchKMeans
 from sklearn.metrics import silhouette_score
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.feature_extraction.text import TfidfVectorizer
@@ -30,7 +35,7 @@ class IdeaData:
     """Raw ideas fetched from the vector store, kept together for cohesion."""
     documents: list[str]
     ids: list[str]
-    embeddings: list[list[float]]
+    embeddings: np.ndarray  # float32, shape (n_ideas, dim)
     metadatas: list[dict[str, str]]
 
 
@@ -108,12 +113,23 @@ class TocCachePort(Protocol):
 
 class FileTocCache:
     """
-    Persist and restore the TOC structure as a JSON file.
+    Persist and restore the TOC structure as a JSON file (gzipped when large).
 
     The path is resolved at construction time so that a missing environment
     variable raises immediately rather than failing silently at runtime.
+
+    Parsed structures are memoised per path and keyed by the file's
+    modification time and size, so repeated loads of an unchanged file cost
+    one stat() instead of a read, gunzip and parse. The same key is exposed
+    as an HTTP ETag.
     """
 
+    _GZIP_THRESHOLD: int = 64 * 1024  # bytes of JSON above which the file is gzipped
+    _GZIP_MAGIC: bytes = b"\x1f\x8b"
+
+    _memo: dict[str, tuple[tuple[int, int], list[dict]]] = {}
+    _memo_lock = threading.Lock()
+
     def __init__(self, cache_path: str | None = None) -> None:
         self._path: str = cache_path or os.getenv("TOC_CACHE_PATH", "")
         if not self._path:
@@ -123,21 +139,105 @@ class FileTocCache:
             )
 
     def save(self, structure: list[dict]) -> None:
+        # orjson produces the compact UTF-8 payload in one call; large trees
+        # are gzipped (level 1 – the text is repetitive, so even the fastest
+        # level shrinks it several times). The file is written next to the
+        # target and swapped in with os.replace, so a concurrent load never
+        # sees a half-written cache.
+        payload = orjson.dumps(structure, option=orjson.OPT_SERIALIZE_NUMPY)
+        if len(payload) > self._GZIP_THRESHOLD:
+            payload = gzip.compress(payload, compresslevel=1)
+        tmp_path = f"{self._path}.tmp"
         try:
-            with open(self._path, "w") as f:
-                json.dump(structure, f)
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, self._path)
             logger.debug("TOC structure saved to %s", self._path)
         except OSError as exc:
             logger.error("Error saving TOC structure: %s", exc)
+        finally:
+            with self._memo_lock:
+                self._memo.pop(self._path, None)
+
+    def _version(self) -> tuple[int, int] | None:
+        try:
+            st = os.stat(self._path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def etag(self) -> str | None:
+        """Return a validator for the current cache file, or None when there is none."""
+        version = self._version()
+        if version is None:
+            return None
+        return f'"{version[0]:x}-{version[1]:x}"'
 
     def load(self) -> list[dict] | None:
+        version = self._version()
+        if version is None:
+            return None
+        with self._memo_lock:
+            memo = self._memo.get(self._path)
+        if memo is not None and memo[0] == version:
+            return memo[1]
         try:
-            if os.path.exists(self._path):
-                with open(self._path, "r") as f:
-                    return json.load(f)
-        except (OSError, json.JSONDecodeError) as exc:
+            with open(self._path, "rb") as f:
+                payload = f.read()
+            if payload.startswith(self._GZIP_MAGIC):
+                payload = gzip.decompress(payload)
+            structure = orjson.loads(payload)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, orjson.JSONDecodeError) as exc:
             logger.error("Error loading TOC structure: %s", exc)
-        return None
+            return None
+        with self._memo_lock:
+            self._memo[self._path] = (version, structure)
+        return structure
+
+
+# ---------------------------------------------------------------------------
+# UMAP reduction cache – skip refitting on unchanged embeddings
+# ---------------------------------------------------------------------------
+
+_UMAP_CACHE_SIZE = 8
+_umap_cache: OrderedDict[tuple, np.ndarray] = OrderedDict()
+_umap_cache_lock = threading.Lock()
+
+
+def _umap_reduce(X: np.ndarray, n_neighbors: int, n_components: int, random_state: int) -> np.ndarray:
+    """
+    Project *X* with a seeded cosine UMAP, reusing the result for identical input.
+
+    The fit is deterministic for a given seed, so a TOC refresh over the same
+    ideas (or a chapter whose members did not change) gets the previous
+    projection back instead of paying for another fit_transform. Entries are
+    keyed by a digest of the float32 bytes and the UMAP parameters, and the
+    least recently used one is dropped beyond _UMAP_CACHE_SIZE.
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    key = (hashlib.sha1(X.tobytes(), usedforsecurity=False).hexdigest(), X.shape,
+           n_neighbors, n_components, random_state)
+    with _umap_cache_lock:
+        cached = _umap_cache.get(key)
+        if cached is not None:
+            _umap_cache.move_to_end(key)
+            return cached
+
+    reduced = umap.UMAP(
+        n_neighbors=n_neighbors,
+        n_components=n_components,
+        metric="cosine",
+        low_memory=True,
+        random_state=random_state,
+    ).fit_transform(X)
+
+    with _umap_cache_lock:
+        _umap_cache[key] = reduced
+        while len(_umap_cache) > _UMAP_CACHE_SIZE:
+            _umap_cache.popitem(last=False)
+    return reduced
 
 
 # ---------------------------------------------------------------------------
@@ -162,7 +262,7 @@ class EmbeddingAnalyzer:
         self._min_cluster_size = min_cluster_size
 
     def analyze(self, embeddings: list[list[float]]) -> ClusteringResult:
-        X = np.array(embeddings, dtype="float32")
+        X = np.asarray(embeddings, dtype=np.float32)
         n = len(X)
 
         if n < self._min_cluster_size * 2:
@@ -177,13 +277,7 @@ class EmbeddingAnalyzer:
         logger.debug("EmbeddingAnalyzer: reducing %d embeddings with UMAP", n)
         n_neighbors = max(2, min(self._UMAP_NEIGHBORS, n - 1))
         n_components = max(1, min(self._UMAP_COMPONENTS, n - 2))
-        reduced = umap.UMAP(
-            n_neighbors=n_neighbors,
-            n_components=n_components,
-            metric="cosine",
-            low_memory=True,
-            random_state=self._RANDOM_STATE,
-        ).fit_transform(X)
+        reduced = _umap_reduce(X, n_neighbors, n_components, self._RANDOM_STATE)
 
         logger.debug("EmbeddingAnalyzer: fitting HDBSCAN")
         clusterer = hdbscan.HDBSCAN(
@@ -224,7 +318,9 @@ class ConstrainedClusteringAnalyzer:
     Algorithm:
     1. Reduce with UMAP (cosine metric, 5 components).
     2. Try each k in [min_clusters, max_clusters]; pick the k that maximises
-       the silhouette score (Ward linkage ensures compact, convex clusters).
+       the silhouette score (Ward linkage ensures compact, convex clusters;
+       large inputs use MiniBatchKMeans, which optimises the same criterion
+       without the O(n²) distance matrix).
     3. Compute originality as the normalised Euclidean distance from each
        point's cluster centroid, normalised per cluster so large clusters do
        not inflate originality scores relative to small ones.
@@ -238,13 +334,15 @@ class ConstrainedClusteringAnalyzer:
     _UMAP_COMPONENTS: int = 5
     _RANDOM_STATE: int = 42
     _FALLBACK_THRESHOLD: int = 4  # points below this → skip clustering
+    _AGGLOMERATIVE_MAX_POINTS: int = 2000  # above this → MiniBatchKMeans; Ward is as fast below it
+    _SILHOUETTE_SAMPLE: int = 2000  # silhouette is O(n²); sample above this
 
     def __init__(self, min_clusters: int = 5, max_clusters: int = 10) -> None:
         self._min_clusters = min_clusters
         self._max_clusters = max_clusters
 
     def analyze(self, embeddings: list[list[float]]) -> ClusteringResult:
-        X = np.array(embeddings, dtype="float32")
+        X = np.asarray(embeddings, dtype=np.float32)
         n = len(X)
 
         if n < self._FALLBACK_THRESHOLD:
@@ -261,13 +359,7 @@ class ConstrainedClusteringAnalyzer:
         )
         n_neighbors = max(2, min(self._UMAP_NEIGHBORS, n - 1))
         n_components = max(1, min(self._UMAP_COMPONENTS, n - 2))
-        reduced = umap.UMAP(
-            n_neighbors=n_neighbors,
-            n_components=n_components,
-            metric="cosine",
-            low_memory=True,
-            random_state=self._RANDOM_STATE,
-        ).fit_transform(X)
+        reduced = _umap_reduce(X, n_neighbors, n_components, self._RANDOM_STATE)
 
         k_min = max(2, min(self._min_clusters, n // 2))
         k_max = max(k_min, min(self._max_clusters, n - 1))
@@ -281,15 +373,28 @@ class ConstrainedClusteringAnalyzer:
         return ClusteringResult(labels=labels, originalities=originalities)
 
     def _best_k_labels(self, X: np.ndarray, k_min: int, k_max: int) -> np.ndarray:
-        """Pick k in [k_min, k_max] that maximises the silhouette score."""
+        """Pick k in [k_min, k_max] that maximises the silhouette score.
+
+        Ward linkage needs the full pairwise distance matrix, so beyond
+        _AGGLOMERATIVE_MAX_POINTS points MiniBatchKMeans (which minimises the
+        same within-cluster variance) is used instead, and the silhouette is
+        estimated on a fixed-size sample.
+        """
         best_score = -2.0
         best_labels: np.ndarray = np.zeros(len(X), dtype=int)
+        large = len(X) > self._AGGLOMERATIVE_MAX_POINTS
+        sample_size = self._SILHOUETTE_SAMPLE if len(X) > self._SILHOUETTE_SAMPLE else None
 
         for k in range(k_min, k_max + 1):
-            lbls = AgglomerativeClustering(n_clusters=k, linkage="ward").fit_predict(X)
+            if large:
+                lbls = MiniBatchKMeans(
+                    n_clusters=k, batch_size=1024, n_init="auto", random_state=self._RANDOM_STATE,
+                ).fit_predict(X)
+            else:
+                lbls = AgglomerativeClustering(n_clusters=k, linkage="ward").fit_predict(X)
             if len(np.unique(lbls)) < 2:
                 continue
-            score = float(silhouette_score(X, lbls))
+            score = float(silhouette_score(X, lbls, sample_size=sample_size, random_state=self._RANDOM_STATE))
             if score > best_score:
                 best_score = score
                 best_labels = lbls
@@ -334,6 +439,12 @@ class TitleGenerator:
     _MAX_FEATURES: int = 40
     _TITLE_TERMS: int = 3
     _PUNCTUATION_RE = re.compile(r"[^\w\s]")
+    _VECTORIZER_PARAMS: dict[str, Any] = {
+        "stop_words": "english",
+        "ngram_range": (1, 2),
+        "max_features": _MAX_FEATURES,
+        "sublinear_tf": True,
+    }
 
     def generate(self, cluster_docs: list[str]) -> str:
         """
@@ -351,12 +462,9 @@ class TitleGenerator:
         clean = [self._PUNCTUATION_RE.sub(" ", d.lower()) for d in cluster_docs]
 
         try:
-            vectorizer = TfidfVectorizer(
-                stop_words="english",
-                ngram_range=(1, 2),
-                max_features=self._MAX_FEATURES,
-                sublinear_tf=True,
-            )
+            # A fresh vectorizer per call: fitting mutates it, and titles may be
+            # generated from several threads.
+            vectorizer = TfidfVectorizer(**self._VECTORIZER_PARAMS)
             tfidf_matrix = vectorizer.fit_transform(clean)
             terms = vectorizer.get_feature_names_out()
             mean_scores = np.asarray(tfidf_matrix.mean(axis=0)).flatten()
@@ -372,15 +480,22 @@ class TitleGenerator:
             return f"Section: {cluster_docs[0][:30]}…"
 
     def _pick_non_redundant_terms(self, sorted_terms: np.ndarray) -> list[str]:
-        """Greedy selection: skip any term whose words overlap an already-selected term."""
+        """Greedy selection: skip any term whose words overlap an already-selected term.
+
+        The words of every selected term are kept in one running set, so each
+        candidate is a single isdisjoint check instead of a scan over the
+        terms picked so far.
+        """
         selected: list[str] = []
+        used_words: set[str] = set()
         for term in sorted_terms:
             if len(selected) >= self._TITLE_TERMS:
                 break
-            words = set(term.split())
-            if any(words & set(s.split()) for s in selected):
+            words = term.split()
+            if not used_words.isdisjoint(words):
                 continue
             selected.append(term)
+            used_words.update(words)
         return selected
 
 
@@ -442,6 +557,9 @@ class TocTreeBuilder:
     _MIN_LEAF_SIZE: int = 3
     _CHAPTER_THRESHOLD: int = 5   # sections with > this many ideas get chapters
     _DEFAULT_MAX_DEPTH: int = 2
+    # Below this many ideas a thread pool costs more than it saves.
+    _PARALLEL_MIN_IDEAS: int = 200
+    _MAX_CHAPTER_WORKERS: int = min(os.cpu_count() or 1, 4)
 
     def __init__(
         self,
@@ -478,7 +596,9 @@ class TocTreeBuilder:
         """
         docs = data.documents
         ids = data.ids
-        embeddings = data.embeddings
+        # Converted once here; sections below take row subsets by fancy
+        # indexing instead of rebuilding the matrix from Python lists.
+        embeddings = np.asarray(data.embeddings, dtype=np.float32)
         metadatas = data.metadatas
         n = len(docs)
 
@@ -500,30 +620,31 @@ class TocTreeBuilder:
         noise_idx = np.where(result.labels == -1)[0]
         for i in noise_idx:
             entries.append(TocEntry(
-                title=ids[i],
+                title=metadatas[i].get("title", ids[i]),
                 text=metadatas[i].get("description", ""),
                 type="idea",
                 id=ids[i],
                 originality=self._fmt_pct(float(result.originalities[i])),
             ))
 
-        # Collect per-section data for batch title generation.
-        section_data: list[dict] = []  # parallel with section_entries below
-        section_entries: list[TocEntry] = []
-
+        sections = []
         for label in real_clusters:
             idx = np.where(result.labels == label)[0]
-            sec_docs = [docs[i] for i in idx]
-            sec_ids = [ids[i] for i in idx]
-            sec_emb = [embeddings[i] for i in idx]
-            sec_orig = result.originalities[idx]
-            sec_meta = [metadatas[i] for i in idx]
+            sections.append((
+                [docs[i] for i in idx],
+                [ids[i] for i in idx],
+                embeddings[idx],
+                result.originalities[idx],
+                [metadatas[i] for i in idx],
+            ))
 
-            if max_depth >= 2 and len(sec_ids) > self._CHAPTER_THRESHOLD:
-                children = self._build_chapters(sec_docs, sec_ids, sec_emb, sec_meta)
-            else:
-                children = self._make_leaves(sec_docs, sec_ids, sec_orig, sec_meta)
+        children_per_section = self._build_sections_children(sections, max_depth, n)
+
+        # Collect per-section data for batch title generation.
+        section_data: list[dict] = []  # parallel with section_entries below
+        section_entries: list[TocEntry] = []
 
+        for (sec_docs, sec_ids, _, sec_orig, _), children in zip(sections, children_per_section, strict=True):
             # Placeholder title – will be replaced by LLM or TF-IDF below.
             section_entries.append(TocEntry(
                 title="",
@@ -554,6 +675,32 @@ class TocTreeBuilder:
     # Private helpers
     # ------------------------------------------------------------------
 
+    def _build_sections_children(
+        self,
+        sections: list[tuple[list[str], list[str], np.ndarray, np.ndarray, list[dict[str, str]]]],
+        max_depth: int,
+        n: int,
+    ) -> list[list[TocEntry]]:
+        """
+        Build the children of every section, in section order.
+
+        Sections are independent, so on large inputs their chapter builds run
+        on a thread pool: UMAP, HDBSCAN and sklearn spend most of their time
+        in native code that releases the GIL. Results are collected in
+        submission order, so the tree is the same as a serial build.
+        """
+        def build_one(section) -> list[TocEntry]:
+            sec_docs, sec_ids, sec_emb, sec_orig, sec_meta = section
+            if max_depth >= 2 and len(sec_ids) > self._CHAPTER_THRESHOLD:
+                return self._build_chapters(sec_docs, sec_ids, sec_emb, sec_meta)
+            return self._make_leaves(sec_docs, sec_ids, sec_orig, sec_meta)
+
+        workers = min(self._MAX_CHAPTER_WORKERS, len(sections))
+        if max_depth < 2 or n < self._PARALLEL_MIN_IDEAS or workers <= 1:
+            return [build_one(section) for section in sections]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="toc-chapters") as pool:
+            return list(pool.map(build_one, sections))
+
     def _generate_section_titles(
         self, section_data: list[dict],
     ) -> list[str]:
@@ -573,7 +720,7 @@ class TocTreeBuilder:
         self,
         docs: list[str],
         ids: list[str],
-        embeddings: list[list[float]],
+        embeddings: np.ndarray,
         metadatas: list[dict[str, str]],
     ) -> list[TocEntry]:
         """Sub-cluster a section into chapter headings (level 2)."""
@@ -590,7 +737,7 @@ class TocTreeBuilder:
         noise_idx = np.where(result.labels == -1)[0]
         for i in noise_idx:
             chapters.append(TocEntry(
-                title=ids[i],
+                title=metadatas[i].get("title", ids[i]),
                 text=metadatas[i].get("description", ""),
                 type="idea",
                 id=ids[i],
@@ -623,7 +770,7 @@ class TocTreeBuilder:
     ) -> list[TocEntry]:
         return [
             TocEntry(
-                title=id_,
+                title=meta.get("title", id_),
                 text=meta.get("description", ""),
                 type="idea",
                 id=id_,
@@ -651,8 +798,14 @@ class DataSimilarity:
     Default wiring uses ConstrainedClusteringAnalyzer (two separate instances for
     sections and chapters) which produces structured, book-like TOC hierarchies
     with 5-10 sections and 2-4 chapters each.
+
+    Generation takes minutes, so it is serialised process-wide: requests
+    that miss the cache while a build is running wait for it and reuse its
+    result instead of starting their own.
     """
 
+    _generation_lock = threading.RLock()
+
     def __init__(
         self,
         repository: IdeaRepository | None = None,
@@ -698,11 +851,35 @@ class DataSimilarity:
         Returns:
             JSON-serialisable list-of-dicts representing the idea tree.
         """
+        with self._generation_lock:
+            return self._generate_toc_structure()
+
+    def load_or_generate_toc_structure(self) -> list[dict]:
+        """
+        Return the cached TOC, building it first only if no cache exists.
+
+        A caller that waits on a build already in progress gets that build's
+        result from the cache rather than generating the tree a second time.
+
+        Returns:
+            JSON-serialisable list-of-dicts representing the idea tree.
+        """
+        cached = self._cache.load()
+        if cached is not None:
+            return cached
+        with self._generation_lock:
+            cached = self._cache.load()
+            if cached is not None:
+                return cached
+            return self._generate_toc_structure()
+
+    def _generate_toc_structure(self) -> list[dict]:
         raw = self._repo.get_all_ideas()
         data = IdeaData(
             documents=raw["documents"],
             ids=raw["ids"],
-            embeddings=raw["embeddings"],
+            # No copy when the repository already returns float32 rows.
+            embeddings=np.asarray(raw["embeddings"], dtype=np.float32),
             metadatas=raw["metadatas"],
         )
 
@@ -78,11 +78,12 @@ def main() -> None:
 
     ideas = [
         {
+            "id": idea_id,
             "title": title,
             "description": content,
             "tags": [t for t in tags_str.split(";") if t],
         }
-        for _idea_id, title, content, tags_str in rows
+        for idea_id, title, content, tags_str in rows
     ]
 
     chroma.bulk_insert(ideas)
@@ -0,0 +1,83 @@
+import threading
+from typing import Any
+
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour memo for queries that are answered from an embedding.
+
+    Cached query embeddings live L2-normalised in one float32 matrix, so a
+    lookup is a single matrix-vector product followed by an argmax. A query
+    whose cosine similarity to a cached one reaches ``threshold`` gets that
+    entry's payload back.
+
+    The matrix grows by doubling up to ``max_entries`` rows; after that the
+    least recently used entry (added or hit longest ago) is overwritten. At
+    this size the brute-force product, and the argmin that picks the victim,
+    take microseconds, so no approximate index is needed.
+
+    All methods are thread-safe.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 1024) -> None:
+        self._threshold = threshold
+        self._max_entries = max_entries
+        self._matrix: np.ndarray | None = None
+        self._payloads: list[Any] = []
+        self._last_used = np.zeros(max_entries, dtype=np.int64)  # tick of each slot's last add or hit
+        self._tick = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+    @staticmethod
+    def _normalize(embedding: Any) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else vector
+
+    def lookup(self, embedding: Any) -> Any | None:
+        """Return the payload of the most similar cached query, or None below the threshold."""
+        query = self._normalize(embedding)
+        with self._lock:
+            size = len(self._payloads)
+            if size == 0 or self._matrix is None or self._matrix.shape[1] != query.shape[0]:
+                return None
+            sims = self._matrix[:size] @ query
+            best = int(np.argmax(sims))
+            if sims[best] >= self._threshold:
+                self._tick += 1
+                self._last_used[best] = self._tick
+                return self._payloads[best]
+        return None
+
+    def add(self, embedding: Any, payload: Any) -> None:
+        """Remember ``payload`` as the answer for queries close to ``embedding``."""
+        vector = self._normalize(embedding)
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != vector.shape[0]:
+                self._matrix = np.empty((min(16, self._max_entries), vector.shape[0]), dtype=np.float32)
+                self._payloads = []
+            size = len(self._payloads)
+            self._tick += 1
+            if size < self._max_entries:
+                if size == self._matrix.shape[0]:
+                    grown = np.empty((min(size * 2, self._max_entries), self._matrix.shape[1]), dtype=np.float32)
+                    grown[:size] = self._matrix
+                    self._matrix = grown
+                self._matrix[size] = vector
+                self._payloads.append(payload)
+                self._last_used[size] = self._tick
+            else:
+                victim = int(np.argmin(self._last_used))
+                self._matrix[victim] = vector
+                self._payloads[victim] = payload
+                self._last_used[victim] = self._tick
+
+    def clear(self) -> None:
+        """Forget every entry, e.g. after the underlying collection changed."""
+        with self._lock:
+            self._payloads = []
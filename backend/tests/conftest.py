@@ -12,6 +12,7 @@ real library is installed and already imported by the time this fixture runs, it
 is left alone.
 """
 
+import shutil
 import sys
 import pytest
 from unittest.mock import MagicMock
@@ -44,3 +45,55 @@ def patch_ml_modules():
 
     for mod in injected:
         sys.modules.pop(mod, None)
+
+
+@pytest.fixture(autouse=True)
+def close_db_pools():
+    """Drop pooled SQLite connections after each test.
+
+    Tests point NAME_DB at a fresh file and delete it afterwards; a pooled
+    connection kept across tests would still hold the deleted file open.
+    data_handler is importable both as ``backend.data_handler`` and as
+    ``data_handler`` (via main.py), so both copies are closed.
+    """
+    yield
+    for name in ("backend.data_handler", "data_handler"):
+        module = sys.modules.get(name)
+        if module is not None:
+            module.close_pools()
+
+
+@pytest.fixture(autouse=True)
+def reset_login_throttle():
+    """Forget failed logins after each test so one test cannot get another throttled."""
+    yield
+    for name in ("backend.authenticator", "authenticator"):
+        module = sys.modules.get(name)
+        if module is not None:
+            module.reset_login_failures()
+
+
+@pytest.fixture(scope="session")
+def schema_template(tmp_path_factory):
+    """Build the SQLite schema once per session and return the file's path.
+
+    init_database() runs every CREATE, index and FTS statement; copying the
+    finished file is cheaper than replaying them for each test.
+    """
+    from backend import data_handler
+
+    path = tmp_path_factory.mktemp("schema") / "template.db"
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("NAME_DB", str(path))
+        data_handler.init_database()
+        data_handler.close_pools()
+    return path
+
+
+@pytest.fixture
+def test_db(schema_template, tmp_path, monkeypatch):
+    """Point NAME_DB at a fresh copy of the schema template and return its path."""
+    path = tmp_path / "test.db"
+    shutil.copyfile(schema_template, path)
+    monkeypatch.setenv("NAME_DB", str(path))
+    return str(path)
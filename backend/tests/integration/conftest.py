@@ -20,21 +20,10 @@ within one test are mutually visible, exactly like a persistent ChromaDB
 collection, while remaining fully isolated across tests.
 """
 
-import sys
 import os
 import sqlite3
 from datetime import timedelta
 
-# ---------------------------------------------------------------------------
-# sys.path: ensure bare imports like "from authenticator import ..." resolve
-# ---------------------------------------------------------------------------
-_integration_dir = os.path.dirname(__file__)
-_tests_dir = os.path.join(_integration_dir, "..")
-_backend_dir = os.path.join(_tests_dir, "..")
-_repo_root = os.path.join(_backend_dir, "..")
-sys.path.insert(0, os.path.abspath(_backend_dir))
-sys.path.insert(0, os.path.abspath(_repo_root))
-
 # ---------------------------------------------------------------------------
 # Bootstrap env vars so main.py's module-level init_database() has a path.
 # set_env_var() (called at import time in main.py) will override NAME_DB to
@@ -60,7 +49,6 @@ import pyotp
 from fastapi.testclient import TestClient
 
 from backend.main import app, create_access_token
-from backend.data_handler import init_database
 
 
 # ---------------------------------------------------------------------------
@@ -76,24 +64,25 @@ class FakeChromaClient:
     same test – exactly mirroring the behaviour of a persistent ChromaDB
     collection.
 
-    The `tags` parameter is accepted (but not stored) to absorb the interface
-    mismatch where data_handler calls insert_idea/update_idea without tags.
+    Like the real collection, documents are keyed by the stringified SQLite
+    idea id. Only the content is stored; `title` and `tags` are accepted to
+    match the ChromaClient interface.
     """
 
     def __init__(self, store: dict) -> None:
         self._store = store
 
-    def insert_idea(self, title: str, content: str, tags=None, comments=None) -> None:
-        self._store[title] = content
+    def insert_idea(self, idea_id: int, title: str, content: str, tags=None, comments=None) -> None:
+        self._store[str(idea_id)] = content
 
-    def update_idea(self, title: str, content: str, tags=None, comments=None) -> None:
-        self._store[title] = content
+    def update_idea(self, idea_id: int, title: str, content: str, tags=None, comments=None) -> None:
+        self._store[str(idea_id)] = content
 
-    def remove_idea(self, title: str) -> None:
-        self._store.pop(title, None)
+    def remove_idea(self, idea_id: int) -> None:
+        self._store.pop(str(idea_id), None)
 
     def get_similar_idea(self, idea: str, n_results: int = 10) -> list[str]:
-        """Return all stored titles (no semantic ranking needed for contract tests)."""
+        """Return all stored ids (no semantic ranking needed for contract tests)."""
         return list(self._store.keys())[:n_results]
 
     def get_all_ideas(self, max_items: int = 500) -> dict:
@@ -142,18 +131,15 @@ def patch_llm(monkeypatch: pytest.MonkeyPatch) -> None:
 
 
 @pytest.fixture()
-def db_path(tmp_path, monkeypatch: pytest.MonkeyPatch) -> str:
+def db_path(test_db: str, tmp_path, monkeypatch: pytest.MonkeyPatch) -> str:
     """
     Create a fresh SQLite database in a per-test temp directory.
-    Overrides NAME_DB and TOC_CACHE_PATH so every data_handler call uses
-    the test-local file, not the real data/ directory.
+    The file is a copy of the session's schema template (see test_db), and
+    NAME_DB and TOC_CACHE_PATH are overridden so every data_handler call
+    uses the test-local files, not the real data/ directory.
     """
-    path = str(tmp_path / "test.db")
-    toc_path = str(tmp_path / "toc.json")
-    monkeypatch.setenv("NAME_DB", path)
-    monkeypatch.setenv("TOC_CACHE_PATH", toc_path)
-    init_database()
-    return path
+    monkeypatch.setenv("TOC_CACHE_PATH", str(tmp_path / "toc.json"))
+    return test_db
 
 
 @pytest.fixture()
@@ -54,12 +54,12 @@ class TestCreateIdea:
         assert "Global Idea" in titles
 
     def test_create_idea_inserts_into_chroma(self, client, alice, book, chroma_store):
-        client.post(
+        idea_id = client.post(
             "/ideas",
             json={"title": "Chroma Idea", "content": "Will be embedded", "book_id": book},
             headers=alice["headers"],
-        )
-        assert "Chroma Idea" in chroma_store
+        ).json()["id"]
+        assert chroma_store[str(idea_id)] == "Will be embedded"
 
     def test_create_idea_with_tags_creates_relations(self, client, alice, book):
         response = client.post(
@@ -156,7 +156,7 @@ class TestUpdateIdea:
             headers=alice["headers"],
         )
 
-        assert chroma_store["Before Update"] == "v2"
+        assert chroma_store[str(idea_id)] == "v2"
 
     def test_update_adds_new_tag(self, client, alice, book):
         idea_id = client.post(
@@ -230,18 +230,13 @@ class TestDeleteIdea:
         assert not any(i["id"] == idea_id for i in ideas)
 
     def test_delete_removes_from_chroma(self, client, alice, book, chroma_store):
-        client.post(
+        idea_id = client.post(
             "/ideas",
             json={"title": "Chroma Delete", "content": "C", "book_id": book},
             headers=alice["headers"],
-        )
-        assert "Chroma Delete" in chroma_store
+        ).json()["id"]
+        assert str(idea_id) in chroma_store
 
-        idea_id = next(
-            i["id"]
-            for i in client.get("/user/ideas", headers=alice["headers"]).json()
-            if i["title"] == "Chroma Delete"
-        )
         client.request(
             "DELETE",
             f"/ideas/{idea_id}",
@@ -249,7 +244,7 @@ class TestDeleteIdea:
             headers=alice["headers"],
         )
 
-        assert "Chroma Delete" not in chroma_store
+        assert str(idea_id) not in chroma_store
 
     def test_delete_removes_relations_via_sqlite_cascade(self, client, alice, book):
         """
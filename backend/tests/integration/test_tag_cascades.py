@@ -146,10 +146,10 @@ class TestFilterByTag:
         assert "ML Idea" in titles
         assert "Python Idea" not in titles
 
-    def test_filter_by_multiple_tags_returns_union(self, client, alice, book):
+    def test_filter_by_multiple_tags_returns_intersection(self, client, alice, book):
         """
         Semicolon-separated tags in the URL path → get_idea_from_tags splits on ';'
-        and returns ideas matching ANY of the supplied tags.
+        and returns only the ideas carrying ALL of the supplied tags.
         """
         client.post(
             "/ideas",
@@ -158,7 +158,7 @@ class TestFilterByTag:
         )
         client.post(
             "/ideas",
-            json={"title": "Beta", "content": "C", "tags": "beta", "book_id": book},
+            json={"title": "Alpha Beta", "content": "C", "tags": "alpha;beta", "book_id": book},
             headers=alice["headers"],
         )
         client.post(
@@ -170,10 +170,9 @@ class TestFilterByTag:
         # URL-encode the semicolon so TestClient doesn't interpret it as a separator
         response = client.get("/ideas/tags/alpha%3Bbeta", headers=alice["headers"])
         assert response.status_code == 200
-        titles = [i["title"] for i in response.json()]
-        assert "Alpha" in titles
-        assert "Beta" in titles
-        assert "Gamma" not in titles
+        ideas = response.json()
+        assert [i["title"] for i in ideas] == ["Alpha Beta"]
+        assert sorted(ideas[0]["tags"].split(";")) == ["alpha", "beta"]
 
     def test_filter_with_no_matching_tag_returns_empty(self, client, alice, book):
         client.post(
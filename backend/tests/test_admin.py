@@ -16,12 +16,6 @@ from unittest.mock import MagicMock
 
 import pytest
 
-_tests_dir = os.path.dirname(__file__)
-_backend_dir = os.path.join(_tests_dir, '..')
-_repo_root = os.path.join(_tests_dir, '../..')
-sys.path.insert(0, os.path.abspath(_backend_dir))
-sys.path.insert(0, os.path.abspath(_repo_root))
-
 # Patch heavy ML modules before importing the app (same strategy as conftest.py)
 for _mod in [
     "chromadb", "chromadb.utils", "chromadb.utils.embedding_functions",
@@ -38,9 +32,11 @@ for _mod in [
     if _mod not in sys.modules:
         sys.modules[_mod] = MagicMock()
 
+# Import-time database for main.py's init_database(); temporary, so it stays
+# out of the source tree and apart from other xdist workers.
 os.environ.setdefault(
     "NAME_DB",
-    os.path.join(os.path.abspath(_tests_dir), "test_admin_database.db"),
+    os.path.join(tempfile.mkdtemp(prefix="consensia_admin_"), "bootstrap.db"),
 )
 
 from fastapi.testclient import TestClient  # noqa: E402
@@ -53,16 +49,6 @@ client = TestClient(app)
 # Helpers
 # ---------------------------------------------------------------------------
 
-def _fresh_db():
-    """Return the path of a new, initialised temporary database."""
-    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
-    tmp.close()
-    os.environ["NAME_DB"] = tmp.name
-    from backend.data_handler import init_database
-    init_database()
-    return tmp.name
-
-
 def _insert_user(db_path: str, username: str, email: str, is_admin: bool = False) -> int:
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
@@ -91,11 +77,9 @@ def _auth(token: str) -> dict:
 # ---------------------------------------------------------------------------
 
 @pytest.fixture(autouse=True)
-def isolated_db():
-    db = _fresh_db()
-    yield db
-    if os.path.exists(db):
-        os.remove(db)
+def isolated_db(test_db):
+    """Point every test at its own database; pytest reaps it with tmp_path."""
+    return test_db
 
 
 # ---------------------------------------------------------------------------
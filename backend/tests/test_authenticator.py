@@ -1,160 +1,153 @@
-import sys
-import os
-from unittest.mock import Mock, patch
+import time
+from unittest.mock import patch
 import pytest
 import sqlite3
 
-# Add the backend directory to the path so we can import authenticator
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import pyotp
 
-from backend.authenticator import generate_auth_link, verify_access
-from backend.data_handler import init_database
+from backend.authenticator import (
+    _secret_key, generate_auth_link, get_provisioning_uri, verify_access,
+    is_login_throttled, record_login_failure, reset_login_failures,
+)
 
 
 @pytest.mark.unit
 class TestAuthenticator:
     """Test cases for authenticator functions"""
 
-    def setup_method(self):
-        """Set up test fixtures before each test method."""
-        import tempfile
-        self._tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
-        self.test_db_path = self._tmp.name
-        self._tmp.close()
-        os.environ['NAME_DB'] = self.test_db_path
-        init_database()
+    @pytest.fixture(autouse=True)
+    def _use_test_db(self, test_db):
+        """Run each test against a fresh database and a freshly read secret key."""
+        self.test_db_path = test_db
+        _secret_key.cache_clear()
 
-    def teardown_method(self):
-        """Clean up after each test method."""
-        if os.path.exists(self.test_db_path):
-            os.remove(self.test_db_path)
+    def _insert_user(self, email, secret):
+        conn = sqlite3.connect(self.test_db_path)
+        conn.execute(
+            "INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
+            (email.split("@")[0], email, secret)
+        )
+        conn.commit()
+        conn.close()
 
     @patch('backend.authenticator.pyotp')
-    def test_generate_auth_link(self, mock_pyotp):
+    def test_generate_auth_link(self, mock_pyotp, capsys):
         """Test generate_auth_link function"""
         # Set up mock for pyotp functions
         mock_pyotp.random_base32.return_value = "TEST_SECRET_BASE32"
-        mock_totp = Mock()
-        mock_totp.provisioning_uri.return_value = "otpauth://test/uri"
-        mock_pyotp.TOTP.return_value = mock_totp
-        
+
         # Call the function
         generate_auth_link("test@example.com", False)
-        
+
         # Verify the user was inserted into the database
         conn = sqlite3.connect(self.test_db_path)
         cursor = conn.cursor()
         cursor.execute("SELECT username, email, hashed_password FROM users WHERE email = ?", ("test@example.com",))
         result = cursor.fetchone()
         conn.close()
-        
+
         assert result is not None
         assert result[0] == "test"  # username extracted from email
         assert result[1] == "test@example.com"
         assert result[2] == "TEST_SECRET_BASE32"
-        
-        # Verify pyotp functions were called correctly
+
+        # Verify the secret was generated once and no TOTP object was needed for the URI
         mock_pyotp.random_base32.assert_called_once()
-        mock_pyotp.TOTP.assert_called_once_with("TEST_SECRET_BASE32")
-        mock_totp.provisioning_uri.assert_called_once()
+        mock_pyotp.TOTP.assert_not_called()
+        assert "secret=TEST_SECRET_BASE32" in capsys.readouterr().out
 
     @patch('backend.authenticator.pyotp')
-    def test_generate_auth_link_debug(self, mock_pyotp):
+    def test_generate_auth_link_debug(self, mock_pyotp, capsys):
         """Test generate_auth_link function with debug mode"""
         # Set up mock for pyotp functions
         mock_pyotp.random_base32.return_value = "TEST_SECRET_BASE32"
-        mock_totp = Mock()
-        mock_totp.provisioning_uri.return_value = "otpauth://test/uri"
-        mock_pyotp.TOTP.return_value = mock_totp
-        
+
         # Call the function with debug=True
         generate_auth_link("test@example.com", True)
-        
-        # Verify pyotp.TOTP was called with the secret
-        mock_pyotp.TOTP.assert_called_once_with("TEST_SECRET_BASE32")
-        
-        # Verify provisioning_uri was called (should include "Brainiac5-dev" for debug)
-        call_args = mock_totp.provisioning_uri.call_args
-        assert call_args is not None
 
-    @patch('backend.authenticator.pyotp')
-    def test_verify_access_success(self, mock_pyotp):
+        # Verify the printed link carries the account and the secret
+        out = capsys.readouterr().out
+        assert "otpauth://totp/Seroul%20Pierre:test%40example.com?" in out
+        assert "secret=TEST_SECRET_BASE32" in out
+
+    @pytest.mark.parametrize("email", ["test@example.com", "a.b+c@example.com", "weird name/x@example.org"])
+    def test_provisioning_uri_matches_pyotp(self, email):
+        """The precomputed template yields exactly what pyotp would build"""
+        secret = pyotp.random_base32()
+        expected = pyotp.TOTP(secret).provisioning_uri(name=email, issuer_name="Seroul Pierre")
+        assert get_provisioning_uri(email, secret) == expected
+
+    def test_verify_access_success(self):
         """Test verify_access function with valid credentials"""
-        # Insert a test user into the database
-        conn = sqlite3.connect(self.test_db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-            ("test", "test@example.com", "TEST_SECRET_BASE32")
-        )
-        conn.commit()
-        conn.close()
-        
-        # Set up mock for pyotp
-        mock_totp = Mock()
-        mock_totp.verify.return_value = True
-        mock_pyotp.TOTP.return_value = mock_totp
-        
-        # Call the function with valid credentials
-        result = verify_access("test@example.com", "123456")
-        
-        # Verify the result is True
-        assert result is True
-        
-        # Verify pyotp.TOTP was called with the correct secret
-        mock_pyotp.TOTP.assert_called_once_with("TEST_SECRET_BASE32")
-        
-        # Verify verify was called with the correct code
-        mock_totp.verify.assert_called_once_with("123456")
+        secret = pyotp.random_base32()
+        self._insert_user("test@example.com", secret)
 
-    @patch('backend.authenticator.pyotp')
-    def test_verify_access_wrong_email(self, mock_pyotp):
+        # pyotp is the reference implementation the authenticator apps match
+        assert verify_access("test@example.com", pyotp.TOTP(secret).now()) is True
+
+    def test_verify_access_reuses_decoded_key(self):
+        """Repeated logins for the same secret decode it only once"""
+        secret = pyotp.random_base32()
+        self._insert_user("test@example.com", secret)
+
+        assert verify_access("test@example.com", pyotp.TOTP(secret).now()) is True
+        assert verify_access("test@example.com", pyotp.TOTP(secret).now()) is True
+
+        info = _secret_key.cache_info()
+        assert info.misses == 1
+        assert info.hits == 1
+
+    def test_verify_access_adjacent_window(self):
+        """Codes from one step either side of now are accepted"""
+        secret = pyotp.random_base32()
+        self._insert_user("test@example.com", secret)
+        totp = pyotp.TOTP(secret)
+        now = time.time()
+
+        assert verify_access("test@example.com", totp.at(now - 30)) is True
+        assert verify_access("test@example.com", totp.at(now + 30)) is True
+
+    def test_verify_access_expired_code(self):
+        """Codes older than the validity window are rejected"""
+        secret = pyotp.random_base32()
+        self._insert_user("test@example.com", secret)
+
+        assert verify_access("test@example.com", pyotp.TOTP(secret).at(time.time() - 120)) is False
+
+    def test_verify_access_wrong_email(self):
         """Test verify_access function with wrong email"""
-        # Insert a test user into the database
-        conn = sqlite3.connect(self.test_db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-            ("correct", "correct@example.com", "TEST_SECRET_BASE32")
-        )
-        conn.commit()
-        conn.close()
-        
-        # Set up mock for pyotp
-        mock_totp = Mock()
-        mock_totp.verify.return_value = True
-        mock_pyotp.TOTP.return_value = mock_totp
-        
+        secret = pyotp.random_base32()
+        self._insert_user("correct@example.com", secret)
+
         # Call the function with wrong email
-        result = verify_access("wrong@example.com", "123456")
-        
+        result = verify_access("wrong@example.com", pyotp.TOTP(secret).now())
+
         # Verify the result is False (email doesn't match)
         assert result is False
 
-    @patch('backend.authenticator.pyotp')
-    def test_verify_access_wrong_code(self, mock_pyotp):
+    def test_verify_access_wrong_code(self):
         """Test verify_access function with wrong OTP code"""
-        # Insert a test user into the database
-        conn = sqlite3.connect(self.test_db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-            ("test", "test@example.com", "TEST_SECRET_BASE32")
-        )
-        conn.commit()
-        conn.close()
-        
-        # Set up mock for pyotp
-        mock_totp = Mock()
-        mock_totp.verify.return_value = False  # Wrong code
-        mock_pyotp.TOTP.return_value = mock_totp
-        
+        self._insert_user("test@example.com", pyotp.random_base32())
+
         # Call the function with wrong code
         result = verify_access("test@example.com", "wrongcode")
-        
+
         # Verify the result is False (code verification failed)
         assert result is False
 
+    @pytest.mark.parametrize("code", ["", "12345", "1234567", "12a456", "١٢٣٤٥٦"])
+    def test_verify_access_rejects_malformed_code_without_lookup(self, code):
+        """Codes that are not 6 ASCII digits fail before any database access"""
+        with patch('backend.authenticator.get_conn') as mock_get_conn:
+            assert verify_access("test@example.com", code) is False
+        mock_get_conn.assert_not_called()
+
+    def test_verify_access_malformed_secret(self):
+        """A secret that is not valid base32 never validates"""
+        self._insert_user("test@example.com", "not-base32!")
+
+        assert verify_access("test@example.com", "123456") is False
+
     def test_verify_access_user_not_found(self):
         """Test verify_access function when user doesn't exist"""
         # Call the function with non-existent user
@@ -176,48 +169,40 @@ class TestAuthenticator:
         conn.close()
         
         # Call the function - should return False due to empty secret
-        # pyotp.TOTP will fail with empty secret
         result = verify_access("test@example.com", "123456")
         assert result is False
 
     @patch('backend.authenticator.pyotp')
     def test_multiple_users(self, mock_pyotp):
         """Test that multiple users can be stored and verified"""
+        secrets = [pyotp.random_base32() for _ in range(3)]
         # Set up mock for pyotp functions
-        mock_pyotp.random_base32.side_effect = ["SECRET1", "SECRET2", "SECRET3"]
-        mock_totp = Mock()
-        mock_totp.verify.return_value = True
-        mock_totp.provisioning_uri.return_value = "otpauth://test/uri"
-        mock_pyotp.TOTP.return_value = mock_totp
-        
+        mock_pyotp.random_base32.side_effect = secrets
+
         # Create multiple users
         generate_auth_link("user1@example.com", False)
         generate_auth_link("user2@example.com", False)
         generate_auth_link("user3@example.com", False)
-        
+
         # Verify all users were inserted
         conn = sqlite3.connect(self.test_db_path)
         cursor = conn.cursor()
         cursor.execute("SELECT COUNT(*) FROM users")
         count = cursor.fetchone()[0]
         conn.close()
-        
+
         assert count == 3
-        
-        # Verify each user can be accessed
-        mock_totp.verify.return_value = True
-        assert verify_access("user1@example.com", "123456") is True
-        assert verify_access("user2@example.com", "123456") is True
-        assert verify_access("user3@example.com", "123456") is True
+
+        # Verify each user can be accessed with their own code only
+        for i, secret in enumerate(secrets, start=1):
+            assert verify_access(f"user{i}@example.com", pyotp.TOTP(secret).now()) is True
+        assert verify_access("user1@example.com", pyotp.TOTP(secrets[1]).now()) is False
 
     @patch('backend.authenticator.pyotp')
     def test_duplicate_username_prevention(self, mock_pyotp):
         """Test that duplicate usernames are prevented"""
         # Set up mock for pyotp functions
         mock_pyotp.random_base32.return_value = "SECRET1"
-        mock_totp = Mock()
-        mock_totp.provisioning_uri.return_value = "otpauth://test/uri"
-        mock_pyotp.TOTP.return_value = mock_totp
         
         # Create first user
         generate_auth_link("test@example.com", False)
@@ -233,3 +218,39 @@ class TestAuthenticator:
         conn.close()
         
         assert count == 1
+
+    def test_login_throttle_window(self):
+        """Failures are counted per email and expire after the window"""
+        with patch('backend.authenticator.time.monotonic', return_value=1000.0):
+            for _ in range(5):
+                assert is_login_throttled("a@example.com") is False
+                record_login_failure("a@example.com")
+            assert is_login_throttled("a@example.com") is True
+            assert is_login_throttled("b@example.com") is False
+        with patch('backend.authenticator.time.monotonic', return_value=1061.0):
+            assert is_login_throttled("a@example.com") is False
+
+    def test_login_failures_evict_stalest_email_when_full(self):
+        """A spray of distinct, unexpired emails cannot grow the table past its cap"""
+        from backend import authenticator
+        with (
+            patch('backend.authenticator.time.monotonic', return_value=1000.0),
+            patch('backend.authenticator._MAX_TRACKED_EMAILS', 3),
+        ):
+            for _ in range(5):
+                record_login_failure("victim@example.com")
+            record_login_failure("x1@example.com")
+            record_login_failure("x2@example.com")
+            record_login_failure("victim@example.com")  # latest failure: now the freshest entry
+            record_login_failure("x3@example.com")
+            assert list(authenticator._failures) == ["x2@example.com", "victim@example.com", "x3@example.com"]
+            assert is_login_throttled("victim@example.com") is True
+
+    def test_reset_login_failures(self):
+        """Resetting one email leaves the others throttled"""
+        for _ in range(5):
+            record_login_failure("a@example.com")
+            record_login_failure("b@example.com")
+        reset_login_failures("a@example.com")
+        assert is_login_throttled("a@example.com") is False
+        assert is_login_throttled("b@example.com") is True
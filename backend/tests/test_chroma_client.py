@@ -1,12 +1,11 @@
-import sys
-import os
+import threading
+import time
+import numpy as np
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, call, patch
 
-# Add the backend directory to the path so we can import chroma_client
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-
-from backend.chroma_client import ChromaClient
+from backend import chroma_client
+from backend.chroma_client import ChromaClient, _EmbeddingBatcher, _get_emb_fn, snapshot_to_disk
 
 @pytest.mark.unit
 class TestChromaClient:
@@ -14,11 +13,13 @@ class TestChromaClient:
 
     def setup_method(self):
         """Set up test fixtures before each test method."""
+        _get_emb_fn.cache_clear()
         with patch('backend.chroma_client.chromadb.PersistentClient') as mock_client:
             with patch('backend.chroma_client.embedding_functions.SentenceTransformerEmbeddingFunction'):
                 self.mock_collection = Mock()
                 mock_client.return_value.get_or_create_collection.return_value = self.mock_collection
                 self.chroma_client = ChromaClient(collection_name="TestCollection")
+                self.mock_chroma = mock_client.return_value
 
     def test_init(self):
         """Test ChromaClient initialization"""
@@ -27,9 +28,26 @@ class TestChromaClient:
         assert hasattr(self.chroma_client, 'collection')
         assert self.chroma_client.model_name == "all-mpnet-base-v2"
 
+    def test_init_creates_cosine_collection(self):
+        """New collections are created in cosine space."""
+        kwargs = self.mock_chroma.get_or_create_collection.call_args[1]
+        assert kwargs['name'] == "TestCollection"
+        assert kwargs['metadata'] == {"hnsw:space": "cosine"}
+
+    def test_embedding_function_is_shared(self):
+        """Clients for the same model reuse one embedding function instance."""
+        _get_emb_fn.cache_clear()
+        with patch('backend.chroma_client.chromadb.PersistentClient'):
+            with patch('backend.chroma_client.embedding_functions.SentenceTransformerEmbeddingFunction') as mock_emb:
+                first = ChromaClient(collection_name="A")
+                second = ChromaClient(collection_name="B")
+
+        mock_emb.assert_called_once_with(model_name="all-mpnet-base-v2")
+        assert first.emb_fn is second.emb_fn
+
     def test_insert_idea(self):
         """insert_idea stores title, tags, and original description in metadata."""
-        self.chroma_client.insert_idea("Test Idea", "This is a test description", ["tag1", "tag2"])
+        self.chroma_client.insert_idea(7, "Test Idea", "This is a test description", ["tag1", "tag2"])
 
         self.mock_collection.add.assert_called_once()
         kwargs = self.mock_collection.add.call_args[1]
@@ -38,11 +56,11 @@ class TestChromaClient:
         assert kwargs['metadatas'][0]['title'] == "Test Idea"
         assert kwargs['metadatas'][0]['tags'] == "tag1,tag2"
         assert kwargs['metadatas'][0]['description'] == "This is a test description"
-        assert kwargs['ids'][0] == "Test Idea"
+        assert kwargs['ids'][0] == "7"
 
     def test_insert_idea_with_comments(self):
         """insert_idea passes comments through to format_text."""
-        self.chroma_client.insert_idea("Idea", "Desc", [], ["comment one"])
+        self.chroma_client.insert_idea(1, "Idea", "Desc", [], ["comment one"])
 
         kwargs = self.mock_collection.add.call_args[1]
         assert "comment one" in kwargs['documents'][0]
@@ -59,14 +77,14 @@ class TestChromaClient:
                 client = ChromaClient(collection_name="T", llm=mock_llm)
 
         long_content = "word " * 70  # exceeds _WORD_THRESHOLD
-        client.insert_idea("Title", long_content, [])
+        client.insert_idea(1, "Title", long_content, [])
 
         kwargs = mock_col.add.call_args[1]
         assert kwargs['metadatas'][0]['description'] == long_content
 
     def test_update_idea(self):
         """update_idea stores title, tags, and original description in metadata."""
-        self.chroma_client.update_idea("Updated Idea", "Updated description", ["t"])
+        self.chroma_client.update_idea(7, "Updated Idea", "Updated description", ["t"])
 
         self.mock_collection.update.assert_called_once()
         kwargs = self.mock_collection.update.call_args[1]
@@ -75,61 +93,218 @@ class TestChromaClient:
         assert kwargs['metadatas'][0]['title'] == "Updated Idea"
         assert kwargs['metadatas'][0]['tags'] == "t"
         assert kwargs['metadatas'][0]['description'] == "Updated description"
-        assert kwargs['ids'][0] == "Updated Idea"
+        assert kwargs['ids'][0] == "7"
 
     def test_remove_idea(self):
         """Test remove_idea method"""
-        self.chroma_client.remove_idea('Idea removed')
+        self.chroma_client.remove_idea(42)
 
         self.mock_collection.delete.assert_called_once()
         kwargs = self.mock_collection.delete.call_args[1]
-        assert kwargs['ids'] == ["Idea removed"]
+        assert kwargs['ids'] == ["42"]
 
     def test_get_similar_idea(self):
         """Test get_similar_idea method"""
         mock_results = {
             'ids': [['Idea 1', 'Idea 2']],
-            'documents': [['Document 1', 'Document 2']]
         }
         self.mock_collection.query.return_value = mock_results
+        self.chroma_client.emb_fn = Mock(return_value=[[0.6, 0.8]])
 
         results = self.chroma_client.get_similar_idea("test query", 5)
 
-        self.mock_collection.query.assert_called_once_with(
-            query_texts=["test query"],
-            n_results=5
-        )
+        self.chroma_client.emb_fn.assert_called_once_with(["test query"])
+        self.mock_collection.query.assert_called_once()
+        kwargs = self.mock_collection.query.call_args[1]
+        np.testing.assert_allclose(kwargs['query_embeddings'][0], [0.6, 0.8])
+        assert kwargs['n_results'] == 5
+        assert kwargs['include'] == []
         assert len(results) == 2
         assert results[0] == 'Idea 1'
         assert results[1] == 'Idea 2'
 
+    def test_get_similar_idea_serves_near_duplicate_queries_from_cache(self):
+        """A query embedded almost like a previous one skips the collection search."""
+        self.mock_collection.query.return_value = {'ids': [['1', '2', '3']]}
+        self.chroma_client.emb_fn = Mock(side_effect=[[[1.0, 0.0]], [[0.999, 0.01]], [[0.0, 1.0]]])
+
+        assert self.chroma_client.get_similar_idea("solar panels", 3) == ['1', '2', '3']
+        assert self.chroma_client.get_similar_idea("solar panel", 2) == ['1', '2']
+        assert self.mock_collection.query.call_count == 1
+
+        # More results than cached, or an unrelated query, go to the collection
+        self.chroma_client.get_similar_idea("solar panels", 5)
+        self.chroma_client.get_similar_idea("wind farms", 3)
+        assert self.mock_collection.query.call_count == 3
+
+    def test_repeated_query_text_is_embedded_once(self):
+        """The exact same query text reuses its embedding, even across writes."""
+        self.mock_collection.query.return_value = {'ids': [['1']]}
+        self.chroma_client.emb_fn = Mock(return_value=[[1.0, 0.0]])
+
+        self.chroma_client.get_similar_idea("query", 1)
+        self.chroma_client.remove_idea(1)
+        self.chroma_client.get_similar_idea("query", 1)
+        self.chroma_client.get_similar_idea("other query", 1)
+
+        assert self.chroma_client.emb_fn.call_args_list == [call(["query"]), call(["other query"])]
+
+    def test_concurrent_query_embeddings_share_a_batch(self):
+        """Queries that arrive while a forward pass runs are embedded together in the next one."""
+        calls = []
+        release = threading.Event()
+
+        def embed_texts(texts):
+            calls.append(sorted(texts))
+            if len(calls) == 1:
+                release.wait(5)
+            return [[float(len(text)), 1.0] for text in texts]
+
+        batcher = _EmbeddingBatcher(embed_texts)
+        results = {}
+
+        def embed(text):
+            results[text] = batcher.embed(text)
+
+        threads = [threading.Thread(target=embed, args=(text,)) for text in ("a", "bb", "ccc")]
+        threads[0].start()
+        while not calls:
+            time.sleep(0.001)
+        for thread in threads[1:]:
+            thread.start()
+        while len(batcher._pending) < 2:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert calls == [["a"], ["bb", "ccc"]]
+        assert results["ccc"].tolist() == [3.0, 1.0]
+        assert results["a"].dtype == np.float32
+
+    def test_embedding_batch_error_reaches_caller(self):
+        """A failing forward pass raises in the caller instead of hanging it."""
+        batcher = _EmbeddingBatcher(Mock(side_effect=RuntimeError("model down")))
+
+        with pytest.raises(RuntimeError, match="model down"):
+            batcher.embed("query")
+        assert batcher._running is False
+
+    def test_writes_clear_similarity_cache(self):
+        """Any write to the collection drops cached search results."""
+        self.mock_collection.query.return_value = {'ids': [['1']]}
+        self.chroma_client.emb_fn = Mock(return_value=[[1.0, 0.0]])
+
+        self.chroma_client.get_similar_idea("query", 1)
+        self.chroma_client.remove_idea(1)
+        self.chroma_client.get_similar_idea("query", 1)
+        assert self.mock_collection.query.call_count == 2
+
     def test_get_all_ideas(self):
         """get_all_ideas must include metadatas in addition to embeddings and documents."""
-        mock_result = Mock()
-        self.mock_collection.get.return_value = mock_result
+        self.mock_collection.get.return_value = {
+            'ids': ['A'], 'documents': ['doc a'], 'metadatas': [{'title': 'A'}], 'embeddings': [[0.1, 0.2]],
+        }
 
         result = self.chroma_client.get_all_ideas(100)
 
         self.mock_collection.get.assert_called_once_with(
             include=['embeddings', 'documents', 'metadatas'],
-            limit=100
+            limit=100,
+            offset=0
         )
-        assert result == mock_result
+        assert result['ids'] == ['A']
+        assert result['documents'] == ['doc a']
+        assert result['metadatas'] == [{'title': 'A'}]
+        assert result['embeddings'].dtype == np.float32
+        np.testing.assert_allclose(result['embeddings'], [[0.1, 0.2]])
+
+    def test_get_all_ideas_empty_collection(self):
+        """An empty collection yields an empty float32 embedding matrix."""
+        self.mock_collection.get.return_value = {'ids': [], 'documents': [], 'metadatas': [], 'embeddings': []}
+
+        result = self.chroma_client.get_all_ideas()
+
+        assert result['ids'] == []
+        assert result['embeddings'].shape == (0, 0)
+
+    def test_get_all_ideas_paginates(self):
+        """Large collections are read page by page and merged in order."""
+        def page(offset, size):
+            ids = [f"id{i}" for i in range(offset, offset + size)]
+            return {
+                'ids': ids,
+                'documents': [f"doc {i}" for i in ids],
+                'metadatas': [{'title': i} for i in ids],
+                'embeddings': [[float(n)] for n in range(offset, offset + size)],
+            }
+        self.mock_collection.get.side_effect = [page(0, 100), page(100, 100), page(200, 30)]
+
+        result = self.chroma_client.get_all_ideas(500)
+
+        offsets = [c.kwargs['offset'] for c in self.mock_collection.get.call_args_list]
+        assert offsets == [0, 100, 200]
+        assert len(result['ids']) == 230
+        assert result['ids'][150] == "id150"
+        assert result['embeddings'].shape == (230, 1)
+        assert result['embeddings'][229, 0] == 229.0
+
+    def test_iter_idea_pages_respects_max_items(self):
+        """The last page is shortened so no more than max_items are read."""
+        def page(limit, **_):
+            return {'ids': ['x'] * limit, 'documents': [''] * limit, 'metadatas': [{}] * limit,
+                    'embeddings': [[0.0]] * limit}
+        self.mock_collection.get.side_effect = page
+
+        pages = list(self.chroma_client.iter_idea_pages(max_items=150))
+
+        limits = [c.kwargs['limit'] for c in self.mock_collection.get.call_args_list]
+        assert limits == [100, 50]
+        assert len(pages) == 2
 
     def test_bulk_insert(self):
         """bulk_insert calls collection.add with correct documents, metadatas, ids."""
         ideas = [
-            {"title": "A", "description": "desc a", "tags": ["t1"]},
-            {"title": "B", "description": "desc b", "tags": []},
+            {"id": 1, "title": "A", "description": "desc a", "tags": ["t1"]},
+            {"id": 2, "title": "B", "description": "desc b", "tags": []},
         ]
         self.chroma_client.bulk_insert(ideas)
 
         self.mock_collection.add.assert_called_once()
         kwargs = self.mock_collection.add.call_args[1]
-        assert kwargs['ids'] == ["A", "B"]
+        assert kwargs['ids'] == ["1", "2"]
+        assert kwargs['metadatas'][0]['title'] == "A"
         assert kwargs['metadatas'][0]['description'] == "desc a"
         assert kwargs['metadatas'][1]['description'] == "desc b"
 
+    def test_bulk_insert_splits_into_batches(self):
+        """bulk_insert issues one collection.add per batch_size ideas."""
+        ideas = [{"id": i, "title": f"I{i}", "description": "d", "tags": []} for i in range(5)]
+        self.chroma_client.bulk_insert(ideas, batch_size=2)
+
+        batches = [c[1]['ids'] for c in self.mock_collection.add.call_args_list]
+        assert batches == [["0", "1"], ["2", "3"], ["4"]]
+
+    def test_bulk_insert_empty_is_noop(self):
+        """bulk_insert with no ideas does not touch the collection."""
+        self.chroma_client.bulk_insert([])
+        self.mock_collection.add.assert_not_called()
+
+    def test_bulk_update(self):
+        """bulk_update re-embeds every idea in one collection.update call."""
+        ideas = [
+            {"id": 1, "title": "A", "description": "new a", "tags": ["t1"], "comments": ["c1"]},
+            {"id": 2, "title": "B", "description": "new b", "tags": []},
+        ]
+        self.chroma_client.bulk_update(ideas)
+
+        self.mock_collection.update.assert_called_once()
+        kwargs = self.mock_collection.update.call_args[1]
+        assert kwargs['ids'] == ["1", "2"]
+        assert len(kwargs['documents']) == 2
+        assert kwargs['metadatas'][0]['tags'] == "t1"
+        assert kwargs['metadatas'][1]['description'] == "new b"
+
     def test_bulk_insert_stores_originals(self):
         """bulk_insert must store original descriptions in metadata, not summaries."""
         mock_llm = Mock()
@@ -142,7 +317,7 @@ class TestChromaClient:
                 client = ChromaClient(collection_name="T", llm=mock_llm)
 
         long_desc = "word " * 70
-        ideas = [{"title": "X", "description": long_desc, "tags": []}]
+        ideas = [{"id": 1, "title": "X", "description": long_desc, "tags": []}]
         client.bulk_insert(ideas)
 
         kwargs = mock_col.add.call_args[1]
@@ -176,3 +351,65 @@ class TestChromaClient:
         long_text = "word " * 70
         result = client._maybe_summarize(long_text)
         assert result == long_text
+
+
+@pytest.mark.unit
+class TestRamBackedStore:
+    """Seeding and snapshotting of a tmpfs-backed CHROMA_DB working copy"""
+
+    def setup_method(self):
+        chroma_client._snapshotted_paths.clear()
+
+    def test_snapshot_replaces_previous_copy(self, tmp_path):
+        working = tmp_path / "ram"
+        disk = tmp_path / "disk"
+        working.mkdir()
+        disk.mkdir()
+        (working / "chroma.sqlite3").write_text("new")
+        (disk / "stale.bin").write_text("old")
+
+        snapshot_to_disk(str(working), str(disk))
+
+        assert (disk / "chroma.sqlite3").read_text() == "new"
+        assert not (disk / "stale.bin").exists()
+        assert not (tmp_path / "disk.partial").exists()
+        assert not (tmp_path / "disk.previous").exists()
+
+    def test_working_copy_seeded_from_disk_once(self, tmp_path, monkeypatch):
+        working = tmp_path / "ram"
+        disk = tmp_path / "disk"
+        disk.mkdir()
+        (disk / "chroma.sqlite3").write_text("persisted")
+        monkeypatch.setenv("CHROMA_DB_DISK", str(disk))
+
+        with patch('backend.chroma_client.threading.Thread') as mock_thread, \
+                patch('backend.chroma_client.atexit.register') as mock_register:
+            chroma_client._ensure_working_copy(str(working))
+            chroma_client._ensure_working_copy(str(working))
+
+        assert (working / "chroma.sqlite3").read_text() == "persisted"
+        mock_thread.return_value.start.assert_called_once()
+        mock_register.assert_called_once_with(snapshot_to_disk, str(working), str(disk))
+
+    def test_existing_working_copy_is_kept(self, tmp_path, monkeypatch):
+        working = tmp_path / "ram"
+        disk = tmp_path / "disk"
+        working.mkdir()
+        disk.mkdir()
+        (working / "chroma.sqlite3").write_text("newer")
+        (disk / "chroma.sqlite3").write_text("older")
+        monkeypatch.setenv("CHROMA_DB_DISK", str(disk))
+
+        with patch('backend.chroma_client.threading.Thread'), patch('backend.chroma_client.atexit.register'):
+            chroma_client._ensure_working_copy(str(working))
+
+        assert (working / "chroma.sqlite3").read_text() == "newer"
+
+    def test_disabled_without_disk_path(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("CHROMA_DB_DISK", raising=False)
+
+        with patch('backend.chroma_client.threading.Thread') as mock_thread:
+            chroma_client._ensure_working_copy(str(tmp_path / "ram"))
+
+        mock_thread.assert_not_called()
+        assert not (tmp_path / "ram").exists()
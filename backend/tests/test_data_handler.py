@@ -1,27 +1,30 @@
-import sys
 import os
-from unittest.mock import Mock, patch
+from unittest.mock import patch
 import pytest
 import sqlite3
 
-# Add the backend directory to the path so we can import data_handler
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-
 from backend.data_handler import (
     init_database,
     get_idea_from_tags,
     get_user_ideas,
     get_ideas,
+    iter_ideas,
     get_content,
     get_tags,
     get_tags_from_idea,
+    get_tags_from_ideas,
     get_similar_idea,
+    search_ideas_by_text,
     add_idea,
     add_tag,
+    add_tags,
     add_relation,
+    add_relations,
+    add_tags_and_relations, replace_tags,
     remove_idea,
     remove_tag,
     remove_relation,
+    remove_relations,
     update_idea,
     embed_all_ideas,
     add_book,
@@ -35,35 +38,93 @@ from backend.data_handler import (
     remove_vote,
     get_idea_votes,
     get_user_vote,
+    get_conn,
+    close_pools,
+)
+
+# Seed statements shared by the tests below, named like data_handler's own.
+_SQL_INSERT_USER = "INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)"
+_SQL_INSERT_IDEA = "INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)"
+_SQL_INSERT_BOOK = "INSERT INTO books (title) VALUES (?)"
+_SQL_INSERT_TAG = "INSERT INTO tags (name) VALUES (?)"
+_SQL_INSERT_RELATION = "INSERT INTO relations (idea_id, tag_name) VALUES (?, ?)"
+_SQL_INSERT_VOTE = (
+    "INSERT INTO idea_votes (idea_id, user_id, value, created_at) VALUES (?, ?, ?, datetime('now'))"
 )
 
+
+@pytest.fixture(autouse=True)
+def mock_chroma_client():
+    """Replace ChromaClient for every test in this module.
+
+    Tests that assert on embedding writes take this fixture by name; the
+    others can no longer reach a real vector store by accident.
+    """
+    with patch('backend.data_handler.ChromaClient') as mock_class:
+        yield mock_class
+
+
+@pytest.fixture
+def mock_chroma(mock_chroma_client):
+    """The ChromaClient instance data_handler builds, for asserting embedding calls."""
+    return mock_chroma_client.return_value
+
+
 @pytest.mark.unit
 class TestDataHandler:
     """Test cases for data_handler functions"""
     
-    def setup_method(self):
-        """Set up test fixtures before each test method."""
-        import tempfile
-        self._tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
-        self.test_db = self._tmp.name
-        self._tmp.close()
-        os.environ["NAME_DB"] = self.test_db
-
-    def teardown_method(self):
-        """Clean up after each test method."""
-        if os.path.exists(self.test_db):
-            os.remove(self.test_db)
+    @pytest.fixture(autouse=True)
+    def _use_test_db(self, test_db):
+        """Run each test against its own copy of the session's schema template."""
+        self.test_db = test_db
     
     def _create_book(self, title: str = "Test Book") -> int:
         """Helper: insert a book and return its id."""
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute("INSERT INTO books (title) VALUES (?)", (title,))
+        cursor.execute(_SQL_INSERT_BOOK, (title,))
         book_id = cursor.lastrowid
         conn.commit()
         conn.close()
         return book_id
 
+    def _seed_tagged_idea(self, tag: str = "test-tag", relate: bool = True) -> tuple[int, int]:
+        """Helper: insert a book, a user, one idea and *tag* in one transaction.
+
+        The idea is linked to *tag* unless *relate* is False.
+        Returns (book_id, idea_id).
+        """
+        conn = sqlite3.connect(self.test_db)
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute(_SQL_INSERT_BOOK, ("Test Book",))
+            book_id = cursor.lastrowid
+            cursor.execute(_SQL_INSERT_USER, ("testuser", "test@example.com", "hashed_password"))
+            cursor.execute(_SQL_INSERT_IDEA, ("Test Idea", "Test Content", cursor.lastrowid, book_id))
+            idea_id = cursor.lastrowid
+            cursor.execute(_SQL_INSERT_TAG, (tag,))
+            if relate:
+                cursor.execute(_SQL_INSERT_RELATION, (idea_id, tag))
+        conn.close()
+        return book_id, idea_id
+
+    def _seed_ideas(self, count: int, book_id: int) -> tuple[int, list[int]]:
+        """Helper: insert a user and *count* ideas titled "Idea 0".. in one executemany.
+
+        Returns (user_id, idea_ids) with the ids in insertion order.
+        """
+        conn = sqlite3.connect(self.test_db)
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute(_SQL_INSERT_USER, ("testuser", "test@example.com", "hashed_password"))
+            user_id = cursor.lastrowid
+            cursor.executemany(_SQL_INSERT_IDEA,
+                               [(f"Idea {i}", "Content", user_id, book_id) for i in range(count)])
+            ids = [row[0] for row in cursor.execute("SELECT id FROM ideas WHERE owner_id = ? ORDER BY id", (user_id,))]
+        conn.close()
+        return user_id, ids
+
     def test_init_database(self):
         """Test database initialization"""
         init_database()
@@ -83,6 +144,90 @@ class TestDataHandler:
 
         conn.close()
     
+    def test_init_database_is_idempotent_and_enables_wal(self):
+        """Running init twice keeps the schema and leaves the file in WAL mode"""
+        init_database()
+        init_database()
+
+        conn = sqlite3.connect(self.test_db)
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        columns = [col[1] for col in conn.execute("PRAGMA table_info(users)")]
+        conn.close()
+
+        assert journal_mode == "wal"
+        assert columns.count("is_admin") == 1
+
+    def test_init_database_creates_lookup_indexes(self):
+        """Tag filters are served by an index; the unused title index is dropped"""
+        conn = sqlite3.connect(self.test_db)
+        conn.execute("CREATE INDEX idx_ideas_title ON ideas (title)")  # as older databases have it
+        conn.commit()
+        conn.close()
+
+        init_database()
+        conn = sqlite3.connect(self.test_db)
+        indexes = {row[1] for row in conn.execute("SELECT type, name FROM sqlite_master WHERE type = 'index'")}
+        plan = " ".join(row[3] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT idea_id FROM relations WHERE tag_name IN ('a', 'b')"))
+        conn.close()
+
+        assert "idx_relations_tag" in indexes
+        assert "idx_ideas_title" not in indexes
+        assert "idx_relations_tag" in plan
+
+    def test_get_conn_reuses_pooled_reader(self):
+        """A released reader is handed out again instead of reopening the file"""
+        init_database()
+        with get_conn() as first:
+            pass
+        with get_conn() as second:
+            assert second is first
+            assert second.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+    def test_get_conn_opens_extra_reader_when_busy(self):
+        """Nested reads never block on the pool"""
+        init_database()
+        with get_conn() as outer, get_conn() as inner:
+            assert inner is not outer
+
+    def test_get_conn_readers_are_query_only(self):
+        """Readers refuse writes; the writer connection does not"""
+        init_database()
+        with get_conn() as reader:
+            with pytest.raises(sqlite3.OperationalError, match="readonly"):
+                reader.execute("INSERT INTO tags (name) VALUES ('nope')")
+        with get_conn(write=True) as writer:
+            assert writer.execute("PRAGMA query_only").fetchone()[0] == 0
+            assert writer.isolation_level == "IMMEDIATE"
+
+    def test_get_conn_writer_rolls_back_uncommitted_work(self):
+        """Work a caller forgot to commit is not leaked to the next writer"""
+        init_database()
+        with get_conn(write=True) as conn:
+            conn.execute("INSERT INTO tags (name) VALUES ('dangling')")
+        with get_conn(write=True) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM tags").fetchone()[0] == 0
+
+    def test_get_conn_keeps_one_pool_per_database(self, tmp_path):
+        """Pointing NAME_DB at another file switches to a separate pool"""
+        init_database()
+        add_tag("first-db")
+        os.environ["NAME_DB"] = str(tmp_path / "other.db")
+        init_database()
+        assert get_tags() == []
+        close_pools()
+        os.environ["NAME_DB"] = self.test_db
+        assert get_tags() == [{"name": "first-db"}]
+
+    def test_get_conn_requires_name_db(self, monkeypatch):
+        """A missing NAME_DB fails with a clear error instead of inside sqlite3"""
+        monkeypatch.delenv("NAME_DB")
+        with pytest.raises(RuntimeError, match="NAME_DB"):
+            with get_conn():
+                pass
+        with pytest.raises(RuntimeError, match="NAME_DB"):
+            init_database()
+
     def test_get_ideas_empty(self) -> None:
         """Test get_ideas when database is empty"""
         init_database()
@@ -93,24 +238,7 @@ class TestDataHandler:
     def test_get_ideas_with_data(self) -> None:
         """Test get_ideas with sample data"""
         init_database()
-        book_id = self._create_book()
-
-        # Insert test data
-        conn = sqlite3.connect(self.test_db)
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-                      ("testuser", "test@example.com", "hashed_password"))
-        user_id = cursor.lastrowid
-
-        cursor.execute("INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-                      ("Test Idea", "Test Content", user_id, book_id))
-        idea_id = cursor.lastrowid
-
-        cursor.execute("INSERT INTO tags (name) VALUES (?)", ("test-tag",))
-        cursor.execute("INSERT INTO relations (idea_id, tag_name) VALUES (?, ?)",
-                      (idea_id, "test-tag"))
-        conn.commit()
-        conn.close()
+        book_id, idea_id = self._seed_tagged_idea()
 
         result = get_ideas()
         assert len(result) == 1
@@ -127,26 +255,17 @@ class TestDataHandler:
 
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-                      ("user1", "user1@example.com", "secret"))
+        cursor.execute(_SQL_INSERT_USER, ("user1", "user1@example.com", "secret"))
         user1_id = cursor.lastrowid
-        cursor.execute("INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-                      ("user2", "user2@example.com", "secret"))
+        cursor.execute(_SQL_INSERT_USER, ("user2", "user2@example.com", "secret"))
         user2_id = cursor.lastrowid
 
-        cursor.execute("INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-                      ("Voted Idea", "Content", user1_id, book_id))
+        cursor.execute(_SQL_INSERT_IDEA, ("Voted Idea", "Content", user1_id, book_id))
         idea_id = cursor.lastrowid
 
         # user1 upvotes (+1), user2 downvotes (-1) → score = 0
-        cursor.execute(
-            "INSERT INTO idea_votes (idea_id, user_id, value, created_at) VALUES (?, ?, ?, datetime('now'))",
-            (idea_id, user1_id, 1)
-        )
-        cursor.execute(
-            "INSERT INTO idea_votes (idea_id, user_id, value, created_at) VALUES (?, ?, ?, datetime('now'))",
-            (idea_id, user2_id, -1)
-        )
+        cursor.execute(_SQL_INSERT_VOTE, (idea_id, user1_id, 1))
+        cursor.execute(_SQL_INSERT_VOTE, (idea_id, user2_id, -1))
         conn.commit()
         conn.close()
 
@@ -167,13 +286,10 @@ class TestDataHandler:
 
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-                      ("testuser", "test@example.com", "hashed_password"))
+        cursor.execute(_SQL_INSERT_USER, ("testuser", "test@example.com", "hashed_password"))
         user_id = cursor.lastrowid
-        cursor.execute("INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-                      ("Idea Book1", "Content 1", user_id, book_id_1))
-        cursor.execute("INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-                      ("Idea Book2", "Content 2", user_id, book_id_2))
+        cursor.execute(_SQL_INSERT_IDEA, ("Idea Book1", "Content 1", user_id, book_id_1))
+        cursor.execute(_SQL_INSERT_IDEA, ("Idea Book2", "Content 2", user_id, book_id_2))
         conn.commit()
         conn.close()
 
@@ -188,6 +304,28 @@ class TestDataHandler:
         result = get_ideas()
         assert len(result) == 2
 
+    def test_get_ideas_paginated(self) -> None:
+        """get_ideas returns one page in id order, with per-idea tags and score"""
+        init_database()
+        book_id = self._create_book()
+
+        user_id, ids = self._seed_ideas(5, book_id)
+
+        conn = sqlite3.connect(self.test_db)
+        cursor = conn.cursor()
+        cursor.executemany(_SQL_INSERT_RELATION, [(ids[2], "a"), (ids[2], "b")])
+        cursor.execute(_SQL_INSERT_VOTE, (ids[2], user_id, 1))
+        conn.commit()
+        conn.close()
+
+        page = get_ideas(limit=2, offset=1)
+        assert [idea['id'] for idea in page] == ids[1:3]
+        # Tags and votes are aggregated separately, so neither is multiplied by the other
+        assert sorted(page[1]['tags'].split(';')) == ["a", "b"]
+        assert page[1]['score'] == 1
+
+        assert [idea['id'] for idea in get_ideas(book_id=book_id, offset=3)] == ids[3:]
+
     def test_get_content(self) -> None:
         """Test get_content function"""
         init_database()
@@ -196,18 +334,21 @@ class TestDataHandler:
         # Insert test data
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-                      ("testuser", "test@example.com", "hashed_password"))
+        cursor.execute(_SQL_INSERT_USER, ("testuser", "test@example.com", "hashed_password"))
         user_id = cursor.lastrowid
 
-        cursor.execute("INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-                      ("Test Idea", "Test Content", user_id, book_id))
+        cursor.execute(_SQL_INSERT_IDEA, ("Test Idea", "Test Content", user_id, book_id))
         idea_id = cursor.lastrowid
         conn.commit()
         conn.close()
 
         result = get_content(idea_id)
         assert result == "Test Content"
+
+    def test_get_content_missing_idea(self) -> None:
+        """get_content returns an empty string for an unknown id"""
+        init_database()
+        assert get_content(999) == ""
     
     def test_get_tags(self) -> None:
         """Test get_tags function"""
@@ -216,7 +357,7 @@ class TestDataHandler:
         # Insert test data
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute("INSERT INTO tags (name) VALUES (?)", ("test-tag",))
+        cursor.execute(_SQL_INSERT_TAG, ("test-tag",))
         conn.commit()
         conn.close()
         
@@ -227,87 +368,166 @@ class TestDataHandler:
     def test_get_tags_from_idea(self) -> None:
         """Test get_tags_from_idea function"""
         init_database()
+        book_id, idea_id = self._seed_tagged_idea()
+
+        result = get_tags_from_idea(idea_id)
+        assert len(result) == 1
+        assert result[0] == "test-tag"
+
+    def test_search_ideas_by_text(self) -> None:
+        """search_ideas_by_text uses the FTS index, kept in sync by triggers"""
+        init_database()
         book_id = self._create_book()
+        other_book = self._create_book()
 
-        # Insert test data
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-                      ("testuser", "test@example.com", "hashed_password"))
+        cursor.execute(_SQL_INSERT_USER, ("testuser", "test@example.com", "hashed_password"))
         user_id = cursor.lastrowid
+        cursor.execute(_SQL_INSERT_IDEA,
+                       ("Solar panels", "Cheap renewable energy for roofs", user_id, book_id))
+        solar_id = cursor.lastrowid
+        cursor.execute(_SQL_INSERT_IDEA, ("Wind farms", "Offshore renewable turbines", user_id, other_book))
+        wind_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
 
-        cursor.execute("INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-                      ("Test Idea", "Test Content", user_id, book_id))
-        idea_id = cursor.lastrowid
+        assert [i['id'] for i in search_ideas_by_text("solar")] == [solar_id]
+        # Every word must match, anywhere inside title or content, any case
+        assert [i['id'] for i in search_ideas_by_text("NEWAB urbin")] == [wind_id]
+        assert {i['id'] for i in search_ideas_by_text("renewable")} == {solar_id, wind_id}
+        assert [i['id'] for i in search_ideas_by_text("renewable", book_id=book_id)] == [solar_id]
+        # Quotes and operators in user input are literal text, not FTS syntax
+        assert search_ideas_by_text('"solar') == []
+        assert search_ideas_by_text('solar OR wind') == []
+        # Words too short for the trigram index go through LIKE instead
+        assert [i['id'] for i in search_ideas_by_text("off")] == [wind_id]
+        assert [i['id'] for i in search_ideas_by_text("of tu")] == [wind_id]
+        assert search_ideas_by_text("%") == []
+        assert search_ideas_by_text("   ") == []
+
+        update_idea(solar_id, "Heat pumps", "Efficient heating")
+        remove_idea(wind_id, "Wind farms")
+        assert search_ideas_by_text("solar") == []
+        assert search_ideas_by_text("wind") == []
+        assert [i['id'] for i in search_ideas_by_text("heat")] == [solar_id]
+
+    def test_search_ideas_by_text_without_fts(self) -> None:
+        """Without the FTS table the search falls back to a title substring match"""
+        init_database()
+        book_id = self._create_book()
 
-        cursor.execute("INSERT INTO tags (name) VALUES (?)", ("test-tag",))
-        cursor.execute("INSERT INTO relations (idea_id, tag_name) VALUES (?, ?)",
-                      (idea_id, "test-tag"))
+        conn = sqlite3.connect(self.test_db)
+        cursor = conn.cursor()
+        cursor.execute("DROP TABLE ideas_fts")
+        cursor.execute("DROP TRIGGER ideas_fts_insert")
+        cursor.execute(_SQL_INSERT_USER, ("testuser", "test@example.com", "hashed_password"))
+        user_id = cursor.lastrowid
+        cursor.execute(_SQL_INSERT_IDEA, ("Solar panels", "Content", user_id, book_id))
         conn.commit()
         conn.close()
 
-        result = get_tags_from_idea(idea_id)
-        assert len(result) == 1
-        assert result[0] == "test-tag"
+        result = search_ideas_by_text("lar pan")
+        assert [i['title'] for i in result] == ["Solar panels"]
+
+    def test_init_database_rebuilds_fts_with_old_tokenizer(self) -> None:
+        """An ideas_fts index from an older tokenizer is rebuilt as trigram and backfilled"""
+        init_database()
+        book_id = self._create_book()
+
+        conn = sqlite3.connect(self.test_db)
+        cursor = conn.cursor()
+        for trigger in ("ideas_fts_insert", "ideas_fts_update", "ideas_fts_delete"):
+            cursor.execute(f"DROP TRIGGER {trigger}")
+        cursor.execute("DROP TABLE ideas_fts")
+        cursor.execute("CREATE VIRTUAL TABLE ideas_fts USING fts5(title, content, content='ideas', "
+                       "content_rowid='id', tokenize='porter unicode61')")
+        cursor.execute(_SQL_INSERT_USER, ("testuser", "test@example.com", "hashed_password"))
+        user_id = cursor.lastrowid
+        cursor.execute(_SQL_INSERT_IDEA, ("Solar panels", "Content", user_id, book_id))
+        conn.commit()
+        conn.close()
+
+        close_pools()
+        init_database()
+
+        conn = sqlite3.connect(self.test_db)
+        sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'ideas_fts'").fetchone()[0]
+        conn.close()
+        assert "trigram" in sql
+        assert [i['title'] for i in search_ideas_by_text("olar")] == ["Solar panels"]
+
+    def test_get_tags_from_ideas(self) -> None:
+        """get_tags_from_ideas groups tags per idea in a single query"""
+        init_database()
+        book_id = self._create_book()
+
+        conn = sqlite3.connect(self.test_db)
+        cursor = conn.cursor()
+        cursor.execute(_SQL_INSERT_USER, ("testuser", "test@example.com", "hashed_password"))
+        user_id = cursor.lastrowid
+        ids = []
+        for title in ("One", "Two", "Untagged"):
+            cursor.execute(_SQL_INSERT_IDEA, (title, "Content", user_id, book_id))
+            ids.append(cursor.lastrowid)
+        cursor.executemany(_SQL_INSERT_RELATION, [(ids[0], "a"), (ids[0], "b"), (ids[1], "b")])
+        conn.commit()
+        conn.close()
+
+        result = get_tags_from_ideas([ids[0], ids[1], ids[2], ids[0]])
+        assert list(result) == ids
+        assert sorted(result[ids[0]]) == ["a", "b"]
+        assert result[ids[1]] == ["b"]
+        assert result[ids[2]] == []
+        assert get_tags_from_ideas([]) == {}
+        # Ids travel as one JSON parameter, so SQLite's bound-variable limit does not apply
+        many = get_tags_from_ideas(list(range(1, 33_001)))
+        assert len(many) == 33_000 and sorted(many[ids[0]]) == ["a", "b"]
     
-    @patch('backend.data_handler.ChromaClient')
-    def test_get_similar_idea(self, mock_chroma_client) -> None:
+    def test_get_similar_idea(self, mock_chroma) -> None:
         """Test get_similar_idea function"""
         init_database()
         book_id = self._create_book()
 
-        # Mock the ChromaClient to return test data
-        mock_instance = Mock()
-        mock_chroma_client.return_value = mock_instance
-        mock_instance.get_similar_idea.return_value = ["Test Idea"]
-
         # Insert test data
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-                      ("testuser", "test@example.com", "hashed_password"))
+        cursor.execute(_SQL_INSERT_USER, ("testuser", "test@example.com", "hashed_password"))
         user_id = cursor.lastrowid
 
-        cursor.execute("INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-                      ("Test Idea", "Test Content", user_id, book_id))
+        cursor.execute(_SQL_INSERT_IDEA, ("Test Idea", "Test Content", user_id, book_id))
+        first_id = cursor.lastrowid
+        cursor.execute(_SQL_INSERT_IDEA, ("Closer Idea", "Other Content", user_id, book_id))
+        second_id = cursor.lastrowid
         conn.commit()
         conn.close()
 
+        # Chroma returns document ids (ideas.id), most similar first; a
+        # leftover title id from an old index is skipped.
+        mock_chroma.get_similar_idea.return_value = [str(second_id), "Old Title", str(first_id)]
+
         result = get_similar_idea("Test Idea")
-        assert len(result) == 1
-        assert result[0]['title'] == "Test Idea"
+        assert [r['title'] for r in result] == ["Closer Idea", "Test Idea"]
     
-    @patch('backend.data_handler.ChromaClient')
-    def test_add_idea_success(self, mock_chroma_client) -> None:
+    def test_add_idea_success(self, mock_chroma) -> None:
         """Test add_idea function success case"""
         init_database()
         book_id = self._create_book()
 
-        # Mock the ChromaClient to avoid actual embedding operations
-        mock_instance = Mock()
-        mock_chroma_client.return_value = mock_instance
-
         # Insert user first
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-                      ("testuser", "test@example.com", "hashed_password"))
+        cursor.execute(_SQL_INSERT_USER, ("testuser", "test@example.com", "hashed_password"))
         conn.commit()
-        conn.close()
 
         result = add_idea("New Idea", "New Content", "test@example.com", book_id, tags=["tag1"])
         assert result > 0
 
         # Verify the idea was inserted with the correct book
-        conn = sqlite3.connect(self.test_db)
-        cursor = conn.cursor()
         cursor.execute("SELECT COUNT(*) FROM ideas WHERE title = ?", ("New Idea",))
         count = cursor.fetchone()[0]
-        conn.close()
         assert count == 1
 
-        conn = sqlite3.connect(self.test_db)
-        cursor = conn.cursor()
         cursor.execute("SELECT owner_id, book_id FROM ideas WHERE title = ?", ("New Idea",))
         row = cursor.fetchone()
         cursor.execute("SELECT id FROM users WHERE email = ?", ("test@example.com",))
@@ -316,20 +536,15 @@ class TestDataHandler:
         assert row[0] == user_id
         assert row[1] == book_id
 
-        mock_instance.insert_idea.assert_called_once_with(
-            title="New Idea", content="New Content", tags=["tag1"]
+        mock_chroma.insert_idea.assert_called_once_with(
+            idea_id=result, title="New Idea", content="New Content", tags=["tag1"]
         )
 
-    @patch('backend.data_handler.ChromaClient')
-    def test_add_idea_nonexistent_user(self, mock_chroma_client) -> None:
+    def test_add_idea_nonexistent_user(self, mock_chroma) -> None:
         """Test add_idea function with non-existent user email"""
         init_database()
         book_id = self._create_book()
 
-        # Mock the ChromaClient to avoid actual embedding operations
-        mock_instance = Mock()
-        mock_chroma_client.return_value = mock_instance
-
         # Try to add an idea with a non-existent user email
         result = add_idea("New Idea", "New Content", "nonexistent@example.com", book_id)
         assert result == -1
@@ -342,206 +557,279 @@ class TestDataHandler:
         conn.close()
         assert count == 0
     
-    def test_add_tag(self) -> None:
-        """Test add_tag function"""
+    @pytest.mark.parametrize("seeded, operation, expected", [
+        (False, add_tag, 1),
+        (True, remove_tag, 0),
+    ], ids=["add_tag", "remove_tag"])
+    def test_tag_writes(self, seeded, operation, expected) -> None:
+        """add_tag inserts a tag and remove_tag deletes it"""
         init_database()
-        
-        add_tag("test-tag")
-        
-        # Verify the tag was inserted
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
+        if seeded:
+            cursor.execute(_SQL_INSERT_TAG, ("test-tag",))
+            conn.commit()
+
+        operation("test-tag")
+
         cursor.execute("SELECT COUNT(*) FROM tags WHERE name = ?", ("test-tag",))
         count = cursor.fetchone()[0]
         conn.close()
-        assert count == 1
-    
-    def test_add_relation(self) -> None:
-        """Test add_relation function"""
+        assert count == expected
+
+    @pytest.mark.parametrize("related, operation, expected", [
+        (False, add_relation, 1),
+        (True, remove_relation, 0),
+    ], ids=["add_relation", "remove_relation"])
+    def test_relation_writes(self, related, operation, expected) -> None:
+        """add_relation links an idea to a tag and remove_relation unlinks it"""
         init_database()
-        book_id = self._create_book()
+        _, idea_id = self._seed_tagged_idea(relate=related)
 
-        # Insert test data
-        conn = sqlite3.connect(self.test_db)
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-                      ("testuser", "test@example.com", "hashed_password"))
-        user_id = cursor.lastrowid
-
-        cursor.execute("INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-                      ("Test Idea", "Test Content", user_id, book_id))
-        idea_id = cursor.lastrowid
-
-        cursor.execute("INSERT INTO tags (name) VALUES (?)", ("test-tag",))
-        conn.commit()
-        conn.close()
+        operation(idea_id, "test-tag")
 
-        add_relation(idea_id, "test-tag")
-        
-        # Verify the relation was inserted
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM relations WHERE idea_id = ? AND tag_name = ?", 
+        cursor.execute("SELECT COUNT(*) FROM relations WHERE idea_id = ? AND tag_name = ?",
                       (idea_id, "test-tag"))
         count = cursor.fetchone()[0]
         conn.close()
-        assert count == 1
-    
-    @patch('backend.data_handler.ChromaClient')
-    def test_remove_idea(self, mock_chroma_client) -> None:
+        assert count == expected
+
+    def test_remove_idea(self, mock_chroma) -> None:
         """Test remove_idea function"""
         init_database()
         book_id = self._create_book()
 
-        # Mock the ChromaClient to avoid actual embedding operations
-        mock_instance = Mock()
-        mock_chroma_client.return_value = mock_instance
-
         # Insert test data
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-                      ("testuser", "test@example.com", "hashed_password"))
+        cursor.execute(_SQL_INSERT_USER, ("testuser", "test@example.com", "hashed_password"))
         user_id = cursor.lastrowid
 
-        cursor.execute("INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-                      ("Test Idea", "Test Content", user_id, book_id))
+        cursor.execute(_SQL_INSERT_IDEA, ("Test Idea", "Test Content", user_id, book_id))
         idea_id = cursor.lastrowid
         conn.commit()
-        conn.close()
         
         remove_idea(idea_id, "Test Idea")
         
         # Verify the idea was removed
-        conn = sqlite3.connect(self.test_db)
-        cursor = conn.cursor()
         cursor.execute("SELECT COUNT(*) FROM ideas WHERE id = ?", (idea_id,))
         count = cursor.fetchone()[0]
         conn.close()
         assert count == 0
+        mock_chroma.remove_idea.assert_called_once_with(idea_id=idea_id)
     
-    def test_remove_tag(self) -> None:
-        """Test remove_tag function"""
+    def test_remove_relations_batch(self) -> None:
+        """remove_relations detaches only the listed tags"""
         init_database()
-        
-        # Insert test data
+        book_id = self._create_book()
+
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute("INSERT INTO tags (name) VALUES (?)", ("test-tag",))
+        cursor.execute(_SQL_INSERT_USER, ("testuser", "test@example.com", "hashed_password"))
+        user_id = cursor.lastrowid
+        cursor.execute(_SQL_INSERT_IDEA, ("Test Idea", "Test Content", user_id, book_id))
+        idea_id = cursor.lastrowid
+        cursor.executemany(_SQL_INSERT_RELATION, [(idea_id, "a"), (idea_id, "b"), (idea_id, "c")])
         conn.commit()
+
+        remove_relations(idea_id, ["a", "c"])
+        remove_relations(idea_id, [])
+
+        cursor.execute("SELECT tag_name FROM relations WHERE idea_id = ?", (idea_id,))
+        remaining = [row[0] for row in cursor.fetchall()]
         conn.close()
-        
-        remove_tag("test-tag")
-        
-        # Verify the tag was removed
-        conn = sqlite3.connect(self.test_db)
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM tags WHERE name = ?", ("test-tag",))
-        count = cursor.fetchone()[0]
-        conn.close()
-        assert count == 0
-    
-    def test_remove_relation(self) -> None:
-        """Test remove_relation function"""
+        assert remaining == ["b"]
+
+    def test_add_tags_and_relations_batch(self) -> None:
+        """add_tags/add_relations insert in one go and skip existing rows"""
         init_database()
         book_id = self._create_book()
 
-        # Insert test data
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-                      ("testuser", "test@example.com", "hashed_password"))
+        cursor.execute(_SQL_INSERT_USER, ("testuser", "test@example.com", "hashed_password"))
         user_id = cursor.lastrowid
-
-        cursor.execute("INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-                      ("Test Idea", "Test Content", user_id, book_id))
+        cursor.execute(_SQL_INSERT_IDEA, ("Test Idea", "Test Content", user_id, book_id))
         idea_id = cursor.lastrowid
-
-        cursor.execute("INSERT INTO tags (name) VALUES (?)", ("test-tag",))
-        cursor.execute("INSERT INTO relations (idea_id, tag_name) VALUES (?, ?)",
-                      (idea_id, "test-tag"))
+        cursor.execute(_SQL_INSERT_TAG, ("a",))
+        cursor.execute(_SQL_INSERT_RELATION, (idea_id, "a"))
         conn.commit()
+
+        add_tags(["a", "b", "c", "b"])
+        add_relations(idea_id, ["a", "b", "c"])
+        add_tags([])
+        add_relations(idea_id, [])
+
+        cursor.execute("SELECT name FROM tags ORDER BY name")
+        tags = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT tag_name FROM relations WHERE idea_id = ? ORDER BY tag_name", (idea_id,))
+        relations = [row[0] for row in cursor.fetchall()]
         conn.close()
-        
-        remove_relation(idea_id, "test-tag")
-        
-        # Verify the relation was removed
+        assert tags == ["a", "b", "c"]
+        assert relations == ["a", "b", "c"]
+
+    def test_add_tags_and_relations_single_transaction(self) -> None:
+        """add_tags_and_relations creates missing tags and links them in one commit"""
+        init_database()
+        book_id = self._create_book()
+
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM relations WHERE idea_id = ? AND tag_name = ?", 
-                      (idea_id, "test-tag"))
-        count = cursor.fetchone()[0]
+        cursor.execute(_SQL_INSERT_USER, ("testuser", "test@example.com", "hashed_password"))
+        user_id = cursor.lastrowid
+        cursor.execute(_SQL_INSERT_IDEA, ("Test Idea", "Test Content", user_id, book_id))
+        idea_id = cursor.lastrowid
+        cursor.execute(_SQL_INSERT_TAG, ("a",))
+        conn.commit()
         conn.close()
-        assert count == 0
-    
-    @patch('backend.data_handler.ChromaClient')
-    def test_update_idea(self, mock_chroma_client) -> None:
+
+        with get_conn(write=True) as writer:
+            before = writer.total_changes
+        add_tags_and_relations(idea_id, ["a", "b"])
+        add_tags_and_relations(idea_id, [])
+        with get_conn(write=True) as writer:
+            # 1 new tag + 2 relations, all through the pooled writer
+            assert writer.total_changes - before == 3
+
+        assert sorted(get_tags_from_idea(idea_id)) == ["a", "b"]
+        assert get_tags() == [{"name": "a"}, {"name": "b"}]
+
+    def test_update_idea(self, mock_chroma) -> None:
         """Test update_idea function"""
         init_database()
         book_id = self._create_book()
 
-        # Mock the ChromaClient to avoid actual embedding operations
-        mock_instance = Mock()
-        mock_chroma_client.return_value = mock_instance
-
         # Insert test data
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-                      ("testuser", "test@example.com", "hashed_password"))
+        cursor.execute(_SQL_INSERT_USER, ("testuser", "test@example.com", "hashed_password"))
         user_id = cursor.lastrowid
 
-        cursor.execute("INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-                      ("Test Idea", "Test Content", user_id, book_id))
+        cursor.execute(_SQL_INSERT_IDEA, ("Test Idea", "Test Content", user_id, book_id))
         idea_id = cursor.lastrowid
         conn.commit()
-        conn.close()
         
         update_idea(idea_id, "Updated Idea", "Updated Content", tags=["tag1"])
 
         # Verify the idea was updated
-        conn = sqlite3.connect(self.test_db)
-        cursor = conn.cursor()
         cursor.execute("SELECT title, content FROM ideas WHERE id = ?", (idea_id,))
         result = cursor.fetchone()
         conn.close()
         assert result[0] == "Updated Idea"
         assert result[1] == "Updated Content"
-
-        mock_instance.update_idea.assert_called_once_with(
-            title="Updated Idea", content="Updated Content", tags=["tag1"]
+        assert get_tags_from_idea(idea_id) == ["tag1"]
+        mock_chroma.update_idea.assert_called_once_with(
+            idea_id=idea_id, title="Updated Idea", content="Updated Content", tags=["tag1"]
         )
 
-    @patch('backend.data_handler.ChromaClient')
-    def test_embed_all_ideas(self, mock_chroma_client) -> None:
-        """Test embed_all_ideas function"""
+    def test_replace_tags(self) -> None:
+        """replace_tags leaves exactly the given tags attached, creating missing ones"""
         init_database()
         book_id = self._create_book()
 
-        # Mock the ChromaClient to avoid actual embedding operations
-        mock_instance = Mock()
-        mock_chroma_client.return_value = mock_instance
-
-        # Insert test data
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-                      ("testuser", "test@example.com", "hashed_password"))
+        cursor.execute(_SQL_INSERT_USER, ("testuser", "test@example.com", "hashed_password"))
         user_id = cursor.lastrowid
+        cursor.execute(_SQL_INSERT_IDEA, ("Test Idea", "Test Content", user_id, book_id))
+        idea_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+
+        add_tags_and_relations(idea_id, ["a", "b"])
+        replace_tags(idea_id, ["b", "c's", 'd"'])
+        assert sorted(get_tags_from_idea(idea_id)) == ["b", "c's", 'd"']
+        assert {tag["name"] for tag in get_tags()} == {"a", "b", "c's", 'd"'}
 
-        cursor.execute("INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-                      ("Test Idea", "Test Content", user_id, book_id))
+        replace_tags(idea_id, [])
+        assert get_tags_from_idea(idea_id) == []
+
+    def test_add_and_update_idea_store_tags(self) -> None:
+        """add_idea links its tags with the new row; update_idea reconciles them"""
+        init_database()
+        book_id = self._create_book()
+
+        conn = sqlite3.connect(self.test_db)
+        conn.execute(_SQL_INSERT_USER, ("testuser", "test@example.com", "hashed_password"))
         conn.commit()
         conn.close()
-        
+
+        idea_id = add_idea("Tagged", "Content", "test@example.com", book_id, tags=["a", "b"])
+        assert sorted(get_tags_from_idea(idea_id)) == ["a", "b"]
+
+        update_idea(idea_id, "Tagged", "Content", tags=["b", "c"])
+        assert sorted(get_tags_from_idea(idea_id)) == ["b", "c"]
+
+        # No tags given: relations are left as they are
+        update_idea(idea_id, "Tagged", "New content")
+        assert sorted(get_tags_from_idea(idea_id)) == ["b", "c"]
+
+    def test_embed_all_ideas(self, mock_chroma) -> None:
+        """Test embed_all_ideas function"""
+        init_database()
+        book_id = self._create_book()
+
+        _, ids = self._seed_ideas(100, book_id)
+
         # This should not raise an exception
         embed_all_ideas()
 
-        # Verify the collection was deleted and bulk_insert was called
-        mock_instance.client.delete_collection.assert_called_once_with(
-            mock_instance.collection.name
+        # Verify the collection was deleted and every idea went through one bulk_insert
+        mock_chroma.client.delete_collection.assert_called_once_with(
+            mock_chroma.collection.name
         )
-        mock_instance.bulk_insert.assert_called_once()
+        mock_chroma.bulk_insert.assert_called_once()
+        assert [item["id"] for item in mock_chroma.bulk_insert.call_args[0][0]] == ids
+
+    @patch('backend.data_handler._EMBED_BATCH_SIZE', 2)
+    def test_embed_all_ideas_in_chunks(self, mock_chroma) -> None:
+        """embed_all_ideas hands ideas to bulk_insert in fixed-size chunks"""
+        init_database()
+        book_id = self._create_book()
+        self._seed_ideas(3, book_id)
+
+        embed_all_ideas()
+
+        chunk_sizes = [len(c[0][0]) for c in mock_chroma.bulk_insert.call_args_list]
+        assert chunk_sizes == [2, 1]
+
+    def test_chroma_client_is_shared_until_swapped(self) -> None:
+        """add/update reuse one ChromaClient; patching the class builds a new one"""
+        from backend import data_handler
+        with patch('backend.data_handler.ChromaClient') as first:
+            assert data_handler._get_chroma() is data_handler._get_chroma()
+            first.assert_called_once()
+        with patch('backend.data_handler.ChromaClient') as second:
+            data_handler._get_chroma()
+            second.assert_called_once()
+
+    def test_iter_ideas_streams_in_chunks(self) -> None:
+        """iter_ideas yields every idea with its tags across several fetches"""
+        init_database()
+        book_id = self._create_book()
+        other_book = self._create_book("Other")
+
+        conn = sqlite3.connect(self.test_db)
+        cursor = conn.cursor()
+        cursor.execute(_SQL_INSERT_USER, ("testuser", "test@example.com", "hashed_password"))
+        user_id = cursor.lastrowid
+        cursor.executemany(_SQL_INSERT_IDEA,
+                           [(f"Idea {i}", "Content", user_id, book_id) for i in range(3)]
+                           + [("Elsewhere", "Content", user_id, other_book)])
+        cursor.execute("INSERT INTO tags (name) VALUES ('t1'), ('t2')")
+        cursor.execute("INSERT INTO relations (idea_id, tag_name) VALUES (1, 't1'), (1, 't2')")
+        conn.commit()
+        conn.close()
+
+        ideas = list(iter_ideas(book_id=book_id, chunksize=2))
+        assert [i["title"] for i in ideas] == ["Idea 0", "Idea 1", "Idea 2"]
+        assert sorted(ideas[0]["tags"].split(";")) == ["t1", "t2"]
+        assert ideas[1]["tags"] == ""
+        assert len(list(iter_ideas())) == 4
+        assert [i["title"] for i in iter_ideas(book_id=book_id, limit=1, offset=1)] == ["Idea 1"]
+        assert [i["title"] for i in iter_ideas(offset=3)] == ["Elsewhere"]
 
     def test_get_user_ideas_empty(self) -> None:
         """Test get_user_ideas when user has no ideas"""
@@ -550,7 +838,7 @@ class TestDataHandler:
         # Insert a user
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)", 
+        cursor.execute(_SQL_INSERT_USER, 
                       ("testuser", "test@example.com", "hashed_password"))
         conn.commit()
         conn.close()
@@ -569,35 +857,28 @@ class TestDataHandler:
         cursor = conn.cursor()
 
         # Insert two users
-        cursor.execute("INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-                      ("user1", "user1@example.com", "hashed_password"))
+        cursor.execute(_SQL_INSERT_USER, ("user1", "user1@example.com", "hashed_password"))
         user1_id = cursor.lastrowid
 
-        cursor.execute("INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-                      ("user2", "user2@example.com", "hashed_password"))
+        cursor.execute(_SQL_INSERT_USER, ("user2", "user2@example.com", "hashed_password"))
         user2_id = cursor.lastrowid
 
         # Insert ideas for user1
-        cursor.execute("INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-                      ("User1 Idea", "User1 Content", user1_id, book_id))
+        cursor.execute(_SQL_INSERT_IDEA, ("User1 Idea", "User1 Content", user1_id, book_id))
         idea1_id = cursor.lastrowid
 
-        cursor.execute("INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-                      ("User1 Idea 2", "User1 Content 2", user1_id, book_id))
+        cursor.execute(_SQL_INSERT_IDEA, ("User1 Idea 2", "User1 Content 2", user1_id, book_id))
 
         # Insert idea for user2
-        cursor.execute("INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-                      ("User2 Idea", "User2 Content", user2_id, book_id))
+        cursor.execute(_SQL_INSERT_IDEA, ("User2 Idea", "User2 Content", user2_id, book_id))
 
         # Add tags
-        cursor.execute("INSERT INTO tags (name) VALUES (?)", ("tag1",))
-        cursor.execute("INSERT INTO tags (name) VALUES (?)", ("tag2",))
+        cursor.execute(_SQL_INSERT_TAG, ("tag1",))
+        cursor.execute(_SQL_INSERT_TAG, ("tag2",))
 
         # Add relations
-        cursor.execute("INSERT INTO relations (idea_id, tag_name) VALUES (?, ?)",
-                      (idea1_id, "tag1"))
-        cursor.execute("INSERT INTO relations (idea_id, tag_name) VALUES (?, ?)",
-                      (idea1_id, "tag2"))
+        cursor.execute(_SQL_INSERT_RELATION, (idea1_id, "tag1"))
+        cursor.execute(_SQL_INSERT_RELATION, (idea1_id, "tag2"))
 
         conn.commit()
         conn.close()
@@ -623,7 +904,7 @@ class TestDataHandler:
         # Insert a user
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)", 
+        cursor.execute(_SQL_INSERT_USER, 
                       ("testuser", "test@example.com", "hashed_password"))
         conn.commit()
         conn.close()
@@ -642,12 +923,10 @@ class TestDataHandler:
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
 
-        cursor.execute("INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-                      ("testuser", "test@example.com", "hashed_password"))
+        cursor.execute(_SQL_INSERT_USER, ("testuser", "test@example.com", "hashed_password"))
         user_id = cursor.lastrowid
 
-        cursor.execute("INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-                      ("Idea without tags", "Content", user_id, book_id))
+        cursor.execute(_SQL_INSERT_IDEA, ("Idea without tags", "Content", user_id, book_id))
         conn.commit()
         conn.close()
         
@@ -660,24 +939,7 @@ class TestDataHandler:
     def test_get_idea_from_tags(self) -> None:
         """Test get_idea_from_tags function"""
         init_database()
-        book_id = self._create_book()
-
-        # Insert test data
-        conn = sqlite3.connect(self.test_db)
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-                      ("testuser", "test@example.com", "hashed_password"))
-        user_id = cursor.lastrowid
-
-        cursor.execute("INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-                      ("Test Idea", "Test Content", user_id, book_id))
-        idea_id = cursor.lastrowid
-
-        cursor.execute("INSERT INTO tags (name) VALUES (?)", ("test-tag",))
-        cursor.execute("INSERT INTO relations (idea_id, tag_name) VALUES (?, ?)",
-                      (idea_id, "test-tag"))
-        conn.commit()
-        conn.close()
+        book_id, idea_id = self._seed_tagged_idea()
         
         # Test with single tag
         result = get_idea_from_tags("test-tag")
@@ -700,21 +962,16 @@ class TestDataHandler:
 
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-                      ("voter", "voter@example.com", "secret"))
+        cursor.execute(_SQL_INSERT_USER, ("voter", "voter@example.com", "secret"))
         user_id = cursor.lastrowid
 
-        cursor.execute("INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-                      ("Tagged Idea", "Content", user_id, book_id))
+        cursor.execute(_SQL_INSERT_IDEA, ("Tagged Idea", "Content", user_id, book_id))
         idea_id = cursor.lastrowid
 
-        cursor.execute("INSERT INTO tags (name) VALUES (?)", ("my-tag",))
-        cursor.execute("INSERT INTO relations (idea_id, tag_name) VALUES (?, ?)", (idea_id, "my-tag"))
+        cursor.execute(_SQL_INSERT_TAG, ("my-tag",))
+        cursor.execute(_SQL_INSERT_RELATION, (idea_id, "my-tag"))
 
-        cursor.execute(
-            "INSERT INTO idea_votes (idea_id, user_id, value, created_at) VALUES (?, ?, ?, datetime('now'))",
-            (idea_id, user_id, 1)
-        )
+        cursor.execute(_SQL_INSERT_VOTE, (idea_id, user_id, 1))
         conn.commit()
         conn.close()
 
@@ -722,6 +979,33 @@ class TestDataHandler:
         assert len(result) == 1
         assert result[0]['score'] == 1
 
+    def test_get_idea_from_tags_requires_all_tags(self) -> None:
+        """Only ideas carrying every requested tag match; tags and score are not inflated"""
+        init_database()
+        book_id = self._create_book()
+
+        conn = sqlite3.connect(self.test_db)
+        cursor = conn.cursor()
+        cursor.execute(_SQL_INSERT_USER, ("voter", "voter@example.com", "secret"))
+        user_id = cursor.lastrowid
+        cursor.execute(_SQL_INSERT_IDEA, ("Both", "Content", user_id, book_id))
+        both_id = cursor.lastrowid
+        cursor.execute(_SQL_INSERT_IDEA, ("Only A", "Content", user_id, book_id))
+        only_a_id = cursor.lastrowid
+        cursor.executemany(_SQL_INSERT_TAG, [("a",), ("b",), ("c",)])
+        cursor.executemany(_SQL_INSERT_RELATION,
+                           [(both_id, "a"), (both_id, "b"), (both_id, "c"), (only_a_id, "a")])
+        cursor.execute("INSERT INTO idea_votes (idea_id, user_id, value) VALUES (?, ?, ?)", (both_id, user_id, 1))
+        conn.commit()
+        conn.close()
+
+        result = get_idea_from_tags("a;b;a")
+        assert [r['title'] for r in result] == ["Both"]
+        assert sorted(result[0]['tags'].split(";")) == ["a", "b", "c"]
+        assert result[0]['score'] == 1
+
+        assert [r['title'] for r in get_idea_from_tags("a")] == ["Both", "Only A"]
+
     def test_get_idea_from_tags_nonexistent_tag(self) -> None:
         """Test get_idea_from_tags with non-existent tag"""
         init_database()
@@ -738,21 +1022,18 @@ class TestDataHandler:
 
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-                      ("testuser", "test@example.com", "hashed_password"))
+        cursor.execute(_SQL_INSERT_USER, ("testuser", "test@example.com", "hashed_password"))
         user_id = cursor.lastrowid
 
-        cursor.execute("INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-                      ("Idea Book1", "Content 1", user_id, book_id_1))
+        cursor.execute(_SQL_INSERT_IDEA, ("Idea Book1", "Content 1", user_id, book_id_1))
         idea_id_1 = cursor.lastrowid
 
-        cursor.execute("INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-                      ("Idea Book2", "Content 2", user_id, book_id_2))
+        cursor.execute(_SQL_INSERT_IDEA, ("Idea Book2", "Content 2", user_id, book_id_2))
         idea_id_2 = cursor.lastrowid
 
-        cursor.execute("INSERT INTO tags (name) VALUES (?)", ("shared-tag",))
-        cursor.execute("INSERT INTO relations (idea_id, tag_name) VALUES (?, ?)", (idea_id_1, "shared-tag"))
-        cursor.execute("INSERT INTO relations (idea_id, tag_name) VALUES (?, ?)", (idea_id_2, "shared-tag"))
+        cursor.execute(_SQL_INSERT_TAG, ("shared-tag",))
+        cursor.execute(_SQL_INSERT_RELATION, (idea_id_1, "shared-tag"))
+        cursor.execute(_SQL_INSERT_RELATION, (idea_id_2, "shared-tag"))
         conn.commit()
         conn.close()
 
@@ -775,22 +1056,19 @@ class TestDataHandler:
 
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-                      ("testuser", "test@example.com", "hashed_password"))
+        cursor.execute(_SQL_INSERT_USER, ("testuser", "test@example.com", "hashed_password"))
         user_id = cursor.lastrowid
 
-        cursor.execute("INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-                      ("Idea Book1", "Content 1", user_id, book_id_1))
+        cursor.execute(_SQL_INSERT_IDEA, ("Idea Book1", "Content 1", user_id, book_id_1))
         idea_id_1 = cursor.lastrowid
 
-        cursor.execute("INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-                      ("Idea Book2", "Content 2", user_id, book_id_2))
+        cursor.execute(_SQL_INSERT_IDEA, ("Idea Book2", "Content 2", user_id, book_id_2))
         idea_id_2 = cursor.lastrowid
 
-        cursor.execute("INSERT INTO tags (name) VALUES (?)", ("tag-book1",))
-        cursor.execute("INSERT INTO tags (name) VALUES (?)", ("tag-book2",))
-        cursor.execute("INSERT INTO relations (idea_id, tag_name) VALUES (?, ?)", (idea_id_1, "tag-book1"))
-        cursor.execute("INSERT INTO relations (idea_id, tag_name) VALUES (?, ?)", (idea_id_2, "tag-book2"))
+        cursor.execute(_SQL_INSERT_TAG, ("tag-book1",))
+        cursor.execute(_SQL_INSERT_TAG, ("tag-book2",))
+        cursor.execute(_SQL_INSERT_RELATION, (idea_id_1, "tag-book1"))
+        cursor.execute(_SQL_INSERT_RELATION, (idea_id_2, "tag-book2"))
         conn.commit()
         conn.close()
 
@@ -858,18 +1136,12 @@ class TestDataHandler:
 
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-            ("author1", "author1@example.com", "secret"),
-        )
+        cursor.execute(_SQL_INSERT_USER, ("author1", "author1@example.com", "secret"))
         user_id = cursor.lastrowid
         conn.commit()
-        conn.close()
 
         add_book_author(book_id, user_id)
 
-        conn = sqlite3.connect(self.test_db)
-        cursor = conn.cursor()
         cursor.execute(
             "SELECT COUNT(*) FROM book_authors WHERE book_id = ? AND user_id = ?",
             (book_id, user_id),
@@ -885,21 +1157,15 @@ class TestDataHandler:
 
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-            ("author2", "author2@example.com", "secret"),
-        )
+        cursor.execute(_SQL_INSERT_USER, ("author2", "author2@example.com", "secret"))
         user_id = cursor.lastrowid
         cursor.execute(
             "INSERT INTO book_authors (book_id, user_id) VALUES (?, ?)", (book_id, user_id)
         )
         conn.commit()
-        conn.close()
 
         remove_book_author(book_id, user_id)
 
-        conn = sqlite3.connect(self.test_db)
-        cursor = conn.cursor()
         cursor.execute(
             "SELECT COUNT(*) FROM book_authors WHERE book_id = ? AND user_id = ?",
             (book_id, user_id),
@@ -915,15 +1181,9 @@ class TestDataHandler:
 
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-            ("alice", "alice@example.com", "secret"),
-        )
+        cursor.execute(_SQL_INSERT_USER, ("alice", "alice@example.com", "secret"))
         alice_id = cursor.lastrowid
-        cursor.execute(
-            "INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-            ("bob", "bob@example.com", "secret"),
-        )
+        cursor.execute(_SQL_INSERT_USER, ("bob", "bob@example.com", "secret"))
         bob_id = cursor.lastrowid
         cursor.execute(
             "INSERT INTO book_authors (book_id, user_id) VALUES (?, ?)", (book_id, alice_id)
@@ -944,14 +1204,8 @@ class TestDataHandler:
         init_database()
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-            ("alice", "alice@example.com", "secret1"),
-        )
-        cursor.execute(
-            "INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-            ("bob", "bob@example.com", "secret2"),
-        )
+        cursor.execute(_SQL_INSERT_USER, ("alice", "alice@example.com", "secret1"))
+        cursor.execute(_SQL_INSERT_USER, ("bob", "bob@example.com", "secret2"))
         conn.commit()
         conn.close()
 
@@ -977,41 +1231,24 @@ class TestDataHandler:
 class TestVoting:
     """Unit tests for idea_votes CRUD functions."""
 
-    def setup_method(self):
-        import tempfile
-        self._tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
-        self.test_db = self._tmp.name
-        self._tmp.close()
-        os.environ["NAME_DB"] = self.test_db
-        init_database()
+    @pytest.fixture(autouse=True)
+    def _seed(self, test_db):
+        self.test_db = test_db
 
         # Seed one user, one book, one idea
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-            ("alice", "alice@example.com", "secret"),
-        )
+        cursor.execute(_SQL_INSERT_USER, ("alice", "alice@example.com", "secret"))
         self.alice_id = cursor.lastrowid
-        cursor.execute(
-            "INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-            ("bob", "bob@example.com", "secret"),
-        )
+        cursor.execute(_SQL_INSERT_USER, ("bob", "bob@example.com", "secret"))
         self.bob_id = cursor.lastrowid
-        cursor.execute("INSERT INTO books (title) VALUES (?)", ("Test Book",))
+        cursor.execute(_SQL_INSERT_BOOK, ("Test Book",))
         book_id = cursor.lastrowid
-        cursor.execute(
-            "INSERT INTO ideas (title, content, owner_id, book_id) VALUES (?, ?, ?, ?)",
-            ("Test Idea", "Some content", self.alice_id, book_id),
-        )
+        cursor.execute(_SQL_INSERT_IDEA, ("Test Idea", "Some content", self.alice_id, book_id))
         self.idea_id = cursor.lastrowid
         conn.commit()
         conn.close()
 
-    def teardown_method(self):
-        if os.path.exists(self.test_db):
-            os.remove(self.test_db)
-
     def test_init_database_creates_idea_votes_table(self):
         conn = sqlite3.connect(self.test_db)
         cursor = conn.cursor()
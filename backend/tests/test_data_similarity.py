@@ -1,7 +1,6 @@
-import sys
-import os
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-
+import json
+import threading
+from unittest.mock import patch
 import pytest
 import numpy as np
 
@@ -17,6 +16,7 @@ from backend.data_similarity import (
     DataSimilarity,
     SectionOrderer,
 )
+from backend import data_similarity
 from backend.llm_client import LlmUnavailableError
 
 
@@ -147,6 +147,52 @@ class TestFileTocCache:
         cache = FileTocCache(cache_path=str(path))
         assert cache.load() is None
 
+    def test_large_structure_is_gzipped_and_round_trips(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(FileTocCache, "_GZIP_THRESHOLD", 100)
+        path = tmp_path / "toc.json"
+        cache = FileTocCache(cache_path=str(path))
+        structure = [{"title": f"Section {i}", "type": "heading", "children": []} for i in range(20)]
+        cache.save(structure)
+
+        assert path.read_bytes()[:2] == b"\x1f\x8b"
+        assert cache.load() == structure
+
+    def test_small_structure_stays_plain_json(self, tmp_path):
+        path = tmp_path / "toc.json"
+        FileTocCache(cache_path=str(path)).save([{"title": "A"}])
+        assert json.loads(path.read_text()) == [{"title": "A"}]
+
+    def test_save_replaces_file_atomically(self, tmp_path):
+        path = tmp_path / "toc.json"
+        cache = FileTocCache(cache_path=str(path))
+        cache.save([{"title": "old"}])
+        cache.save([{"title": "new"}])
+        assert cache.load() == [{"title": "new"}]
+        assert not (tmp_path / "toc.json.tmp").exists()
+
+    def test_load_reuses_parsed_structure_while_file_unchanged(self, tmp_path):
+        path = str(tmp_path / "toc.json")
+        FileTocCache(cache_path=path).save([{"title": "A"}])
+
+        first = FileTocCache(cache_path=path).load()
+        with patch.object(data_similarity.orjson, "loads") as mock_loads:
+            second = FileTocCache(cache_path=path).load()
+        mock_loads.assert_not_called()
+        assert second is first
+
+    def test_etag_tracks_file_version(self, tmp_path):
+        path = tmp_path / "toc.json"
+        cache = FileTocCache(cache_path=str(path))
+        assert cache.etag() is None
+
+        cache.save([{"title": "old"}])
+        old_tag = cache.etag()
+        assert old_tag.startswith('"') and old_tag == cache.etag()
+
+        cache.save([{"title": "newer"}])
+        assert cache.etag() != old_tag
+        assert cache.load() == [{"title": "newer"}]
+
 
 # ---------------------------------------------------------------------------
 # EmbeddingAnalyzer
@@ -232,6 +278,31 @@ class TestConstrainedClusteringAnalyzer:
         assert result.originalities.min() >= 0.0
         assert result.originalities.max() <= 1.0
 
+    def test_large_input_uses_minibatch_kmeans(self):
+        """Above the agglomerative limit (lowered here), separated blobs are still recovered, without Ward."""
+        rng = np.random.default_rng(0)
+        centers = np.array([[0.0, 0.0], [10.0, 0.0], [0.0, 10.0]])
+        X = np.vstack([c + rng.normal(scale=0.3, size=(40, 2)) for c in centers]).astype("float32")
+
+        analyzer = ConstrainedClusteringAnalyzer()
+        with (
+            patch.object(ConstrainedClusteringAnalyzer, "_AGGLOMERATIVE_MAX_POINTS", 64),
+            patch("backend.data_similarity.AgglomerativeClustering") as ward,
+        ):
+            labels = analyzer._best_k_labels(X, 2, 5)
+        ward.assert_not_called()
+        assert len(np.unique(labels)) == 3
+        for start in (0, 40, 80):
+            assert len(np.unique(labels[start:start + 40])) == 1
+
+    def test_typical_input_keeps_ward(self):
+        """Libraries well below the agglomerative limit keep Ward's section layout."""
+        X = np.random.default_rng(0).normal(size=(120, 5)).astype("float32")
+
+        with patch("backend.data_similarity.MiniBatchKMeans") as kmeans:
+            ConstrainedClusteringAnalyzer()._best_k_labels(X, 2, 3)
+        kmeans.assert_not_called()
+
     def test_labels_contain_integers(self):
         analyzer = ConstrainedClusteringAnalyzer(min_clusters=2, max_clusters=5)
         result = analyzer.analyze(_random_embeddings(20, dim=16))
@@ -265,6 +336,32 @@ class TestConstrainedClusteringAnalyzer:
                 )
 
 
+# ---------------------------------------------------------------------------
+# UMAP reduction cache
+# ---------------------------------------------------------------------------
+
+@pytest.mark.unit
+class TestUmapReduceCache:
+    def setup_method(self):
+        data_similarity._umap_cache.clear()
+
+    def test_identical_input_is_fitted_once(self):
+        X = np.asarray(_random_embeddings(12), dtype=np.float32)
+        with patch.object(data_similarity.umap, "UMAP") as umap_cls:
+            umap_cls.return_value.fit_transform.return_value = np.zeros((12, 2))
+            first = data_similarity._umap_reduce(X, 5, 2, 42)
+            second = data_similarity._umap_reduce(X.copy(), 5, 2, 42)
+            data_similarity._umap_reduce(X, 5, 3, 42)
+        assert second is first
+        assert umap_cls.call_count == 2  # the n_components=3 call is a new key
+
+    def test_cache_is_bounded(self):
+        with patch.object(data_similarity.umap, "UMAP") as umap_cls:
+            umap_cls.return_value.fit_transform.return_value = np.zeros((4, 2))
+            for seed in range(data_similarity._UMAP_CACHE_SIZE + 3):
+                data_similarity._umap_reduce(np.full((4, 3), seed, dtype=np.float32), 2, 2, 42)
+        assert len(data_similarity._umap_cache) == data_similarity._UMAP_CACHE_SIZE
+
 # ---------------------------------------------------------------------------
 # TitleGenerator
 # ---------------------------------------------------------------------------
@@ -360,6 +457,43 @@ class TestTocTreeBuilder:
         entries = builder.build(data, max_depth=max_depth)
         assert max_heading_level(entries) <= max_depth
 
+    def test_chapter_analyzer_receives_row_subset_of_float32_matrix(self):
+        """Sections are sliced out of one float32 matrix, not rebuilt from lists."""
+        seen: list = []
+
+        class RecordingAnalyzer(FakeAnalyzer):
+            def analyze(self, embeddings):
+                seen.append(embeddings)
+                return super().analyze(embeddings)
+
+        data = _make_idea_data(n=20)
+        TocTreeBuilder(FakeAnalyzer(), TitleGenerator(), chapter_analyzer=RecordingAnalyzer()).build(data)
+
+        full = np.asarray(data.embeddings, dtype=np.float32)
+        assert [type(e) for e in seen] == [np.ndarray, np.ndarray]
+        assert all(e.dtype == np.float32 for e in seen)
+        np.testing.assert_array_equal(seen[0], full[:10])
+
+    def test_parallel_chapter_build_matches_serial(self):
+        """Large inputs build chapters on worker threads without changing the tree."""
+        threads: set[str] = set()
+
+        class RecordingAnalyzer(FakeAnalyzer):
+            def analyze(self, embeddings):
+                threads.add(threading.current_thread().name)
+                return super().analyze(embeddings)
+
+        data = _make_idea_data(n=20)
+        serial = TocTreeBuilder(FakeAnalyzer(), TitleGenerator()).build(data)
+
+        builder = TocTreeBuilder(FakeAnalyzer(), TitleGenerator(), chapter_analyzer=RecordingAnalyzer())
+        builder._PARALLEL_MIN_IDEAS = 0
+        builder._MAX_CHAPTER_WORKERS = 2
+        parallel = builder.build(data)
+
+        assert [e.to_dict() for e in parallel] == [e.to_dict() for e in serial]
+        assert threads and all(name.startswith("toc-chapters") for name in threads)
+
     def test_all_ids_present_in_tree(self):
         """No idea should be lost or duplicated during tree construction."""
         builder = self._make_builder()
@@ -377,6 +511,14 @@ class TestTocTreeBuilder:
         found_ids = collect_ids(entries)
         assert sorted(found_ids) == sorted(data.ids)
 
+    def test_leaf_title_comes_from_metadata_not_document_id(self):
+        """Chroma ids are SQLite ids; the human title lives in metadata."""
+        data = _make_idea_data(n=3)
+        data.ids = ["1", "2", "3"]
+        entries = self._make_builder().build(data)
+        assert [e.title for e in entries] == ["id_0", "id_1", "id_2"]
+        assert [e.id for e in entries] == ["1", "2", "3"]
+
     def test_leaf_text_comes_from_metadata(self):
         """Leaf text must equal metadata['description'], not the raw document."""
         builder = self._make_builder()
@@ -437,6 +579,37 @@ class TestDataSimilarity:
         ds, cache, _ = self._make_ds()
         assert ds.load_toc_structure() is None
 
+    def test_load_or_generate_builds_once(self):
+        """Concurrent cache misses share a single build."""
+        ds, cache, repo = self._make_ds()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        get_all_ideas = repo.get_all_ideas
+
+        def slow_get_all_ideas(*args, **kwargs):
+            calls.append(threading.current_thread().name)
+            started.set()
+            release.wait(5)
+            return get_all_ideas(*args, **kwargs)
+
+        repo.get_all_ideas = slow_get_all_ideas
+        results = []
+        workers = [threading.Thread(target=lambda: results.append(ds.load_or_generate_toc_structure()))
+                   for _ in range(3)]
+        workers[0].start()
+        assert started.wait(5)
+        for worker in workers[1:]:
+            worker.start()
+        release.set()
+        for worker in workers:
+            worker.join(5)
+
+        assert len(calls) == 1
+        assert len(results) == 3 and all(result == results[0] for result in results)
+        assert ds.load_or_generate_toc_structure() == cache.load()
+        assert len(calls) == 1
+
     def test_result_contains_required_keys(self):
         ds, _, _ = self._make_ds()
         result = ds.generate_toc_structure()
@@ -1,7 +1,4 @@
 import sys
-import os
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-
 import json
 import pytest
 from unittest.mock import patch, MagicMock
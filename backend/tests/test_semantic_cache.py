@@ -0,0 +1,76 @@
+import threading
+
+import numpy as np
+import pytest
+
+from backend.semantic_cache import SemanticCache
+
+
+@pytest.mark.unit
+class TestSemanticCache:
+    def test_empty_cache_misses(self):
+        assert SemanticCache().lookup([1.0, 0.0]) is None
+
+    def test_hit_above_threshold_and_miss_below(self):
+        cache = SemanticCache(threshold=0.95)
+        cache.add([1.0, 0.0], "east")
+        cache.add([0.0, 1.0], "north")
+
+        assert cache.lookup([10.0, 0.5]) == "east"   # scale does not matter
+        assert cache.lookup([0.1, 1.0]) == "north"
+        assert cache.lookup([1.0, 1.0]) is None      # cos = 0.707
+
+    def test_grows_then_overwrites_least_recently_used(self):
+        cache = SemanticCache(threshold=0.999, max_entries=20)
+        basis = np.eye(32, dtype=np.float32)
+        for i in range(25):
+            cache.add(basis[i], i)
+
+        assert len(cache) == 20
+        assert cache.lookup(basis[0]) is None   # overwritten by entry 20
+        assert cache.lookup(basis[4]) is None   # overwritten by entry 24
+        assert cache.lookup(basis[5]) == 5
+        assert cache.lookup(basis[24]) == 24
+
+    def test_hit_protects_entry_from_eviction(self):
+        cache = SemanticCache(threshold=0.999, max_entries=3)
+        basis = np.eye(8, dtype=np.float32)
+        for i in range(3):
+            cache.add(basis[i], i)
+
+        assert cache.lookup(basis[0]) == 0      # 0 is now the most recently used
+        cache.add(basis[3], 3)
+
+        assert cache.lookup(basis[1]) is None   # least recently used went first
+        assert cache.lookup(basis[0]) == 0
+        assert cache.lookup(basis[3]) == 3
+
+    def test_clear_and_dimension_change(self):
+        cache = SemanticCache()
+        cache.add([1.0, 0.0], "a")
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.lookup([1.0, 0.0]) is None
+
+        cache.add([1.0, 0.0], "a")
+        assert cache.lookup([1.0, 0.0, 0.0]) is None
+        cache.add([0.0, 0.0, 1.0], "b")
+        assert len(cache) == 1
+        assert cache.lookup([0.0, 0.0, 1.0]) == "b"
+
+    def test_concurrent_adds(self):
+        cache = SemanticCache(threshold=0.999, max_entries=1024)
+        basis = np.eye(400, dtype=np.float32)
+
+        def worker(offset: int) -> None:
+            for i in range(offset, 400, 4):
+                cache.add(basis[i], i)
+
+        threads = [threading.Thread(target=worker, args=(k,)) for k in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(cache) == 400
+        assert all(cache.lookup(basis[i]) == i for i in range(400))
@@ -1,9 +1,3 @@
-import sys
-import os
-
-# Add the backend directory to the path so we can import utils
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-
 from backend.utils import format_text
 
 